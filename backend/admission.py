@@ -0,0 +1,157 @@
+"""
+Admission Control
+Per-endpoint concurrency limits with bounded wait queues for CPU-heavy requests
+"""
+
+import math
+import threading
+import time
+
+from monitoring.metrics import metrics
+
+
+queue_depth = metrics.gauge('admission_queue_depth', 'Requests waiting for a slot by endpoint')
+in_flight = metrics.gauge('admission_in_flight', 'Admitted requests running by endpoint')
+wait_seconds = metrics.histogram('admission_wait_seconds', 'Time admitted requests spent queued by endpoint')
+rejected_total = metrics.counter('admission_rejected_total', 'Requests turned away by endpoint and status')
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, endpoint, status, retry_after, reason):
+        super().__init__(reason)
+        self.endpoint = endpoint
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmittedStream:
+    """Iterates a streamed response body while holding an admission slot.
+
+    The slot is released once, when the body is exhausted, fails or is
+    closed by the server (e.g. the client disconnected).
+    """
+
+    def __init__(self, controller, endpoint, chunks):
+        self.controller = controller
+        self.endpoint = endpoint
+        self.chunks = iter(chunks)
+        self.start = time.perf_counter()
+        self.released = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self.chunks)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self.released:
+            return
+        self.released = True
+        try:
+            close = getattr(self.chunks, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self.controller.release(self.endpoint, time.perf_counter() - self.start)
+
+
+class AdmissionController:
+    """Limits how many requests of each guarded endpoint run at once.
+
+    limits maps endpoint -> (max_concurrent, max_queue). A request over the
+    limit waits up to max_wait seconds for a slot and gets a 503 when the
+    wait runs out; when the endpoint's queue is full, or admitted plus queued
+    requests across all endpoints reach max_total, it gets a 429 at once.
+    Both carry a Retry-After estimate from recent service times. Admitted
+    work runs on the request's own thread; with max_total below the server's
+    thread count some request threads stay free for light endpoints.
+    """
+
+    def __init__(self, limits, max_wait=10.0, max_total=None):
+        self.limits = dict(limits)
+        self.max_wait = max_wait
+        self.max_total = max_total
+        self.running = {endpoint: 0 for endpoint in self.limits}
+        self.waiting = {endpoint: 0 for endpoint in self.limits}
+        self.service_seconds = {}
+        self._cond = threading.Condition()
+
+    def guards(self, endpoint):
+        return endpoint in self.limits
+
+    def _publish(self, endpoint):
+        queue_depth.set(self.waiting[endpoint], endpoint=endpoint)
+        in_flight.set(self.running[endpoint], endpoint=endpoint)
+
+    def _reject(self, endpoint, status, reason):
+        # Rough time until a slot frees up for this request: backlog x mean service time
+        concurrent = self.limits[endpoint][0]
+        backlog = self.running[endpoint] + self.waiting[endpoint]
+        per_request = self.service_seconds.get(endpoint, 1.0)
+        retry_after = max(1, math.ceil(per_request * backlog / concurrent))
+        rejected_total.inc(endpoint=endpoint, status=status)
+        return AdmissionRejected(endpoint, status, retry_after, reason)
+
+    def acquire(self, endpoint):
+        """Take a slot for endpoint, waiting in its queue if needed; returns seconds waited"""
+        max_concurrent, max_queue = self.limits[endpoint]
+        start = time.perf_counter()
+        with self._cond:
+            occupied = sum(self.running.values()) + sum(self.waiting.values())
+            if self.max_total is not None and occupied >= self.max_total:
+                raise self._reject(endpoint, 429, 'Server busy, try again later')
+            if self.running[endpoint] >= max_concurrent:
+                if self.waiting[endpoint] >= max_queue:
+                    raise self._reject(endpoint, 429, 'Too many queued requests, try again later')
+                self.waiting[endpoint] += 1
+                self._publish(endpoint)
+                deadline = start + self.max_wait
+                try:
+                    while self.running[endpoint] >= max_concurrent:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            raise self._reject(endpoint, 503, 'Timed out waiting for capacity')
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting[endpoint] -= 1
+            self.running[endpoint] += 1
+            self._publish(endpoint)
+        waited = time.perf_counter() - start
+        wait_seconds.observe(waited, endpoint=endpoint)
+        return waited
+
+    def release(self, endpoint, seconds):
+        with self._cond:
+            previous = self.service_seconds.get(endpoint)
+            self.service_seconds[endpoint] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+            self.running[endpoint] -= 1
+            self._publish(endpoint)
+            self._cond.notify_all()
+
+    def run(self, endpoint, func):
+        """Run func() on the calling thread under endpoint's limit"""
+        self.acquire(endpoint)
+        start = time.perf_counter()
+        try:
+            return func()
+        finally:
+            self.release(endpoint, time.perf_counter() - start)
+
+    def stream(self, endpoint, chunks):
+        """Take a slot for endpoint now and hold it while the returned body is streamed"""
+        self.acquire(endpoint)
+        return AdmittedStream(self, endpoint, chunks)
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                endpoint: {'running': self.running[endpoint], 'queued': self.waiting[endpoint],
+                           'max_concurrent': concurrent, 'max_queue': queue}
+                for endpoint, (concurrent, queue) in self.limits.items()
+            }
@@ -2,18 +2,39 @@
 Flask Backend API - Simple version
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, send_file
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
+from sklearn.model_selection import train_test_split
+import functools
 import os
-import pandas as pd
+import sys
+import time
 from datetime import datetime
 
 from config import Config
-from preprocessing.data_cleaning import DataCleaner
+from admission import AdmissionController, AdmissionRejected
+from preprocessing.data_cleaning import DataCleaner, id_column
 from preprocessing.feature_selection import create_new_features, prepare_for_training, create_risk_labels
+from preprocessing.history import HistoryStore, upload_source
 from prediction.predictor import StudentPredictor
-from prediction.explainability import explain_prediction, generate_class_summary
+from prediction.registry import MODEL_TYPES, ModelRegistry, ShadowScorer
+from prediction.importance import ImportanceJobRunner
+from prediction.explainability import summarize_results
+from prediction.pipeline import add_longitudinal_features, prepare_student_frame, score_with_cache
+from prediction.result_cache import ResultCache
+from prediction.roster import RosterStore, score_roster
+from prediction.batch import BatchScorer, combine_summaries
+from prediction.out_of_core import train_out_of_core
+from prediction.export import EXPORT_FORMATS, check_format, export_stream, scored_chunks
+from monitoring.drift import DatasetSketch, drift_report, feature_nulls, sketch_frame
+from monitoring.metrics import metrics, timer, server_timing_header
+from monitoring.profiling import ProfileStore
+from ingestion.uploads import ResumableUploads, UploadError, save_upload
+from ingestion.excel import is_excel, save_workbook_upload
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from genai.intents import QUICK_DEFAULT, QUICK_ROUTER
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -22,28 +43,288 @@ CORS(app)
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['MODEL_FOLDER'], exist_ok=True)
 
+metrics.enabled = app.config['METRICS_ENABLED']
+resumable_uploads = ResumableUploads(
+    app.config['UPLOAD_FOLDER'],
+    chunk_size=app.config['UPLOAD_CHUNK_SIZE'],
+    max_bytes=app.config['UPLOAD_MAX_FILE_SIZE'],
+    session_ttl=app.config['UPLOAD_SESSION_TTL']
+)
+profiles = ProfileStore(app.config['PROFILE_FOLDER'], app.config['PROFILE_MAX_FILES'])
+request_seconds = metrics.histogram('http_request_duration_seconds', 'HTTP request latency by endpoint')
+requests_total = metrics.counter('http_requests_total', 'HTTP requests by endpoint and status')
+feature_drift = metrics.gauge('feature_drift_psi', 'Drift score of the latest /api/predict batch by model type and feature')
+
+registry = ModelRegistry(app.config['MODEL_REGISTRY_FOLDER'], compact=app.config['MODEL_COMPACT_ARTIFACTS'])
+shadow = ShadowScorer(max_pending=app.config['SHADOW_MAX_PENDING'])
+importance_jobs = ImportanceJobRunner(
+    registry,
+    n_repeats=app.config['IMPORTANCE_REPEATS'],
+    max_rows=app.config['IMPORTANCE_MAX_ROWS']
+)
+batch_scorer = BatchScorer(max_workers=app.config['BATCH_MAX_WORKERS'])
+result_cache = None
+if app.config['RESULT_CACHE_ENABLED']:
+    result_cache = ResultCache(app.config['RESULT_CACHE_PATH'], app.config['RESULT_CACHE_MAX_ENTRIES'])
+rosters = RosterStore(app.config['ROSTER_FOLDER'])
+history = None
+if app.config['HISTORY_ENABLED']:
+    history = HistoryStore(app.config['HISTORY_DB_PATH'], app.config['HISTORY_WINDOW'])
+
+def create_admission():
+    if not app.config['ADMISSION_ENABLED']:
+        return None
+    return AdmissionController(
+        app.config['ADMISSION_LIMITS'],
+        max_wait=app.config['ADMISSION_MAX_WAIT'],
+        max_total=app.config['ADMISSION_MAX_TOTAL'] or max(1, app.config['WEB_THREADS'] - 1)
+    )
+
+admission = create_admission()
+
+def configure_threads(threads):
+    # The heavy-request cap follows the thread count the server actually runs each worker with
+    global admission
+    app.config['WEB_THREADS'] = threads
+    admission = create_admission()
+
 predictor_rf = None
 predictor_svm = None
 
 def is_csv(filename):
     return filename.lower().endswith('.csv')
 
+def is_allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+
+def stored_upload_name(filename):
+    filename = secure_filename(filename)
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
+
+def upload_response(filename, info):
+    return jsonify({
+        'message': 'Uploaded',
+        'filename': filename,
+        'rows': info['rows'],
+        'columns': info['columns'],
+        'column_names': info['column_names'],
+        'preview': info['preview'],
+        'sha256': info['sha256'],
+        'size_bytes': info['size_bytes'],
+        'sheets': info.get('sheets')
+    })
+
+def load_predictor(model_type):
+    # Prefer the promoted registry version; fall back to the legacy fixed paths
+    predictor = registry.load(model_type)
+    if predictor is not None:
+        if hasattr(predictor.model, 'feature_importances_'):
+            # Backfill versions registered before importances were stored
+            importance_jobs.submit(predictor)
+        return predictor
+    predictor = StudentPredictor(model_type)
+    legacy_path = app.config['RANDOM_FOREST_MODEL'] if model_type == 'random_forest' else app.config['SVM_MODEL']
+    if os.path.exists(legacy_path):
+        predictor.load_model(legacy_path)
+    return predictor
+
 def load_models():
     global predictor_rf, predictor_svm
-    
-    rf_path = app.config['RANDOM_FOREST_MODEL']
-    if os.path.exists(rf_path):
-        predictor_rf = StudentPredictor('random_forest')
-        predictor_rf.load_model(rf_path)
-    else:
-        predictor_rf = StudentPredictor('random_forest')
-    
-    svm_path = app.config['SVM_MODEL']
-    if os.path.exists(svm_path):
-        predictor_svm = StudentPredictor('svm')
-        predictor_svm.load_model(svm_path)
+    predictor_rf = load_predictor('random_forest')
+    predictor_svm = load_predictor('svm')
+
+def holdout_rows(X, y):
+    # The rows predictor.train held out (same split), so permutation importance is measured on unseen data
+    _, X_test, _, y_test = train_test_split(X, y, test_size=app.config['TEST_SIZE'], random_state=app.config['RANDOM_STATE'])
+    return X_test, y_test
+
+def train_in_memory(predictor, X, y, nulls=None):
+    return predictor.train(X, y, test_size=app.config['TEST_SIZE'], random_state=app.config['RANDOM_STATE'], nulls=nulls)
+
+def register_model(predictor, metadata=None, holdout=None):
+    """Register a trained predictor; holdout is (X, y) it was not fit on, for permutation importance"""
+    version = registry.register(predictor, metadata)
+    importance_jobs.submit(predictor, *(holdout or ()))
+    return version
+
+def reinit_after_fork():
+    # Executor threads started in a parent process do not exist in a forked child
+    global shadow, importance_jobs, batch_scorer, admission
+    batch_scorer = BatchScorer(max_workers=app.config['BATCH_MAX_WORKERS'])
+    admission = create_admission()
+    shadow = ShadowScorer(max_pending=app.config['SHADOW_MAX_PENDING'])
+    importance_jobs = ImportanceJobRunner(
+        registry,
+        n_repeats=app.config['IMPORTANCE_REPEATS'],
+        max_rows=app.config['IMPORTANCE_MAX_ROWS']
+    )
+
+def get_predictor(model_type):
+    predictor = predictor_rf if model_type == 'random_forest' else predictor_svm
+    if predictor is None:
+        predictor = load_predictor(model_type)
+        set_predictor(model_type, predictor)
+    return predictor
+
+def batch_drift(model_type, predictor, X_pred, raw_nulls):
+    # Sketch the batch with the training profile's bins and compare; None without a profile
+    if not app.config['DRIFT_ENABLED'] or not predictor.profile:
+        return None
+    with timer('drift'):
+        reference = DatasetSketch.from_dict(predictor.profile)
+        report = drift_report(reference, sketch_frame(X_pred, feature_nulls(raw_nulls, reference.feature_names), reference))
+    for name, feature in report['features'].items():
+        if feature['psi'] is not None:
+            feature_drift.set(feature['psi'], model_type=model_type, feature=name)
+    return report
+
+def batch_outliers(predictor, X_pred, student_ids):
+    # Values outside the training fences (they are scored clipped to them); None without fences
+    mask = predictor.outlier_mask(X_pred)
+    if mask is None:
+        return None
+    rows = mask.any(axis=1).nonzero()[0]
+    counts = mask.sum(axis=0)
+    names = predictor.feature_names or predictor.profile['feature_names']
+    return {
+        'rows': len(rows),
+        'features': {name: int(count) for name, count in zip(names, counts) if count},
+        'student_ids': [student_ids[i] for i in rows[:app.config['OUTLIER_REPORT_IDS']]],
+    }
+
+def promote_version(model_type, version):
+    registry.promote(model_type, version)
+    if result_cache is not None:
+        result_cache.invalidate(model_type, keep_version=version)
+
+def scoring_function(model_type, predictor):
+    # predict(X) for the pipeline: pool scoring for large matrices, plus shadow comparison
+    def score_rows(X):
+        start = time.perf_counter()
+        predictions, probabilities = batch_scorer.predict(
+            predictor, model_file(predictor), X,
+            backend=app.config['SHARED_ARRAY_BACKEND'],
+            folder=app.config['UPLOAD_FOLDER'],
+            min_rows=app.config['SHARED_PREDICT_MIN_ROWS']
+        )
+        shadow.submit(model_type, X, predictions, probabilities, time.perf_counter() - start)
+        return predictions, probabilities
+    return score_rows
+
+def model_file(predictor):
+    # Pool workers can only load registered versions; other predictors are scored in-process
+    return registry.model_path(predictor.version) if registry.has_version(predictor.version) else None
+
+def set_predictor(model_type, predictor):
+    # Rebinding the global is atomic, so in-flight requests keep the old object
+    global predictor_rf, predictor_svm
+    if model_type == 'random_forest':
+        predictor_rf = predictor
     else:
-        predictor_svm = StudentPredictor('svm')
+        predictor_svm = predictor
+
+def admission_controlled(view):
+    # CPU-heavy endpoints: bounded concurrency and queue; the work runs on the request thread
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if admission is None or not admission.guards(request.endpoint):
+            return view(*args, **kwargs)
+        try:
+            return admission.run(request.endpoint, lambda: view(*args, **kwargs))
+        except AdmissionRejected as e:
+            return rejected_response(e)
+    return wrapper
+
+def rejected_response(e):
+    response = jsonify({'error': e.reason, 'retry_after': e.retry_after})
+    response.status_code = e.status
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+@app.before_request
+def start_request_metrics():
+    if metrics.enabled:
+        g.request_start = time.perf_counter()
+        metrics.start_request()
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_start' not in g:
+        return response
+    duration = time.perf_counter() - g.request_start
+    endpoint = request.endpoint or 'unknown'
+    request_seconds.observe(duration, endpoint=endpoint, method=request.method)
+    requests_total.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    stages = metrics.finish_request()
+    if app.config['SERVER_TIMING_ENABLED'] or request.headers.get('X-Server-Timing') == '1':
+        response.headers['Server-Timing'] = server_timing_header(stages + [('total', duration)])
+    return response
+
+def profiling_requested():
+    if not app.config['PROFILING_ENABLED'] or request.endpoint not in app.config['PROFILABLE_ENDPOINTS']:
+        return False
+    flag = request.headers.get('X-Profile') or request.args.get('profile')
+    if not flag:
+        return False
+    token = app.config['PROFILING_TOKEN']
+    return flag == token if token else flag == '1'
+
+@app.before_request
+def start_profiling():
+    if profiling_requested():
+        g.profile_start = time.perf_counter()
+        g.profiler = profiles.start()
+
+@app.after_request
+def finish_profiling(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        name = profiles.save(profiler, request.endpoint, time.perf_counter() - g.profile_start)
+        response.headers['X-Profile-Id'] = name
+    return response
+
+@app.teardown_request
+def stop_profiling(exc):
+    # Handler raised before after_request ran; make sure the profiler is off
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+
+def profile_access_error():
+    # Profiles expose code paths and timings, so reading them always needs the token
+    if not app.config['PROFILING_ENABLED']:
+        return jsonify({'error': 'Profiling disabled'}), 404
+    token = app.config['PROFILING_TOKEN']
+    if not token or request.headers.get('X-Profile') != token:
+        return jsonify({'error': 'X-Profile must carry PROFILING_TOKEN'}), 403
+    return None
+
+@app.route('/api/profiles', methods=['GET'])
+def list_profiles():
+    error = profile_access_error()
+    if error is not None:
+        return error
+    return jsonify({'profiles': profiles.list()})
+
+@app.route('/api/profiles/<name>', methods=['GET'])
+def download_profile(name):
+    error = profile_access_error()
+    if error is not None:
+        return error
+    if request.args.get('format') == 'text':
+        sort = request.args.get('sort', 'cumulative')
+        report = profiles.text_report(name, sort=sort if sort in ('cumulative', 'tottime', 'calls') else 'cumulative')
+        if report is None:
+            return jsonify({'error': 'Profile not found'}), 404
+        return Response(report, mimetype='text/plain')
+    path = profiles.path_for(name)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=name)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/health', methods=['GET'])
 def health():
@@ -59,25 +340,74 @@ def upload():
         return jsonify({'error': 'No file'}), 400
     
     file = request.files['file']
-    if not file.filename or not is_csv(file.filename):
-        return jsonify({'error': 'Need CSV file'}), 400
+    if not file.filename or not is_allowed_file(file.filename):
+        return jsonify({'error': 'Need CSV or Excel file'}), 400
     
-    filename = secure_filename(file.filename)
-    filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
+    filename = stored_upload_name(file.filename)
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(filepath)
+    try:
+        if is_excel(filename):
+            # Sheets are converted once here; predict/train read the cached frames
+            with timer('excel_convert'):
+                info = save_workbook_upload(file.stream, filepath, chunk_size=app.config['UPLOAD_CHUNK_SIZE'])
+        else:
+            with timer('upload_stream'):
+                info = save_upload(file.stream, filepath, chunk_size=app.config['UPLOAD_CHUNK_SIZE'])
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    return upload_response(filename, info)
+
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    filename = (request.json or {}).get('filename', '')
+    if not filename or not is_csv(filename):
+        return jsonify({'error': 'Need CSV file'}), 400
+    return jsonify(resumable_uploads.create(filename)), 201
+
+@app.route('/api/uploads/<upload_id>', methods=['GET', 'PUT', 'DELETE'])
+def resumable_upload(upload_id):
+    state = resumable_uploads.status(upload_id)
+    if state is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    if request.method == 'GET':
+        return jsonify(state)
+    if request.method == 'DELETE':
+        resumable_uploads.abort(upload_id)
+        return jsonify({'message': 'Aborted'})
     
-    df = pd.read_csv(filepath)
-    return jsonify({
-        'message': 'Uploaded',
-        'filename': filename,
-        'rows': len(df),
-        'columns': len(df.columns),
-        'column_names': df.columns.tolist(),
-        'preview': df.head(5).to_dict('records')
-    })
+    try:
+        offset = int(request.headers.get('Upload-Offset', request.args.get('offset', '')))
+    except ValueError:
+        return jsonify({'error': 'Upload-Offset header required'}), 400
+    try:
+        with timer('upload_stream'):
+            new_offset = resumable_uploads.append(upload_id, offset, request.stream)
+    except KeyError:
+        # Deleted (or swept) while this chunk was being written
+        return jsonify({'error': 'Upload not found'}), 404
+    except UploadError as e:
+        current = resumable_uploads.status(upload_id)
+        if current is not None:
+            return jsonify({'error': str(e), 'offset': current['offset']}), 409
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'upload_id': upload_id, 'offset': new_offset})
+
+@app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    state = resumable_uploads.status(upload_id)
+    if state is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    filename = stored_upload_name(state['filename'])
+    try:
+        info = resumable_uploads.complete(upload_id, os.path.join(app.config['UPLOAD_FOLDER'], filename))
+    except KeyError:
+        return jsonify({'error': 'Upload not found'}), 404
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    return upload_response(filename, info)
 
 @app.route('/api/predict', methods=['POST'])
+@admission_controlled
 def predict():
     data = request.json
     filename = data.get('filename')
@@ -85,99 +415,398 @@ def predict():
     
     if not filename:
         return jsonify({'error': 'No filename'}), 400
+    if model_type not in MODEL_TYPES:
+        return jsonify({'error': f'Unknown model type: {model_type}'}), 400
     
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
     if not os.path.exists(filepath):
         return jsonify({'error': 'File not found'}), 404
     
-    predictor = predictor_rf if model_type == 'random_forest' else predictor_svm
+    predictor = get_predictor(model_type)
     
     cleaner = DataCleaner()
-    df = cleaner.load_csv(filepath)
-    df = cleaner.add_student_ids(df)
-    student_ids = df['student_id'].tolist()
-    df = cleaner.clean_data(df)
-    df = create_new_features(df)
+    try:
+        df = cleaner.load_data(filepath, data.get('sheet'))
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    raw_nulls = df.isna().sum()
+    df, student_ids = prepare_student_frame(df, history, upload_source(filepath, data.get('history_scope')))
     
     if not predictor.is_trained:
         df = create_risk_labels(df, threshold=50)
         X, y = prepare_for_training(df, 'at_risk')
         if y is not None and len(y.unique()) > 1:
-            predictor.train(X, y)
-            model_path = app.config['RANDOM_FOREST_MODEL'] if model_type == 'random_forest' else app.config['SVM_MODEL']
-            predictor.save_model(model_path)
+            train_in_memory(predictor, X, y, nulls=feature_nulls(raw_nulls, X.columns))
+            promote_version(model_type, register_model(predictor, {'source_file': filename}, holdout_rows(X, y)))
     
     X_pred, _ = prepare_for_training(df, 'at_risk')
-    predictions, probabilities = predictor.predict(X_pred)
-    
-    results = []
-    for i in range(len(predictions)):
-        student_data = df.iloc[i].to_dict()
-        pred = {
-            'prediction': int(predictions[i]),
-            'is_at_risk': bool(predictions[i] == 1),
-            'risk_probability': float(probabilities[i][1])
-        }
-        explanation = explain_prediction(student_data, pred)
-        results.append({
-            'student_id': student_ids[i],
-            'at_risk': 'Yes' if pred['is_at_risk'] else 'No',
-            'risk_probability': round(pred['risk_probability'] * 100, 2),
-            'risk_level': explanation['risk_level'],
-            'explanation': explanation['explanation'],
-            'risk_factors': explanation['risk_factors'],
-            'recommendations': explanation['recommendations']
+    # Before scoring: aligning features fills missing columns in X_pred
+    drift = batch_drift(model_type, predictor, X_pred, raw_nulls)
+    outliers = batch_outliers(predictor, X_pred, student_ids)
+    results, explained_rows, cache_hits = score_with_cache(
+        result_cache, predictor, X_pred, df, student_ids, scoring_function(model_type, predictor),
+        app.config['EXPLAIN_TIME_BUDGET_MS'] / 1000, app.config['EXPLAIN_TOP_FEATURES']
+    )
+    with timer('summary'):
+        summary = summarize_results(results, student_ids)
+    
+    with timer('serialize'):
+        response = jsonify({
+            'message': 'Complete',
+            'model_used': model_type,
+            'model_version': predictor.version,
+            'explained_rows': explained_rows,
+            'cache_hits': cache_hits,
+            'total_students': len(results),
+            'at_risk_count': sum(1 for r in results if r['at_risk'] == 'Yes'),
+            'at_risk_percentage': round(summary['at_risk_percentage'], 2),
+            'predictions': results,
+            'summary': summary,
+            'drift': drift,
+            'outliers': outliers
         })
+    return response
+
+@app.route('/api/predict/batch', methods=['POST'])
+@admission_controlled
+def predict_batch():
+    data = request.json or {}
+    filenames = data.get('filenames') or []
+    model_type = data.get('model_type', 'random_forest')
+    
+    if not isinstance(filenames, list) or not filenames:
+        return jsonify({'error': 'No filenames'}), 400
+    if len(filenames) > app.config['BATCH_MAX_FILES']:
+        return jsonify({'error': f"At most {app.config['BATCH_MAX_FILES']} files per batch"}), 400
+    if model_type not in MODEL_TYPES:
+        return jsonify({'error': f'Unknown model type: {model_type}'}), 400
     
-    pred_list = [{'is_at_risk': r['at_risk'] == 'Yes', 'risk_probability': r['risk_probability']/100} for r in results]
-    summary = generate_class_summary(pred_list, student_ids)
+    filepaths = [os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(str(name))) for name in filenames]
+    missing = [name for name, path in zip(filenames, filepaths) if not os.path.exists(path)]
+    if missing:
+        return jsonify({'error': 'File not found', 'missing': missing}), 404
     
+    predictor = get_predictor(model_type)
+    if not predictor.is_trained:
+        return jsonify({'error': 'Model not trained; train it or run /api/predict on one file first'}), 409
+    
+    start = time.perf_counter()
+    file_results = batch_scorer.score(
+        predictor, model_file(predictor), filepaths, data.get('sheet'),
+        app.config['EXPLAIN_TIME_BUDGET_MS'] / 1000, app.config['EXPLAIN_TOP_FEATURES'],
+        history=(app.config['HISTORY_DB_PATH'], app.config['HISTORY_WINDOW']) if history is not None else None,
+        history_scope=data.get('history_scope')
+    )
+    seconds = time.perf_counter() - start
+    
+    files = []
+    for name, result in zip(filenames, file_results):
+        if 'error' in result:
+            files.append({'filename': name, 'error': result['error']})
+            continue
+        files.append({
+            'filename': name,
+            'total_students': len(result['results']),
+            'at_risk_count': sum(1 for r in result['results'] if r['at_risk'] == 'Yes'),
+            'explained_rows': result['explained_rows'],
+            'seconds': result['seconds'],
+            'predictions': result['results'],
+            'summary': result['summary']
+        })
+    district = combine_summaries(file_results)
+    
+    with timer('serialize'):
+        response = jsonify({
+            'message': 'Complete',
+            'model_used': model_type,
+            'model_version': predictor.version,
+            'total_files': len(files),
+            'failed_files': sum(1 for f in files if 'error' in f),
+            'total_students': district['total_students'] if district else 0,
+            'seconds': round(seconds, 4),
+            'files': files,
+            'district_summary': district
+        })
+    return response
+
+@app.route('/api/export', methods=['GET'])
+def export_results():
+    filename = request.args.get('filename')
+    model_type = request.args.get('model_type', 'random_forest')
+    export_format = request.args.get('format', 'csv')
+    
+    if not filename:
+        return jsonify({'error': 'No filename'}), 400
+    if model_type not in MODEL_TYPES:
+        return jsonify({'error': f'Unknown model type: {model_type}'}), 400
+    try:
+        check_format(export_format)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    filename = secure_filename(filename)
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if not os.path.exists(filepath):
+        return jsonify({'error': 'File not found'}), 404
+    
+    predictor = get_predictor(model_type)
+    if not predictor.is_trained:
+        return jsonify({'error': 'Model not trained; train it or run /api/predict on one file first'}), 409
+    
+    # Scored and serialized one chunk at a time as the client reads the body
+    frames = scored_chunks(
+        predictor, filepath, app.config['EXPORT_CHUNK_ROWS'], result_cache, history,
+        request.args.get('sheet'), app.config['EXPLAIN_TOP_FEATURES'], request.args.get('history_scope')
+    )
+    body = export_stream(frames, export_format)
+    if admission is not None and admission.guards(request.endpoint):
+        try:
+            # The slot is held until the body has been sent, not just until this view returns
+            body = admission.stream(request.endpoint, body)
+        except AdmissionRejected as e:
+            return rejected_response(e)
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    download = f'{os.path.splitext(filename)[0]}_predictions{extension}'
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{download}"',
+        'X-Model-Version': predictor.version or ''
+    })
+
+@app.route('/api/rosters/<roster>/predict', methods=['POST'])
+@admission_controlled
+def predict_roster(roster):
+    data = request.json or {}
+    filename = data.get('filename')
+    model_type = data.get('model_type', 'random_forest')
+    
+    if not filename:
+        return jsonify({'error': 'No filename'}), 400
+    if model_type not in MODEL_TYPES:
+        return jsonify({'error': f'Unknown model type: {model_type}'}), 400
+    try:
+        rosters.path(roster)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
+    if not os.path.exists(filepath):
+        return jsonify({'error': 'File not found'}), 404
+    
+    predictor = get_predictor(model_type)
+    if not predictor.is_trained:
+        return jsonify({'error': 'Model not trained; train it or run /api/predict on one file first'}), 409
+    
+    try:
+        raw = DataCleaner().load_data(filepath, data.get('sheet'))
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    scored = score_roster(
+        rosters, roster, raw, predictor, scoring_function(model_type, predictor), result_cache,
+        app.config['EXPLAIN_TIME_BUDGET_MS'] / 1000, app.config['EXPLAIN_TOP_FEATURES'],
+        history, upload_source(filepath, data.get('history_scope', roster))
+    )
+    delta = scored['delta']
+    
+    with timer('serialize'):
+        response = jsonify({
+            'message': 'Complete',
+            'roster': roster,
+            'mode': scored['mode'],
+            'model_used': model_type,
+            'model_version': predictor.version,
+            'rescored': scored['rescored'],
+            'explained_rows': scored['explained_rows'],
+            'cache_hits': scored['cache_hits'],
+            'total_students': len(scored['results']),
+            'delta': {
+                'new': delta['new'],
+                'changed': delta['changed'],
+                'removed': delta['removed'],
+                'unchanged_count': len(delta['unchanged'])
+            },
+            'transitions': scored['transitions'],
+            'predictions': scored['results'],
+            'summary': scored['summary']
+        })
+    return response
+
+@app.route('/api/rosters/<roster>', methods=['DELETE'])
+def delete_roster(roster):
+    try:
+        deleted = rosters.delete(roster)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not deleted:
+        return jsonify({'error': 'Roster not found'}), 404
+    return jsonify({'message': 'Deleted', 'roster': roster})
+
+@app.route('/api/students/<student_id>/history', methods=['GET'])
+def student_history(student_id):
+    if history is None:
+        return jsonify({'error': 'History store is disabled'}), 404
+    scope = request.args.get('scope')
+    if not scope:
+        # Ids are only unique within a scope (class), so there is nothing to look up without one
+        return jsonify({'error': 'scope is required'}), 400
+    snapshots = history.student_history(student_id, scope)
+    if not snapshots:
+        return jsonify({'error': 'No history for student'}), 404
+    features = history.window_features([student_id], scope).iloc[0].to_dict()
     return jsonify({
-        'message': 'Complete',
-        'model_used': model_type,
-        'total_students': len(results),
-        'at_risk_count': sum(1 for r in results if r['at_risk'] == 'Yes'),
-        'at_risk_percentage': round(summary['at_risk_percentage'], 2),
-        'predictions': results,
-        'summary': summary
+        'student_id': student_id,
+        'snapshots': snapshots,
+        'features': {name: float(value) for name, value in features.items()}
     })
 
 @app.route('/api/train', methods=['POST'])
+@admission_controlled
 def train():
     data = request.json
     filename = data.get('filename')
     model_type = data.get('model_type', 'random_forest')
+    shadow_mode = bool(data.get('shadow', False))
     
     if not filename:
         return jsonify({'error': 'No filename'}), 400
+    if model_type not in MODEL_TYPES:
+        return jsonify({'error': f'Unknown model type: {model_type}'}), 400
     
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    cleaner = DataCleaner()
-    df = cleaner.load_csv(filepath)
-    df = cleaner.clean_data(df)
-    df = create_new_features(df)
-    df = create_risk_labels(df, threshold=50)
-    
-    X, y = prepare_for_training(df, 'at_risk')
+    if not os.path.exists(filepath):
+        return jsonify({'error': 'File not found'}), 404
     predictor = StudentPredictor(model_type=model_type)
-    metrics = predictor.train(X, y)
-    
-    model_path = app.config['RANDOM_FOREST_MODEL'] if model_type == 'random_forest' else app.config['SVM_MODEL']
-    predictor.save_model(model_path)
+    out_of_core = data.get('out_of_core', os.path.getsize(filepath) >= app.config['TRAIN_OUT_OF_CORE_MIN_BYTES'])
+    if out_of_core and not is_excel(filename):
+        # Larger than memory: reservoir sample + streaming holdout (no history features)
+        try:
+            # Every in-memory row (the sample) was trained on, so only impurity importances apply
+            holdout = None
+            metrics, _, _ = train_out_of_core(
+                predictor, filepath,
+                memory_budget_mb=data.get('memory_budget_mb', app.config['TRAIN_MEMORY_BUDGET_MB']),
+                chunk_rows=app.config['TRAIN_CHUNK_ROWS'],
+                test_size=app.config['TEST_SIZE'],
+                random_state=app.config['RANDOM_STATE'],
+                threshold=50
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        cleaner = DataCleaner()
+        try:
+            df = cleaner.load_data(filepath, data.get('sheet'))
+        except UploadError as e:
+            return jsonify({'error': str(e)}), 400
+        key = id_column(df)
+        keys = df[key].tolist() if key else None
+        raw_nulls = df.isna().sum()
+        df = cleaner.clean_data(df)
+        df = create_new_features(df)
+        source = upload_source(filepath, data.get('history_scope'))
+        if history is not None and keys is not None and source:
+            df = add_longitudinal_features(df, keys, history, source)
+        df = create_risk_labels(df, threshold=50)
+        
+        X, y = prepare_for_training(df, 'at_risk')
+        metrics = train_in_memory(predictor, X, y, nulls=feature_nulls(raw_nulls, X.columns))
+        holdout = holdout_rows(X, y)
     
-    global predictor_rf, predictor_svm
-    if model_type == 'random_forest':
-        predictor_rf = predictor
+    metadata = {
+        'source_file': filename,
+        'train_accuracy': metrics['train_accuracy'],
+        'test_accuracy': metrics['test_accuracy']
+    }
+    if 'holdout' in metrics:
+        metadata.update({key: metrics[key] for key in ('holdout', 'rows_seen', 'sample_rows')})
+    version = register_model(predictor, metadata, holdout)
+    if shadow_mode:
+        # Candidate scores live traffic in the background until promoted
+        shadow.set_candidate(model_type, predictor)
     else:
-        predictor_svm = predictor
+        promote_version(model_type, version)
+        set_predictor(model_type, predictor)
     
     return jsonify({
         'message': 'Trained',
         'model_type': model_type,
+        'version': version,
+        'promoted': not shadow_mode,
         'train_accuracy': round(metrics['train_accuracy'] * 100, 2),
-        'test_accuracy': round(metrics['test_accuracy'] * 100, 2)
+        'test_accuracy': round(metrics['test_accuracy'] * 100, 2),
+        'out_of_core': 'holdout' in metrics,
+        'rows_seen': metrics.get('rows_seen'),
+        'sample_rows': metrics.get('sample_rows')
+    })
+
+@app.route('/api/models', methods=['GET'])
+def list_models():
+    return jsonify({
+        model_type: {
+            'current_version': registry.current_version(model_type),
+            'versions': registry.list_versions(model_type)
+        }
+        for model_type in MODEL_TYPES
     })
 
+@app.route('/api/model/importance', methods=['GET'])
+def model_importance():
+    model_type = request.args.get('model_type', 'random_forest')
+    if model_type not in MODEL_TYPES:
+        return jsonify({'error': 'Unknown model type'}), 400
+    version = request.args.get('version') or get_predictor(model_type).version
+    if not registry.has_version(version):
+        return jsonify({'error': 'No registered model'}), 404
+    
+    importance = registry.load_importance(version)
+    if importance is None:
+        status = importance_jobs.get_status(version)
+        if status == 'pending':
+            return jsonify({'status': 'pending', 'version': version}), 202
+        if status == 'failed':
+            return jsonify({'error': 'Importance computation failed; see the server log', 'status': 'failed', 'version': version}), 500
+        if status == 'unavailable':
+            return jsonify({'error': 'Model has no held-out rows for permutation importance', 'status': 'unavailable', 'version': version}), 404
+        return jsonify({'error': 'Importance not available', 'version': version}), 404
+    return jsonify(importance)
+
+@app.route('/api/models/<model_type>/promote', methods=['POST'])
+def promote_model(model_type):
+    if model_type not in MODEL_TYPES:
+        return jsonify({'error': 'Unknown model type'}), 400
+    version = (request.json or {}).get('version')
+    if not registry.has_version(version):
+        return jsonify({'error': 'Unknown version'}), 404
+    
+    try:
+        predictor = registry.load(model_type, version)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    promote_version(model_type, version)
+    set_predictor(model_type, predictor)
+    candidate = shadow.get_candidate(model_type)
+    if candidate is not None and candidate.version == version:
+        shadow.clear_candidate(model_type)
+    return jsonify({'message': 'Promoted', 'model_type': model_type, 'version': version})
+
+@app.route('/api/models/<model_type>/shadow', methods=['GET', 'POST', 'DELETE'])
+def shadow_model(model_type):
+    if model_type not in MODEL_TYPES:
+        return jsonify({'error': 'Unknown model type'}), 400
+    
+    if request.method == 'POST':
+        version = (request.json or {}).get('version')
+        if not registry.has_version(version):
+            return jsonify({'error': 'Unknown version'}), 404
+        try:
+            shadow.set_candidate(model_type, registry.load(model_type, version))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    elif request.method == 'DELETE':
+        shadow.clear_candidate(model_type)
+    
+    return jsonify({'model_type': model_type, 'shadow': shadow.report(model_type)})
+
 @app.route('/api/chatbot', methods=['POST'])
 def chatbot():
     data = request.json
@@ -186,29 +815,17 @@ def chatbot():
     if not message:
         return jsonify({'error': 'No message'}), 400
     
-    try:
-        import sys
-        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-        from genai.chatbot import get_chatbot_response
-        response = get_chatbot_response(message, student_id=None, students_data=data.get('students_data', []))
-    except:
-        response = simple_response(message)
+    with timer('chatbot'):
+        try:
+            from genai.chatbot import get_chatbot_response
+            response = get_chatbot_response(message, student_id=None, students_data=data.get('students_data', []))
+        except:
+            response = simple_response(message)
     
     return jsonify({'response': response, 'timestamp': datetime.now().isoformat()})
 
 def simple_response(message):
-    msg = message.lower()
-    if 'risk' in msg:
-        return "Students are at-risk with low grades (below 50%), poor attendance (below 75%), low assignment completion, or declining performance."
-    if 'intervention' in msg or 'help' in msg:
-        return "Best interventions: tutoring, regular check-ins, parent communication, peer mentoring, study skills training."
-    if 'attendance' in msg:
-        return "Good attendance (75%+) is crucial. Remove barriers, communicate with parents, make classes engaging."
-    if 'grade' in msg or 'mark' in msg:
-        return "Improve grades with: targeted tutoring, identifying gaps, varied teaching, regular feedback, extra practice."
-    if 'model' in msg or 'prediction' in msg:
-        return "Uses Random Forest and SVM models with 80-90% accuracy. Analyzes grades, attendance, assignments."
-    return "I can help with: why students are at-risk, interventions, improving attendance/grades, how the model works."
+    return QUICK_ROUTER.respond(message, QUICK_DEFAULT)
 
 if __name__ == '__main__':
     load_models()
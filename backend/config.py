@@ -17,8 +17,11 @@ class Config:
     DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
     
     # File upload settings
-    UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'data', 'uploads')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB max file size
+    UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', os.path.join(os.path.dirname(__file__), 'data', 'uploads'))
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB max request (single upload or one chunk)
+    UPLOAD_CHUNK_SIZE = 1024 * 1024  # Read/write block size while streaming uploads
+    UPLOAD_MAX_FILE_SIZE = 2 * 1024 * 1024 * 1024  # Total size limit for resumable uploads
+    UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', 24 * 3600))  # Seconds without a chunk before a resumable upload is discarded
     ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
     
     # Model settings
@@ -26,21 +29,83 @@ class Config:
     RANDOM_FOREST_MODEL = os.path.join(MODEL_FOLDER, 'random_forest_model.pkl')
     SVM_MODEL = os.path.join(MODEL_FOLDER, 'svm_model.pkl')
     DEFAULT_MODEL = 'random_forest'
+    MODEL_REGISTRY_FOLDER = os.getenv('MODEL_REGISTRY_FOLDER', os.path.join(MODEL_FOLDER, 'registry'))
+    MODEL_COMPACT_ARTIFACTS = os.getenv('MODEL_COMPACT_ARTIFACTS', 'True').lower() == 'true'  # Register forests as model.forest
+    SHADOW_MAX_PENDING = 4  # Shadow batches in flight before new ones are dropped
+    IMPORTANCE_REPEATS = 5  # Permutation repeats for SVM importances
+    IMPORTANCE_MAX_ROWS = 2000  # Rows sampled for permutation importance
     
     # ML settings
     TEST_SIZE = 0.2
     RANDOM_STATE = 42
     RISK_THRESHOLD = 50  # Marks threshold for at-risk classification
+    EXPLAIN_TIME_BUDGET_MS = 250  # Model attribution budget per /api/predict call
+    EXPLAIN_TOP_FEATURES = 3
+    BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', os.cpu_count() or 1))  # Processes for /api/predict/batch
+    BATCH_MAX_FILES = 200
+    SCORING_CHUNK_ROWS = 50000  # Rows per chunk for score_students.py
+    EXPORT_CHUNK_ROWS = 10000  # Rows scored and streamed at a time by /api/export
+    TRAIN_MEMORY_BUDGET_MB = int(os.getenv('TRAIN_MEMORY_BUDGET_MB', 512))  # Out-of-core training: sample + chunk + fit
+    TRAIN_CHUNK_ROWS = 50000
+    TRAIN_OUT_OF_CORE_MIN_BYTES = 200 * 1024 * 1024  # CSV/Parquet training files this large are trained out of core
+    SHARED_PREDICT_MIN_ROWS = 50000  # Cohorts this large are scored by the pool from shared memory
+    SHARED_ARRAY_BACKEND = os.getenv('SHARED_ARRAY_BACKEND', 'shm')  # 'shm' or 'memmap' (.npy files in UPLOAD_FOLDER)
+    RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'True').lower() == 'true'
+    RESULT_CACHE_PATH = os.getenv('RESULT_CACHE_PATH', os.path.join(os.path.dirname(__file__), 'data', 'result_cache.sqlite3'))
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', 500000))
+    ROSTER_FOLDER = os.path.join(os.path.dirname(__file__), 'data', 'rosters')  # Last upload + results per roster
+    HISTORY_ENABLED = os.getenv('HISTORY_ENABLED', 'False').lower() == 'true'
+    HISTORY_DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'history.sqlite3')
+    HISTORY_WINDOW = 5  # Most recent uploads used for trend, volatility and rolling attendance
+    DRIFT_ENABLED = os.getenv('DRIFT_ENABLED', 'True').lower() == 'true'  # Per-feature drift report in /api/predict
+    OUTLIER_REPORT_IDS = 20  # Student ids listed in the /api/predict outlier summary
+    
+    # Hyperparameter tuning settings
+    TUNING_CV_FOLDS = 5
+    TUNING_HALVING_FACTOR = 3  # Keep the top 1/3 of candidates each round
+    TUNING_N_JOBS = int(os.getenv('TUNING_N_JOBS', os.cpu_count() or 1))
+    TUNING_LEADERBOARD = os.path.join(MODEL_FOLDER, 'tuning_leaderboard.json')
     
     # OpenAI settings (for GenAI chatbot)
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
     OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
     
+    # Production server settings (serve.py)
+    WEB_BIND = os.getenv('WEB_BIND', '0.0.0.0:5000')
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', os.cpu_count() or 1))
+    WEB_THREADS = int(os.getenv('WEB_THREADS', 4))
+    WEB_TIMEOUT = int(os.getenv('WEB_TIMEOUT', 120))
+    REGISTRY_POLL_SECONDS = float(os.getenv('REGISTRY_POLL_SECONDS', 5))
+    
+    # Admission control for CPU-heavy endpoints: endpoint -> (max concurrent, max queued) per worker
+    ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'True').lower() == 'true'
+    ADMISSION_LIMITS = {
+        'train': (1, 1),
+        'predict': (2, 4),
+        'predict_batch': (1, 1),
+        'predict_roster': (2, 4),
+        'export_results': (1, 2),
+    }
+    ADMISSION_MAX_WAIT = float(os.getenv('ADMISSION_MAX_WAIT', 10))  # Seconds queued before a 503
+    # Heavy requests held per worker; unset means one less than the worker's threads, so the rest serve light endpoints
+    ADMISSION_MAX_TOTAL = int(os.getenv('ADMISSION_MAX_TOTAL', 0)) or None
+    
     # CORS settings
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:3000,http://localhost:5000').split(',')
     
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    
+    # Instrumentation
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'False').lower() == 'true'  # Or per request via X-Server-Timing: 1
+    
+    # On-demand request profiling (X-Profile header or ?profile=1)
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+    PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')  # When set, X-Profile must carry this token; reading profiles always needs it
+    PROFILE_FOLDER = os.path.join(os.path.dirname(__file__), 'data', 'profiles')
+    PROFILE_MAX_FILES = 50
+    PROFILABLE_ENDPOINTS = {'predict', 'train', 'chatbot'}
 
 
 class DevelopmentConfig(Config):
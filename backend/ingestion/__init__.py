@@ -0,0 +1,3 @@
+"""
+Ingestion package
+"""
@@ -0,0 +1,180 @@
+"""
+Excel Ingestion Module
+Streams xlsx workbooks into cached DataFrames so each sheet is parsed only once
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from ingestion.uploads import UploadError, write_metadata
+
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+try:
+    import xlrd  # noqa: F401
+    XLRD_AVAILABLE = True
+except ImportError:
+    XLRD_AVAILABLE = False
+
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+
+
+def is_excel(filename):
+    return filename.lower().endswith(EXCEL_EXTENSIONS)
+
+
+def manifest_path(path):
+    return path + '.sheets.json'
+
+
+def sheet_cache_path(path, index):
+    return f'{path}.sheet{index}.pkl'
+
+
+def remove_conversion(path):
+    """Delete the manifest and every sheet pickle written for a workbook"""
+    if os.path.exists(manifest_path(path)):
+        os.remove(manifest_path(path))
+    # Sheets are written in order from 0, so the first missing index ends them
+    index = 0
+    while os.path.exists(sheet_cache_path(path, index)):
+        os.remove(sheet_cache_path(path, index))
+        index += 1
+
+
+def _coerce_numeric(df):
+    for column in df.columns:
+        if df[column].dtype == object:
+            try:
+                df[column] = pd.to_numeric(df[column])
+            except (ValueError, TypeError):
+                pass
+    return df
+
+
+def _header(row):
+    names = []
+    for i, value in enumerate(row):
+        name = str(value).strip() if value is not None and str(value).strip() else f'column_{i + 1}'
+        while name in names:
+            name = f'{name}_{i + 1}'
+        names.append(name)
+    return names
+
+
+def iter_sheet_frames(worksheet, chunk_rows=10000):
+    """Yield DataFrames of at most chunk_rows rows from a read-only worksheet"""
+    header = None
+    rows = []
+    yielded = False
+    for row in worksheet.iter_rows(values_only=True):
+        if all(v is None for v in row):
+            continue
+        if header is None:
+            header = _header(row)
+            continue
+        rows.append(row[:len(header)] + (None,) * (len(header) - len(row)))
+        if len(rows) >= chunk_rows:
+            yield _coerce_numeric(pd.DataFrame.from_records(rows, columns=header))
+            yielded = True
+            rows = []
+    if header is not None and (rows or not yielded):
+        yield _coerce_numeric(pd.DataFrame.from_records(rows, columns=header))
+
+
+def _read_xlsx_sheets(path, chunk_rows):
+    if not OPENPYXL_AVAILABLE:
+        raise UploadError('Reading .xlsx files requires openpyxl')
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            frames = list(iter_sheet_frames(worksheet, chunk_rows))
+            if frames:
+                yield worksheet.title, _coerce_numeric(pd.concat(frames, ignore_index=True))
+    finally:
+        workbook.close()
+
+
+def _read_xls_sheets(path):
+    if not XLRD_AVAILABLE:
+        raise UploadError('Legacy .xls files need xlrd installed; save the sheet as .xlsx or CSV')
+    for name, df in pd.read_excel(path, sheet_name=None).items():
+        yield name, df
+
+
+def convert_workbook(path, chunk_rows=10000):
+    """Convert every sheet once into a pickled DataFrame next to the workbook"""
+    reader = _read_xls_sheets(path) if path.lower().endswith('.xls') else _read_xlsx_sheets(path, chunk_rows)
+    sheets = []
+    for index, (name, df) in enumerate(reader):
+        cache_path = sheet_cache_path(path, index)
+        df.to_pickle(cache_path)
+        sheets.append({'name': name, 'rows': len(df), 'columns': df.columns.tolist(), 'cache': os.path.basename(cache_path)})
+    if not sheets:
+        raise UploadError('Workbook has no data')
+    with open(manifest_path(path), 'w') as f:
+        json.dump({'sheets': sheets}, f)
+    return sheets
+
+
+def load_sheet(path, sheet=None):
+    """DataFrame for a sheet (by name or index, first by default) from the conversion cache"""
+    try:
+        with open(manifest_path(path)) as f:
+            sheets = json.load(f)['sheets']
+    except (OSError, ValueError):
+        sheets = convert_workbook(path)
+
+    if sheet is None:
+        entry = sheets[0]
+    elif isinstance(sheet, int) or str(sheet).isdigit():
+        if int(sheet) >= len(sheets):
+            raise UploadError(f'Sheet not found: {sheet}')
+        entry = sheets[int(sheet)]
+    else:
+        matches = [s for s in sheets if s['name'] == sheet]
+        if not matches:
+            raise UploadError(f'Sheet not found: {sheet}')
+        entry = matches[0]
+    return pd.read_pickle(os.path.join(os.path.dirname(path), entry['cache']))
+
+
+def save_workbook_upload(stream, filepath, chunk_size=1024 * 1024, preview_rows=5):
+    """Stream a workbook to disk, convert its sheets and return upload info for the first sheet"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(filepath, 'wb') as out:
+        for block in iter(lambda: stream.read(chunk_size), b''):
+            digest.update(block)
+            size += len(block)
+            out.write(block)
+    try:
+        sheets = convert_workbook(filepath)
+        df = load_sheet(filepath)
+    except Exception as e:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        remove_conversion(filepath)
+        if isinstance(e, UploadError):
+            raise
+        raise UploadError(f'Could not read workbook: {e}')
+
+    info = {
+        'rows': len(df),
+        'columns': len(df.columns),
+        'column_names': df.columns.tolist(),
+        'preview': df.head(preview_rows).to_dict('records'),
+        'sha256': digest.hexdigest(),
+        'size_bytes': size,
+        'sheets': [{'name': s['name'], 'rows': s['rows']} for s in sheets],
+    }
+    write_metadata(filepath, info)
+    return info
@@ -0,0 +1,271 @@
+"""
+Upload Ingestion Module
+Single-pass CSV upload handling: write to disk, hash, count rows and build the preview
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+
+UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadError(Exception):
+    pass
+
+
+class CSVStreamInspector:
+    """Consumes CSV bytes once, validating the header as soon as it arrives.
+
+    Row counting is by newline, so quoted fields containing line breaks are
+    counted as extra rows; the preview itself is parsed properly.
+    """
+
+    def __init__(self, preview_rows=5, max_head_bytes=1024 * 1024):
+        self.preview_rows = preview_rows
+        self.max_head_bytes = max_head_bytes
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.newlines = 0
+        self.last_byte = b''
+        self.head = bytearray()
+        self.head_complete = False
+        self.column_names = None
+
+    def update(self, chunk):
+        if not chunk:
+            return
+        self.sha256.update(chunk)
+        self.size += len(chunk)
+        self.newlines += chunk.count(b'\n')
+        self.last_byte = chunk[-1:]
+        if not self.head_complete:
+            self.head.extend(chunk)
+            if self.column_names is None and b'\n' in self.head:
+                self._validate_header(bytes(self.head.split(b'\n', 1)[0]))
+            if self.head.count(b'\n') > self.preview_rows or len(self.head) >= self.max_head_bytes:
+                self._trim_head()
+                self.head_complete = True
+
+    def _trim_head(self):
+        lines = bytes(self.head).split(b'\n')
+        self.head = bytearray(b'\n'.join(lines[:self.preview_rows + 1]) + b'\n')
+
+    def _validate_header(self, line):
+        if b'\x00' in line:
+            raise UploadError('File is not a text CSV')
+        try:
+            text = line.decode('utf-8-sig').strip('\r')
+        except UnicodeDecodeError:
+            raise UploadError('CSV header is not valid UTF-8')
+        columns = [c.strip() for c in next(csv.reader([text]))]
+        if not any(columns):
+            raise UploadError('CSV header is empty')
+        if len(set(columns)) != len(columns):
+            raise UploadError('CSV header has duplicate column names')
+        self.column_names = columns
+
+    def finalize(self):
+        if self.size == 0:
+            raise UploadError('File is empty')
+        if self.column_names is None:
+            # Single line file without a trailing newline
+            self._validate_header(bytes(self.head))
+        if not self.head_complete:
+            self._trim_head()
+        rows = self.newlines - 1 + (1 if self.last_byte != b'\n' else 0)
+        preview_df = pd.read_csv(io.BytesIO(bytes(self.head)), nrows=self.preview_rows)
+        return {
+            'rows': max(rows, 0),
+            'columns': len(preview_df.columns),
+            'column_names': preview_df.columns.tolist(),
+            'preview': preview_df.to_dict('records'),
+            'sha256': self.sha256.hexdigest(),
+            'size_bytes': self.size,
+        }
+
+
+def metadata_path(filepath):
+    return filepath + '.meta.json'
+
+
+def write_metadata(filepath, info):
+    with open(metadata_path(filepath), 'w') as f:
+        json.dump(info, f, default=str)
+
+
+def read_metadata(filepath):
+    try:
+        with open(metadata_path(filepath)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def stream_to_file(stream, filepath, inspector, chunk_size=1024 * 1024, mode='wb', max_bytes=None):
+    """Copy a readable stream to disk in chunks, feeding each chunk to the inspector"""
+    written = 0
+    with open(filepath, mode) as out:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            written += len(chunk)
+            if max_bytes is not None and inspector.size + len(chunk) > max_bytes:
+                raise UploadError('File too large')
+            inspector.update(chunk)
+            out.write(chunk)
+    return written
+
+
+def save_upload(stream, filepath, chunk_size=1024 * 1024, preview_rows=5):
+    """Stream an upload to filepath and return its row count, hash and preview"""
+    inspector = CSVStreamInspector(preview_rows=preview_rows)
+    try:
+        stream_to_file(stream, filepath, inspector, chunk_size)
+        info = inspector.finalize()
+    except Exception:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        raise
+    write_metadata(filepath, info)
+    return info
+
+
+class ResumableUploads:
+    """Chunked uploads appended at an explicit offset so clients can resume.
+
+    Session state lives in a JSON file next to the partial data, so another
+    worker (or a restarted server) can pick a session up; the in-memory
+    inspector is rebuilt from the partial file when it is missing or stale.
+    Sessions that receive no chunk for session_ttl seconds are swept when
+    the next session is created.
+    """
+
+    def __init__(self, upload_folder, chunk_size=1024 * 1024, max_bytes=None, preview_rows=5, session_ttl=None):
+        self.upload_folder = upload_folder
+        self.partial_folder = os.path.join(upload_folder, '.partial')
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.preview_rows = preview_rows
+        self.session_ttl = session_ttl
+        self._inspectors = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+        os.makedirs(self.partial_folder, exist_ok=True)
+
+    def _lock(self, upload_id):
+        with self._guard:
+            return self._locks.setdefault(upload_id, threading.RLock())
+
+    def _state_path(self, upload_id):
+        return os.path.join(self.partial_folder, f'{upload_id}.json')
+
+    def _data_path(self, upload_id):
+        return os.path.join(self.partial_folder, f'{upload_id}.part')
+
+    def create(self, filename):
+        if self.session_ttl is not None:
+            self.sweep()
+        upload_id = uuid.uuid4().hex
+        state = {'upload_id': upload_id, 'filename': filename, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        with open(self._state_path(upload_id), 'w') as f:
+            json.dump(state, f)
+        open(self._data_path(upload_id), 'wb').close()
+        self._inspectors[upload_id] = CSVStreamInspector(preview_rows=self.preview_rows)
+        return dict(state, offset=0)
+
+    def status(self, upload_id):
+        if not UPLOAD_ID.match(upload_id or ''):
+            return None
+        try:
+            with open(self._state_path(upload_id)) as f:
+                state = json.load(f)
+            state['offset'] = os.path.getsize(self._data_path(upload_id))
+        except (OSError, ValueError):
+            # Unknown, or aborted (possibly by another worker) while we looked
+            return None
+        return state
+
+    def sweep(self, now=None):
+        """Abort sessions whose files were last written more than session_ttl seconds ago; returns their ids"""
+        now = time.time() if now is None else now
+        last_written = {}
+        for name in os.listdir(self.partial_folder):
+            upload_id, _ = os.path.splitext(name)
+            try:
+                mtime = os.path.getmtime(os.path.join(self.partial_folder, name))
+            except OSError:
+                continue
+            last_written[upload_id] = max(mtime, last_written.get(upload_id, mtime))
+        expired = [upload_id for upload_id, mtime in last_written.items() if now - mtime > self.session_ttl]
+        for upload_id in expired:
+            self.abort(upload_id)
+        return expired
+
+    def _inspector(self, upload_id, offset):
+        inspector = self._inspectors.get(upload_id)
+        if inspector is None or inspector.size != offset:
+            inspector = CSVStreamInspector(preview_rows=self.preview_rows)
+            with open(self._data_path(upload_id), 'rb') as f:
+                for block in iter(lambda: f.read(self.chunk_size), b''):
+                    inspector.update(block)
+            self._inspectors[upload_id] = inspector
+        return inspector
+
+    def append(self, upload_id, offset, stream):
+        """Append a chunk that starts at offset; returns the new offset"""
+        with self._lock(upload_id):
+            state = self.status(upload_id)
+            if state is None:
+                raise KeyError(upload_id)
+            if offset != state['offset']:
+                raise UploadError(f"Offset mismatch: expected {state['offset']}")
+            inspector = self._inspector(upload_id, state['offset'])
+            try:
+                stream_to_file(stream, self._data_path(upload_id), inspector, self.chunk_size, mode='ab', max_bytes=self.max_bytes)
+            except UploadError:
+                self.abort(upload_id)
+                raise
+            if not os.path.exists(self._state_path(upload_id)):
+                # Aborted by another worker mid-chunk; drop the data file the append re-created
+                self.abort(upload_id)
+                raise KeyError(upload_id)
+            return inspector.size
+
+    def complete(self, upload_id, filepath):
+        with self._lock(upload_id):
+            state = self.status(upload_id)
+            if state is None:
+                raise KeyError(upload_id)
+            info = self._inspector(upload_id, state['offset']).finalize()
+            try:
+                os.replace(self._data_path(upload_id), filepath)
+            except FileNotFoundError:
+                raise KeyError(upload_id)
+            write_metadata(filepath, info)
+            self._cleanup(upload_id)
+            return info
+
+    def abort(self, upload_id):
+        with self._lock(upload_id):
+            for path in (self._data_path(upload_id), self._state_path(upload_id)):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._cleanup(upload_id)
+
+    def _cleanup(self, upload_id):
+        if os.path.exists(self._state_path(upload_id)):
+            os.remove(self._state_path(upload_id))
+        self._inspectors.pop(upload_id, None)
+        with self._guard:
+            self._locks.pop(upload_id, None)
@@ -0,0 +1,3 @@
+"""
+Monitoring package
+"""
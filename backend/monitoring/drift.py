@@ -0,0 +1,266 @@
+"""
+Drift Monitoring Module
+Mergeable per-feature sketches of training data and prediction batches, compared into drift scores
+"""
+
+import base64
+
+import numpy as np
+import pandas as pd
+
+
+HISTOGRAM_BINS = 10
+DIGEST_CENTROIDS = 64
+HLL_PRECISION = 10  # 1024 registers per feature, ~3% distinct-count error
+HLL_REGISTERS = 1 << HLL_PRECISION
+PSI_FLOOR = 1e-4
+PSI_MODERATE = 0.1
+PSI_DRIFT = 0.25
+
+
+def _compress(means, weights, size=DIGEST_CENTROIDS):
+    """Fold centroids sorted by mean into at most size centroids of about equal weight"""
+    if len(means) <= size:
+        return means, weights
+    cumulative = np.cumsum(weights)
+    bucket = np.minimum(((cumulative - weights / 2) / cumulative[-1] * size).astype(np.int64), size - 1)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    merged = np.add.reduceat(weights, starts)
+    return np.add.reduceat(means * weights, starts) / merged, merged
+
+
+def _merge_digests(a, b):
+    means = np.concatenate([a[0], b[0]])
+    order = np.argsort(means, kind='stable')
+    return _compress(means[order], np.concatenate([a[1], b[1]])[order])
+
+
+def _digest_sorted(column, size=DIGEST_CENTROIDS):
+    """Digest of an already sorted column: means of size equal-count slices"""
+    if len(column) <= size:
+        return column.copy(), np.ones(len(column))
+    starts = np.arange(size) * len(column) // size
+    weights = np.diff(np.r_[starts, len(column)]).astype(np.float64)
+    return np.add.reduceat(column, starts) / weights, weights
+
+
+def _hll_ranks(values):
+    """(register index, rank) of each value's 64-bit hash"""
+    x = (values + 0.0).view(np.uint64)  # + 0.0 folds -0.0 into 0.0
+    # MurmurHash3 finalizer, in place
+    for multiplier in (0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53):
+        x ^= x >> np.uint64(33)
+        x *= np.uint64(multiplier)
+    x ^= x >> np.uint64(33)
+    index = (x >> np.uint64(64 - HLL_PRECISION)).astype(np.intp)
+    # Rank = 1 + leading zeros of the low 52 bits (exact as float64)
+    x &= np.uint64((1 << 52) - 1)
+    return index, (53 - np.frexp(x.astype(np.float64))[1]).astype(np.uint8)
+
+
+def _hll_estimate(registers):
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=-1)
+    zeros = np.sum(registers == 0, axis=-1)
+    # Linear counting is more accurate while many registers are still empty
+    small = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), small, raw)
+
+
+def _matrix(X, feature_names=None):
+    if isinstance(X, pd.DataFrame):
+        names = feature_names or X.columns.tolist()
+        return names, X.reindex(columns=names).to_numpy(dtype=np.float64)
+    values = np.asarray(X, dtype=np.float64)
+    return feature_names or [f'feature_{i}' for i in range(values.shape[1])], values
+
+
+class DatasetSketch:
+    """Per-feature row, null, min/max and sum counters, a quantile digest, a
+    histogram and a HyperLogLog distinct counter.
+
+    Histogram edges are fixed when the sketch is created (from the training
+    data's range and deciles), so sketches with the same edges merge by adding
+    counts, digests by folding centroids and HyperLogLogs by register maxima.
+    No rows are kept.
+    """
+
+    def __init__(self, feature_names, edges):
+        n_features = len(feature_names)
+        self.feature_names = list(feature_names)
+        self.edges = [np.asarray(e, dtype=np.float64) for e in edges]
+        self.rows = 0
+        self.nulls = np.zeros(n_features, dtype=np.int64)
+        self.minimum = np.full(n_features, np.inf)
+        self.maximum = np.full(n_features, -np.inf)
+        self.total = np.zeros(n_features)
+        self.histograms = [np.zeros(len(e) + 1, dtype=np.int64) for e in self.edges]
+        self.digests = [(np.empty(0), np.empty(0)) for _ in range(n_features)]
+        self.registers = np.zeros((n_features, HLL_REGISTERS), dtype=np.uint8)
+
+    @classmethod
+    def for_data(cls, X, feature_names=None, bins=HISTOGRAM_BINS):
+        """Empty sketch with edges at X's minimum, quantiles and (just past) maximum.
+
+        Batch values below the first edge or from the last one on fall outside
+        the range the sketch was fit on.
+        """
+        names, values = _matrix(X, feature_names)
+        edges = []
+        for column in values.T:
+            column = column[~np.isnan(column)]
+            if not len(column):
+                edges.append([])
+                continue
+            inner = np.quantile(column, np.linspace(0, 1, bins + 1)[1:-1])
+            high = np.nextafter(column.max(), np.inf)
+            edges.append(np.unique(np.r_[column.min(), inner, high]))
+        return cls(names, edges)
+
+    def empty_like(self):
+        return DatasetSketch(self.feature_names, self.edges)
+
+    def update(self, X, nulls=None):
+        """Add a batch of rows in one pass.
+
+        nulls gives per-feature counts of values that were missing before
+        cleaning filled them in; NaNs still in X are counted either way.
+        """
+        _, values = _matrix(X, self.feature_names)
+        n = len(values)
+        if not n:
+            return self
+        missing = np.isnan(values).sum(axis=0)
+        self.rows += n
+        self.nulls += missing if nulls is None else np.maximum(missing, np.asarray(nulls, dtype=np.int64))
+        # One contiguous row per feature, sorted in place (NaNs last)
+        ordered = np.ascontiguousarray(values.T)
+        ordered.sort(axis=1)
+        for j, edges in enumerate(self.edges):
+            column = ordered[j, :n - missing[j]]
+            if not len(column):
+                continue
+            self.minimum[j] = min(self.minimum[j], column[0])
+            self.maximum[j] = max(self.maximum[j], column[-1])
+            self.total[j] += column.sum()
+            # Counts between edges straight from the sorted column
+            bounds = np.r_[0, np.searchsorted(column, edges, side='left'), len(column)]
+            self.histograms[j] += np.diff(bounds)
+            self.digests[j] = _merge_digests(self.digests[j], _digest_sorted(column))
+            index, ranks = _hll_ranks(column)
+            np.maximum.at(self.registers[j], index, ranks)
+        return self
+
+    def merge(self, other):
+        if other.feature_names != self.feature_names or any(
+                not np.array_equal(a, b) for a, b in zip(self.edges, other.edges)):
+            raise ValueError('Sketches with different features or histogram edges cannot be merged')
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.minimum = np.minimum(self.minimum, other.minimum)
+        self.maximum = np.maximum(self.maximum, other.maximum)
+        self.total += other.total
+        for j in range(len(self.feature_names)):
+            self.histograms[j] += other.histograms[j]
+            self.digests[j] = _merge_digests(self.digests[j], other.digests[j])
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def quantile(self, j, q):
+        means, weights = self.digests[j]
+        if not len(means):
+            return None
+        midpoints = np.cumsum(weights) - weights / 2
+        value = np.interp(q * weights.sum(), midpoints, means)
+        return float(min(max(value, self.minimum[j]), self.maximum[j]))
+
+    def deviation_median(self, j, center):
+        """Median absolute deviation from center, estimated from the digest"""
+        means, weights = self.digests[j]
+        if not len(means):
+            return None
+        deviations = np.abs(means - center)
+        order = np.argsort(deviations, kind='stable')
+        weights = weights[order]
+        return float(np.interp(weights.sum() / 2, np.cumsum(weights) - weights / 2, deviations[order]))
+
+    def distinct(self):
+        return _hll_estimate(self.registers)
+
+    def to_dict(self):
+        return {
+            'feature_names': self.feature_names,
+            'rows': self.rows,
+            'nulls': self.nulls.tolist(),
+            'minimum': self.minimum.tolist(),
+            'maximum': self.maximum.tolist(),
+            'total': self.total.tolist(),
+            'edges': [e.tolist() for e in self.edges],
+            'histograms': [h.tolist() for h in self.histograms],
+            'digests': [[means.tolist(), weights.tolist()] for means, weights in self.digests],
+            'registers': [base64.b64encode(r.tobytes()).decode() for r in self.registers],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['feature_names'], data['edges'])
+        sketch.rows = data['rows']
+        sketch.nulls = np.asarray(data['nulls'], dtype=np.int64)
+        sketch.minimum = np.asarray(data['minimum'], dtype=np.float64)
+        sketch.maximum = np.asarray(data['maximum'], dtype=np.float64)
+        sketch.total = np.asarray(data['total'], dtype=np.float64)
+        sketch.histograms = [np.asarray(h, dtype=np.int64) for h in data['histograms']]
+        sketch.digests = [(np.asarray(m, dtype=np.float64), np.asarray(w, dtype=np.float64)) for m, w in data['digests']]
+        sketch.registers = np.stack([np.frombuffer(base64.b64decode(r), dtype=np.uint8) for r in data['registers']]).copy()
+        return sketch
+
+
+def sketch_frame(X, nulls=None, reference=None):
+    """Sketch X with reference's edges, or with edges fit on X itself"""
+    sketch = reference.empty_like() if reference is not None else DatasetSketch.for_data(X)
+    return sketch.update(X, nulls)
+
+
+def feature_nulls(raw_nulls, feature_names):
+    """Per-feature missing counts from an upload's raw.isna().sum(), taken before cleaning"""
+    return raw_nulls.reindex(feature_names, fill_value=0).to_numpy(dtype=np.int64)
+
+
+def population_stability_index(expected, actual):
+    expected = np.maximum(expected / max(expected.sum(), 1), PSI_FLOOR)
+    actual = np.maximum(actual / max(actual.sum(), 1), PSI_FLOOR)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def drift_report(reference, batch):
+    """Per-feature drift of a batch sketch against the training sketch.
+
+    The drift score is the population stability index over the training
+    histogram bins (below 0.1 stable, 0.1-0.25 moderate, above 0.25 drifted).
+    """
+    reference_distinct = reference.distinct()
+    batch_distinct = batch.distinct()
+    features = {}
+    for j, name in enumerate(reference.feature_names):
+        histogram = batch.histograms[j]
+        counted = histogram.sum()
+        psi = population_stability_index(reference.histograms[j], histogram) if counted else None
+        features[name] = {
+            'psi': round(psi, 4) if psi is not None else None,
+            'status': 'no_data' if psi is None else 'drift' if psi > PSI_DRIFT else 'moderate' if psi > PSI_MODERATE else 'stable',
+            'null_rate': round(batch.nulls[j] / batch.rows, 4) if batch.rows else None,
+            'reference_null_rate': round(reference.nulls[j] / reference.rows, 4) if reference.rows else None,
+            'out_of_range': round((histogram[0] + histogram[-1]) / counted, 4) if counted else None,
+            'distinct': int(round(batch_distinct[j])),
+            'reference_distinct': int(round(reference_distinct[j])),
+            'median': batch.quantile(j, 0.5),
+            'reference_median': reference.quantile(j, 0.5),
+        }
+    scored = {name: f['psi'] for name, f in features.items() if f['psi'] is not None}
+    return {
+        'rows': batch.rows,
+        'max_psi': max(scored.values()) if scored else None,
+        'drifted_features': sorted((n for n, f in features.items() if f['status'] == 'drift'), key=lambda n: -scored[n]),
+        'features': features,
+    }
@@ -0,0 +1,217 @@
+"""
+Metrics Module
+Lightweight counters, gauges and histograms with Prometheus text exposition
+"""
+
+import bisect
+import functools
+import threading
+import time
+
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + list(extra or [])
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(_label_key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            items = list(self.values.items())
+        return [f'{self.name}{_format_labels(key)} {_format_value(value)}' for key, value in items]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self.values[_label_key(labels)] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                series['counts'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def get(self, **labels):
+        return self.series.get(_label_key(labels))
+
+    def render(self):
+        with self._lock:
+            items = [(key, dict(s, counts=list(s['counts']))) for key, s in self.series.items()]
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['counts']):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(key, [("le", _format_value(float(bound)))])} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(key, [("le", "+Inf")])} {series["count"]}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {_format_value(series["sum"])}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {series["count"]}')
+        return lines
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ('registry', 'stage', 'start')
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.record_stage(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """Holds all metrics; when disabled, timers are a shared no-op object"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.metrics = {}
+        self._local = threading.local()
+        self.stage_seconds = self.histogram('student_stage_duration_seconds', 'Time spent in each pipeline stage')
+
+    def _get_or_create(self, cls, name, help_text, **kwargs):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, help_text, **kwargs)
+        return metric
+
+    def counter(self, name, help_text=''):
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name, help_text=''):
+        return self._get_or_create(Gauge, name, help_text)
+
+    def histogram(self, name, help_text='', buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, buckets=buckets)
+
+    def timer(self, stage):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, stage)
+
+    def record_stage(self, stage, seconds):
+        self.stage_seconds.observe(seconds, stage=stage)
+        stages = getattr(self._local, 'stages', None)
+        if stages is not None:
+            stages.append((stage, seconds))
+
+    def start_request(self):
+        """Begin collecting stage timings for the current thread (for Server-Timing)"""
+        self._local.stages = []
+
+    def finish_request(self):
+        stages = getattr(self._local, 'stages', None)
+        self._local.stages = None
+        return stages or []
+
+    def render(self):
+        lines = []
+        for name in sorted(self.metrics):
+            metric = self.metrics[name]
+            body = metric.render()
+            if not body:
+                continue
+            if metric.help:
+                lines.append(f'# HELP {name} {metric.help}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            lines.extend(body)
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+def timer(stage):
+    return metrics.timer(stage)
+
+
+def timed(stage):
+    """Decorator form of timer(); the disabled path is a single attribute check"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            with _StageTimer(metrics, stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing_header(stages):
+    # Repeated stages (e.g. chunked loops) are summed into one entry
+    totals = {}
+    for stage, seconds in stages:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return ', '.join(f'{stage.replace(" ", "_")};dur={seconds * 1000:.2f}' for stage, seconds in totals.items())
@@ -0,0 +1,81 @@
+"""
+Profiling Module
+cProfile capture for individual requests, kept in a bounded on-disk ring
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+
+
+PROFILE_NAME = re.compile(r'^\d{8}_\d{6}_\d{6}_[a-z_]+_\d+ms\.prof$')
+
+
+class ProfileStore:
+    """Writes pstats files to a folder and deletes the oldest beyond max_profiles"""
+
+    def __init__(self, folder, max_profiles=50):
+        self.folder = folder
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def start(self):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def save(self, profiler, endpoint, duration):
+        profiler.disable()
+        os.makedirs(self.folder, exist_ok=True)
+        stamp = time.strftime('%Y%m%d_%H%M%S')
+        micros = int((time.time() % 1) * 1e6)
+        safe_endpoint = re.sub(r'[^a-z_]', '_', endpoint.lower())
+        name = f'{stamp}_{micros:06d}_{safe_endpoint}_{int(duration * 1000)}ms.prof'
+        profiler.dump_stats(os.path.join(self.folder, name))
+        self._evict()
+        return name
+
+    def _evict(self):
+        with self._lock:
+            names = sorted(n for n in os.listdir(self.folder) if PROFILE_NAME.match(n))
+            for name in names[:max(0, len(names) - self.max_profiles)]:
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except OSError:
+                    pass
+
+    def path_for(self, name):
+        if not PROFILE_NAME.match(name or ''):
+            return None
+        path = os.path.join(self.folder, name)
+        return path if os.path.exists(path) else None
+
+    def list(self):
+        if not os.path.isdir(self.folder):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.folder), reverse=True):
+            if not PROFILE_NAME.match(name):
+                continue
+            parts = name[:-len('.prof')].split('_')
+            path = os.path.join(self.folder, name)
+            profiles.append({
+                'name': name,
+                'endpoint': '_'.join(parts[3:-1]),
+                'duration_ms': int(parts[-1][:-2]),
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(os.path.getmtime(path))),
+                'size_bytes': os.path.getsize(path),
+            })
+        return profiles
+
+    def text_report(self, name, sort='cumulative', limit=40):
+        path = self.path_for(name)
+        if path is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
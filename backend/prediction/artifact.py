@@ -0,0 +1,181 @@
+"""
+Model Artifact Module
+Compact, memory-mappable on-disk format for random forest predictors
+"""
+
+import copy
+import json
+import pickle
+import struct
+
+import numpy as np
+from sklearn.tree._tree import NODE_DTYPE, Tree
+
+
+MAGIC = b'SPFOREST1\n'
+ALIGNMENT = 64
+
+
+def supports_compact(model):
+    return hasattr(model, 'estimators_') and all(hasattr(e, 'tree_') for e in getattr(model, 'estimators_', []))
+
+
+def is_compact_artifact(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def floor_float32(values):
+    """Largest float32 <= each value.
+
+    Trees compare float32 inputs against their thresholds, so for any float32
+    x, x <= t holds exactly when x <= floor_float32(t): the downcast never
+    changes which branch a sample takes.
+    """
+    down = np.asarray(values, dtype=np.float64).astype(np.float32)
+    over = down.astype(np.float64) > values
+    down[over] = np.nextafter(down[over], np.float32(-np.inf))
+    return down
+
+
+def _downcast_exact(values, dtype):
+    # Keep the original dtype unless the cast round-trips exactly
+    cast = values.astype(dtype)
+    return cast if np.array_equal(cast.astype(values.dtype), values) else values
+
+
+def _forest_arrays(forest):
+    trees = [estimator.tree_ for estimator in forest.estimators_]
+    states = [tree.__getstate__() for tree in trees]
+    nodes = np.concatenate([state['nodes'] for state in states])
+    values = np.concatenate([state['values'] for state in states])
+
+    weighted = nodes['weighted_n_node_samples']
+    arrays = {
+        'children_left': nodes['left_child'].astype(np.int32),
+        'children_right': nodes['right_child'].astype(np.int32),
+        'feature': _downcast_exact(nodes['feature'], np.int16),
+        'threshold': floor_float32(nodes['threshold']),
+        # Only feeds impurity-based importances, never a decision
+        'impurity': nodes['impurity'].astype(np.float32),
+        'n_node_samples': nodes['n_node_samples'].astype(np.int32),
+        'weighted_n_node_samples': _downcast_exact(weighted, np.float32),
+    }
+    if 'missing_go_to_left' in nodes.dtype.names:
+        arrays['missing_go_to_left'] = nodes['missing_go_to_left']
+
+    # Newer scikit-learn stores class fractions per node, older versions weighted
+    # counts. Bootstrapped counts are whole numbers, so they are kept as float32
+    # whenever the node values can be recomputed from them bit for bit.
+    counts = np.round(values * weighted[:, None, None])
+    value_kind = 'raw'
+    if np.array_equal(values, counts):
+        value_kind = 'counts'
+    elif np.array_equal(counts / weighted[:, None, None], values):
+        value_kind = 'fractions'
+    if value_kind == 'raw' or counts.max(initial=0) >= 2 ** 24:
+        value_kind, stored_values = 'raw', values
+    else:
+        stored_values = counts.astype(np.float32)
+    arrays['value'] = stored_values
+
+    structure = {
+        'node_counts': [int(state['node_count']) for state in states],
+        'max_depths': [int(state['max_depth']) for state in states],
+        'value_kind': value_kind,
+    }
+    return arrays, structure
+
+
+def _skeleton(forest):
+    """The forest with its tree arrays removed; small enough to pickle into the header"""
+    skeleton = copy.copy(forest)
+    estimators = []
+    for estimator in forest.estimators_:
+        estimator = copy.copy(estimator)
+        del estimator.tree_
+        estimators.append(estimator)
+    skeleton.estimators_ = estimators
+    return pickle.dumps(skeleton, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _pad(length):
+    return -length % ALIGNMENT
+
+
+def save_compact(path, model, metadata):
+    """Write header + aligned raw arrays; metadata must be JSON-serializable"""
+    arrays, structure = _forest_arrays(model)
+    skeleton = _skeleton(model)
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes + _pad(array.nbytes)
+    header = dict(metadata, format=1, skeleton_bytes=len(skeleton), arrays=layout, **structure)
+    header_bytes = json.dumps(header, sort_keys=True).encode()
+
+    with open(path, 'wb') as f:
+        prefix = MAGIC + struct.pack('<Q', len(header_bytes)) + header_bytes + skeleton
+        f.write(prefix + b'\0' * _pad(len(prefix)))
+        for array in arrays.values():
+            data = np.ascontiguousarray(array).tobytes()
+            f.write(data + b'\0' * _pad(len(data)))
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'Not a compact model artifact: {path}')
+        (length,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(length))
+        skeleton = f.read(header['skeleton_bytes'])
+    data_offset = len(MAGIC) + 8 + length + len(skeleton)
+    return header, skeleton, data_offset + _pad(data_offset)
+
+
+def map_arrays(path, header, data_offset):
+    """Read-only memory maps of every stored array"""
+    return {
+        name: np.memmap(path, dtype=np.dtype(spec['dtype']), mode='r',
+                        offset=data_offset + spec['offset'], shape=tuple(spec['shape']))
+        if int(np.prod(spec['shape'])) else np.zeros(spec['shape'], dtype=spec['dtype'])
+        for name, spec in header['arrays'].items()
+    }
+
+
+def load_compact(path):
+    """(forest, header): a regular scikit-learn forest rebuilt from the mapped arrays"""
+    header, skeleton, data_offset = read_header(path)
+    arrays = map_arrays(path, header, data_offset)
+    forest = pickle.loads(skeleton)
+
+    # One vectorized pass over all nodes; each Tree copies its slice on setstate
+    nodes = np.empty(len(arrays['children_left']), dtype=NODE_DTYPE)
+    fields = {
+        'left_child': 'children_left', 'right_child': 'children_right', 'feature': 'feature',
+        'threshold': 'threshold', 'impurity': 'impurity', 'n_node_samples': 'n_node_samples',
+        'weighted_n_node_samples': 'weighted_n_node_samples', 'missing_go_to_left': 'missing_go_to_left',
+    }
+    for field in NODE_DTYPE.names:
+        nodes[field] = arrays[fields[field]] if fields[field] in arrays else 0
+
+    values = np.asarray(arrays['value'], dtype=np.float64)
+    if header['value_kind'] == 'fractions':
+        values = values / nodes['weighted_n_node_samples'][:, None, None]
+
+    n_outputs = values.shape[1]
+    offset = 0
+    for estimator, node_count, max_depth in zip(forest.estimators_, header['node_counts'], header['max_depths']):
+        n_classes = np.atleast_1d(np.asarray(estimator.n_classes_, dtype=np.intp))
+        tree = Tree(estimator.n_features_in_, n_classes, n_outputs)
+        tree.__setstate__({
+            'max_depth': max_depth,
+            'node_count': node_count,
+            'nodes': nodes[offset:offset + node_count],
+            'values': values[offset:offset + node_count],
+        })
+        estimator.tree_ = tree
+        offset += node_count
+    return forest, header
@@ -0,0 +1,130 @@
+"""
+Feature Attribution Module
+Path-based per-feature contributions for Random Forest predictions
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from scipy import sparse
+
+
+# Built explainers keyed by model version; the node tables only depend on the
+# fitted forest, so they are reused across requests and predictor instances.
+_EXPLAINER_CACHE = OrderedDict()
+_EXPLAINER_CACHE_SIZE = 4
+_EXPLAINER_CACHE_LOCK = threading.Lock()
+
+
+class TreeContributionExplainer:
+    """Decomposes forest risk probabilities into bias + per-feature contributions.
+
+    Every split a sample passes through changes the class-1 probability from
+    the parent node to the child node; that change is credited to the feature
+    the parent split on. The per-node changes of all trees are stored in one
+    sparse (nodes x features) matrix, so a whole batch is explained with a
+    single decision_path call and one sparse product.
+    """
+
+    def __init__(self, forest, n_features):
+        self.forest = forest
+        self.n_features = n_features
+        classes = list(forest.classes_)
+        positive = classes.index(1) if 1 in classes else None
+
+        rows, cols, deltas, biases = [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            values = np.asarray(tree.value[:, 0, :], dtype=float)
+            totals = values.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1.0
+            if positive is None:
+                prob = np.zeros(tree.node_count)
+            else:
+                prob = values[:, positive] / totals[:, 0]
+
+            left = np.asarray(tree.children_left)
+            right = np.asarray(tree.children_right)
+            split_nodes = np.where(left >= 0)[0]
+            children = np.concatenate([left[split_nodes], right[split_nodes]])
+            parents = np.concatenate([split_nodes, split_nodes])
+
+            rows.append(children + offset)
+            cols.append(np.asarray(tree.feature)[parents])
+            deltas.append(prob[children] - prob[parents])
+            biases.append(prob[0])
+            offset += tree.node_count
+
+        self.n_trees = len(forest.estimators_)
+        self.bias = float(np.mean(biases))
+        self.node_contributions = sparse.csr_matrix(
+            (np.concatenate(deltas) / self.n_trees, (np.concatenate(rows), np.concatenate(cols))),
+            shape=(offset, n_features)
+        )
+
+    def contributions(self, X):
+        indicator, _ = self.forest.decision_path(X)
+        return np.asarray((indicator @ self.node_contributions).todense())
+
+
+def supports_attribution(model):
+    return hasattr(model, 'estimators_') and hasattr(model, 'decision_path')
+
+
+def get_explainer(model, n_features, version=None):
+    key = version or id(model)
+
+    def cached():
+        explainer = _EXPLAINER_CACHE.get(key)
+        if explainer is None or (version is None and explainer.forest is not model):
+            return None
+        _EXPLAINER_CACHE.move_to_end(key)
+        return explainer
+
+    with _EXPLAINER_CACHE_LOCK:
+        explainer = cached()
+    if explainer is not None:
+        return explainer
+    # Built outside the lock so other models' lookups are not blocked meanwhile
+    built = TreeContributionExplainer(model, n_features)
+    with _EXPLAINER_CACHE_LOCK:
+        # Another thread may have cached the same model while this one was building
+        explainer = cached()
+        if explainer is None:
+            explainer = _EXPLAINER_CACHE[key] = built
+            while len(_EXPLAINER_CACHE) > _EXPLAINER_CACHE_SIZE:
+                _EXPLAINER_CACHE.popitem(last=False)
+    return explainer
+
+
+def compute_contributions(explainer, X, time_budget=None, chunk_size=2048):
+    """Explain rows in chunks until done or the time budget (seconds) runs out.
+
+    Returns an array for the leading rows that were explained; callers fall
+    back to rule-based explanations for any rows beyond it.
+    """
+    start = time.perf_counter()
+    chunks = []
+    for begin in range(0, len(X), chunk_size):
+        chunks.append(explainer.contributions(X[begin:begin + chunk_size]))
+        if time_budget is not None and time.perf_counter() - start > time_budget:
+            break
+    if not chunks:
+        return np.zeros((0, explainer.n_features))
+    return np.vstack(chunks)
+
+
+def top_contributions(values, feature_names, top_k=3):
+    """Largest risk-increasing contributions per row as [(feature, contribution), ...]"""
+    if len(values) == 0:
+        return []
+    k = min(top_k, values.shape[1])
+    order = np.argsort(-values, axis=1)[:, :k]
+    top_values = np.take_along_axis(values, order, axis=1)
+    return [
+        [(feature_names[j], float(v)) for j, v in zip(row_order, row_values) if v > 0]
+        for row_order, row_values in zip(order, top_values)
+    ]
@@ -0,0 +1,189 @@
+"""
+Batch Prediction Module
+Scores many uploaded files at once by fanning them out over a process pool
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from prediction.predictor import StudentPredictor
+from prediction.pipeline import score_chunk, score_file
+from prediction.explainability import summarize_results
+from prediction.shared_arrays import SharedArray
+from preprocessing.history import HistoryStore
+from ingestion.uploads import UploadError
+from monitoring.metrics import timer
+
+
+# Predictors loaded inside a pool worker, keyed by model file path. Registry
+# versions never change on disk, so a worker loads each version only once.
+_WORKER_PREDICTORS = {}
+_HISTORY_STORES = {}
+
+
+def _worker_predictor(model_type, model_path, version):
+    predictor = _WORKER_PREDICTORS.get(model_path)
+    if predictor is None or predictor.version != version:
+        predictor = StudentPredictor(model_type)
+        predictor.load_model(model_path, mmap_mode='r' if model_type == 'random_forest' else None)
+        predictor.version = version
+        _WORKER_PREDICTORS[model_path] = predictor
+    return predictor
+
+
+def _history_store(history):
+    # history is (db path, window) so it can be sent to workers, which open their own connection
+    if history is None:
+        return None
+    store = _HISTORY_STORES.get(history)
+    if store is None:
+        store = _HISTORY_STORES[history] = HistoryStore(*history)
+    return store
+
+
+def _score_file_task(model_type, model_path, version, filepath, sheet, explain_budget, top_k, history, history_scope):
+    predictor = _worker_predictor(model_type, model_path, version)
+    return _score_one(predictor, filepath, sheet, explain_budget, top_k, history, history_scope)
+
+
+def _score_chunk_task(model_type, model_path, version, df, cleaning_state, explain_top_k):
+    predictor = _worker_predictor(model_type, model_path, version)
+    return score_chunk(predictor, df, cleaning_state, explain_top_k)
+
+
+def _predict_rows_task(model_type, model_path, version, x_spec, pred_spec, prob_spec, begin, end):
+    predictor = _worker_predictor(model_type, model_path, version)
+    X, predictions, probabilities = (SharedArray.attach(spec) for spec in (x_spec, pred_spec, prob_spec))
+    try:
+        rows = X.array[begin:end]
+        predictions.array[begin:end] = predictor.model.predict(rows)
+        probabilities.array[begin:end] = predictor.model.predict_proba(rows)
+    finally:
+        for shared in (X, predictions, probabilities):
+            shared.close()
+    return end - begin
+
+
+def _score_one(predictor, filepath, sheet, explain_budget, top_k, history=None, history_scope=None):
+    start = time.perf_counter()
+    try:
+        scored = score_file(predictor, filepath, sheet, explain_budget, top_k, _history_store(history), history_scope)
+    except UploadError as e:
+        return {'error': str(e)}
+    except Exception as e:
+        # One unreadable class file should not fail the rest of the batch
+        return {'error': f'Could not score file: {e}'}
+    scored['seconds'] = round(time.perf_counter() - start, 4)
+    return scored
+
+
+def combine_summaries(file_results):
+    """District summary over every student in the files that scored successfully"""
+    results = [r for file_result in file_results if 'results' in file_result for r in file_result['results']]
+    if not results:
+        return None
+    return summarize_results(results)
+
+
+class BatchScorer:
+    """Process pool for multi-file prediction.
+
+    Workers are spawned rather than forked so the pool is safe to start from a
+    threaded web server, and each worker memory-maps the model file itself
+    instead of receiving a pickled copy per task. Files are scored inline when
+    there is only one, the pool is limited to one worker, or the predictor has
+    no file on disk (e.g. trained in this process).
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def score(self, predictor, model_path, filepaths, sheet=None, explain_budget=None, top_k=3, history=None,
+              history_scope=None):
+        """Per-file results in input order; each is {results, summary, ...} or {error}.
+
+        history is an optional (path, window) for the student history store,
+        used for files when history_scope names the class they belong to.
+        """
+        if len(filepaths) <= 1 or self.max_workers <= 1 or not model_path:
+            return [_score_one(predictor, path, sheet, explain_budget, top_k, history, history_scope) for path in filepaths]
+
+        executor = self._get_executor()
+        futures = [
+            executor.submit(_score_file_task, predictor.model_type, model_path, predictor.version,
+                            path, sheet, explain_budget, top_k, history, history_scope)
+            for path in filepaths
+        ]
+        return [future.result() for future in futures]
+
+    def predict(self, predictor, model_path, X, backend='shm', folder=None, min_rows=50000, chunk_rows=20000):
+        """Same output as predictor.predict, with large matrices scored by the pool.
+
+        The aligned feature matrix is copied once into shared memory (or a
+        memmap file in folder) and workers score row ranges from it in place,
+        writing into shared prediction/probability arrays.
+        """
+        X = predictor.align_features(X)
+        if len(X) < min_rows or self.max_workers <= 1 or not model_path:
+            return predictor.predict(X)
+
+        classes = predictor.model.classes_
+        n_parts = max(self.max_workers, -(-len(X) // chunk_rows))
+        bounds = np.linspace(0, len(X), n_parts + 1).astype(int)
+        executor = self._get_executor()
+        with timer('predict'), SharedArray.from_array(np.ascontiguousarray(X, dtype=np.float64), backend, folder) as shared_x, \
+                SharedArray.create((len(X),), classes.dtype, backend, folder) as predictions, \
+                SharedArray.create((len(X), len(classes)), np.float64, backend, folder) as probabilities:
+            futures = [
+                executor.submit(_predict_rows_task, predictor.model_type, model_path, predictor.version,
+                                shared_x.spec, predictions.spec, probabilities.spec, begin, end)
+                for begin, end in zip(bounds[:-1], bounds[1:]) if end > begin
+            ]
+            for future in futures:
+                future.result()
+            return predictions.array.copy(), probabilities.array.copy()
+
+    def score_chunks(self, predictor, model_path, chunks, cleaning_state, explain_top_k=0, max_pending=None):
+        """Yield score_chunk results for an iterable of DataFrames, in input order.
+
+        At most max_pending chunks (twice the pool size by default) are in
+        flight, so a file larger than memory streams through the pool.
+        """
+        if self.max_workers <= 1 or not model_path:
+            for df in chunks:
+                yield score_chunk(predictor, df, cleaning_state, explain_top_k)
+            return
+
+        executor = self._get_executor()
+        limit = max_pending or 2 * self.max_workers
+        pending = deque()
+        for df in chunks:
+            pending.append(executor.submit(_score_chunk_task, predictor.model_type, model_path, predictor.version,
+                                           df, cleaning_state, explain_top_k))
+            if len(pending) >= limit:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
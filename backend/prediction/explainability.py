@@ -1,12 +1,54 @@
 import pandas as pd
 
 
-def explain_prediction(student_data, prediction_result):
+# Keyword -> recommendation for features surfaced by model attribution
+FEATURE_RECOMMENDATIONS = [
+    ('attendance', "Improve attendance to at least 75%"),
+    ('assignment', "Complete and submit all assignments on time"),
+    ('participation', "Participate more actively in class discussions"),
+    ('improvement', "Review recent topics where marks have dropped"),
+    ('previous', "Seek tutoring or extra help to improve grades"),
+    ('mark', "Focus on understanding core concepts"),
+    ('score', "Focus on understanding core concepts"),
+    ('study', "Increase study hours to at least 10 hours per week"),
+]
+
+
+def recommendation_for_feature(feature):
+    name = feature.lower()
+    for keyword, recommendation in FEATURE_RECOMMENDATIONS:
+        if keyword in name:
+            return recommendation
+    return f"Review {feature.replace('_', ' ')} with the student"
+
+
+def explain_from_contributions(student_data, contributions):
+    """Risk factors and recommendations from the features that pushed the risk up"""
+    risk_factors = []
+    recommendations = []
+    for feature, contribution in contributions:
+        value = student_data.get(feature)
+        label = feature.replace('_', ' ')
+        if isinstance(value, (int, float)):
+            risk_factors.append(f"{label} of {value:.1f} (+{contribution:.1%} risk)")
+        else:
+            risk_factors.append(f"{label} (+{contribution:.1%} risk)")
+        recommendation = recommendation_for_feature(feature)
+        if recommendation not in recommendations:
+            recommendations.append(recommendation)
+    return risk_factors, recommendations
+
+
+def explain_prediction(student_data, prediction_result, contributions=None):
     if isinstance(student_data, pd.Series):
         student_data = student_data.to_dict()
     is_at_risk = prediction_result['is_at_risk']
     risk_probability = prediction_result['risk_probability']
 
+    if contributions:
+        risk_factors, recommendations = explain_from_contributions(student_data, contributions)
+        return _build_explanation(is_at_risk, risk_probability, risk_factors, recommendations)
+
     risk_factors = []
     recommendations = []
 
@@ -46,6 +88,10 @@ def explain_prediction(student_data, prediction_result):
             risk_factors.append(f"High failure rate ({failure_rate:.1f}%)")
             recommendations.append("Focus on improving performance in failing subjects")
 
+    return _build_explanation(is_at_risk, risk_probability, risk_factors, recommendations)
+
+
+def _build_explanation(is_at_risk, risk_probability, risk_factors, recommendations):
     if is_at_risk:
         if risk_factors:
             explanation = f"Student is at risk (confidence: {risk_probability:.1%}). Main concerns: " + ", ".join(risk_factors[:3])
@@ -67,3 +113,31 @@ def generate_class_summary(predictions, student_ids=None):
     low_risk = total_students - high_risk - medium_risk
     summary = {'total_students': total_students, 'at_risk_count': at_risk_count, 'at_risk_percentage': (at_risk_count / total_students * 100) if total_students > 0 else 0, 'average_risk': avg_risk, 'high_risk_count': high_risk, 'medium_risk_count': medium_risk, 'low_risk_count': low_risk}
     return summary
+
+
+def explain_batch(df, student_ids, predictions, probabilities, top_features=None):
+    """Per-student result rows for a scored batch, as returned by /api/predict"""
+    top_features = top_features or []
+    results = []
+    for i, student_data in enumerate(df.to_dict('records')):
+        pred = {
+            'prediction': int(predictions[i]),
+            'is_at_risk': bool(predictions[i] == 1),
+            'risk_probability': float(probabilities[i][1])
+        }
+        explanation = explain_prediction(student_data, pred, top_features[i] if i < len(top_features) else None)
+        results.append({
+            'student_id': student_ids[i],
+            'at_risk': 'Yes' if pred['is_at_risk'] else 'No',
+            'risk_probability': round(pred['risk_probability'] * 100, 2),
+            'risk_level': explanation['risk_level'],
+            'explanation': explanation['explanation'],
+            'risk_factors': explanation['risk_factors'],
+            'recommendations': explanation['recommendations']
+        })
+    return results
+
+
+def summarize_results(results, student_ids=None):
+    pred_list = [{'is_at_risk': r['at_risk'] == 'Yes', 'risk_probability': r['risk_probability'] / 100} for r in results]
+    return generate_class_summary(pred_list, student_ids)
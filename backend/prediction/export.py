@@ -0,0 +1,129 @@
+"""
+Export Module
+Streams the scored results of an upload as CSV or Parquet, one chunk at a time
+"""
+
+import pandas as pd
+
+from preprocessing.data_cleaning import DataCleaner, id_column
+from preprocessing.feature_selection import add_history_features, create_new_features, prepare_for_training
+from prediction.offline import PYARROW_AVAILABLE, iter_chunks, with_student_ids
+from prediction.pipeline import score_with_cache
+from ingestion.excel import is_excel
+
+if PYARROW_AVAILABLE:
+    import pyarrow
+    import pyarrow.parquet as pq
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+}
+EXPORT_COLUMNS = ['student_id', 'at_risk', 'risk_probability', 'risk_level', 'explanation', 'risk_factors', 'recommendations']
+
+
+def check_format(export_format):
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format} (use {' or '.join(EXPORT_FORMATS)})")
+    if export_format == 'parquet' and not PYARROW_AVAILABLE:
+        raise ValueError('Parquet export needs pyarrow installed')
+
+
+def upload_chunks(filepath, chunk_rows, sheet=None):
+    """Raw DataFrames of an upload, at most chunk_rows rows each"""
+    if not is_excel(filepath):
+        yield from iter_chunks(filepath, chunk_rows)
+        return
+    # Sheets are cached as parsed frames on upload, so they are already in memory
+    df = DataCleaner().load_data(filepath, sheet)
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def results_frame(results):
+    df = pd.DataFrame(results, columns=EXPORT_COLUMNS)
+    for column in ('risk_factors', 'recommendations'):
+        df[column] = df[column].map('; '.join)
+    return df
+
+
+def scored_chunks(predictor, filepath, chunk_rows, cache=None, history=None, sheet=None, top_k=3, history_scope=None):
+    """Result frames for an upload, one per chunk.
+
+    A first pass over the upload fits fill values and categories on the
+    whole file, so every chunk is cleaned as /api/predict cleans the file.
+    Rows whose features are already in the result cache for this model
+    version (e.g. from /api/predict) are read from it; the rest are scored
+    and explained here. History features (for a history_scope) are looked
+    up, never recorded.
+    """
+    state = DataCleaner().fit_cleaning_state_chunks(upload_chunks(filepath, chunk_rows, sheet), predictor.feature_names)
+    offset = 0
+    for df in upload_chunks(filepath, chunk_rows, sheet):
+        keyed = id_column(df) is not None
+        df = with_student_ids(df.reset_index(drop=True), offset)
+        offset += len(df)
+        student_ids = df[id_column(df)].tolist()
+        features = create_new_features(DataCleaner().apply_cleaning_state(df, state))
+        if history is not None and history_scope and keyed:
+            features = add_history_features(features, history.window_features(student_ids, history_scope))
+        X_pred, _ = prepare_for_training(features, 'at_risk')
+        results, _, _ = score_with_cache(cache, predictor, X_pred, features, student_ids, predictor.predict, None, top_k)
+        yield results_frame(results)
+
+
+def csv_stream(frames):
+    header = True
+    for df in frames:
+        yield df.to_csv(index=False, header=header).encode()
+        header = False
+
+
+class _StreamSink:
+    """Write-only file object whose bytes are handed out as they are written"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def parquet_stream(frames):
+    """One row group per frame; the footer follows the last one"""
+    sink = _StreamSink()
+    writer = None
+    try:
+        for df in frames:
+            table = pyarrow.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(sink, table.schema)
+            writer.write_table(table.cast(writer.schema))
+            yield sink.drain()
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.drain()
+
+
+def export_stream(frames, export_format):
+    return csv_stream(frames) if export_format == 'csv' else parquet_stream(frames)
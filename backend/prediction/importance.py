@@ -0,0 +1,133 @@
+"""
+Feature Importance Module
+Global importances computed once per model version and stored beside the model
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+from sklearn.inspection import permutation_importance
+
+
+logger = logging.getLogger(__name__)
+
+
+def needs_evaluation_data(predictor):
+    return not hasattr(predictor.model, 'feature_importances_')
+
+
+def sample_rows(X, y, max_rows=2000, random_state=42):
+    """At most max_rows aligned feature rows and their labels"""
+    y = np.asarray(y)
+    if len(X) > max_rows:
+        rows = np.random.RandomState(random_state).choice(len(X), max_rows, replace=False)
+        X = X.iloc[rows] if hasattr(X, 'iloc') else X[rows]
+        y = y[rows]
+    return X, y
+
+
+def compute_importance(predictor, X=None, y=None, n_repeats=5, max_rows=2000, random_state=42):
+    """Impurity importances for random forest, permutation importances otherwise.
+
+    X and y must be rows the model was not fit on (e.g. the training holdout),
+    or the permutation scores only measure how well it memorized them.
+    """
+    feature_names = predictor.feature_names or []
+    if not needs_evaluation_data(predictor):
+        method = 'impurity'
+        means = np.asarray(predictor.model.feature_importances_, dtype=float)
+        stds = np.zeros_like(means)
+    else:
+        if X is None or y is None:
+            raise ValueError('Permutation importance needs held-out evaluation data')
+        method = 'permutation'
+        X, y = sample_rows(X, y, max_rows, random_state)
+        X = predictor.align_features(X.copy() if hasattr(X, 'copy') else X)
+        result = permutation_importance(predictor.model, X, y, n_repeats=n_repeats, random_state=random_state)
+        means, stds = result.importances_mean, result.importances_std
+
+    if not feature_names:
+        feature_names = [f'feature_{i}' for i in range(len(means))]
+    features = [
+        {'feature': name, 'importance': float(mean), 'std': float(std)}
+        for name, mean, std in zip(feature_names, means, stds)
+    ]
+    features.sort(key=lambda f: f['importance'], reverse=True)
+    return {
+        'version': predictor.version,
+        'model_type': predictor.model_type,
+        'method': method,
+        'computed_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'features': features,
+    }
+
+
+class ImportanceJobRunner:
+    """Computes importances off the request path and writes them to the registry.
+
+    Permutation importances re-score the model many times, so they run in a
+    spawned worker process rather than competing with requests for the web
+    process's GIL; a thread waits for the result and saves it.
+    """
+
+    def __init__(self, registry, max_workers=1, n_repeats=5, max_rows=2000):
+        self.registry = registry
+        self.n_repeats = n_repeats
+        self.max_rows = max_rows
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='importance')
+        self.max_workers = max_workers
+        self._pool = None
+        self.status = {}
+        self._lock = threading.Lock()
+
+    def _process_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def submit(self, predictor, X=None, y=None):
+        """Queue the job; models without native importances or held-out rows are marked unavailable"""
+        version = predictor.version
+        if self.registry.load_importance(version) is not None:
+            return None
+        with self._lock:
+            if self.status.get(version) == 'pending':
+                return None
+            if needs_evaluation_data(predictor) and (X is None or y is None):
+                self.status[version] = 'unavailable'
+                return None
+            self.status[version] = 'pending'
+        return self.executor.submit(self._run, predictor, X, y)
+
+    def _run(self, predictor, X, y):
+        try:
+            if needs_evaluation_data(predictor):
+                # Only the sampled rows are sent to the worker
+                X, y = sample_rows(X, y, self.max_rows)
+                payload = self._process_pool().submit(
+                    compute_importance, predictor, X, y, n_repeats=self.n_repeats, max_rows=self.max_rows
+                ).result()
+            else:
+                payload = compute_importance(predictor, X, y, n_repeats=self.n_repeats, max_rows=self.max_rows)
+            self.registry.save_importance(predictor.version, payload)
+            state = 'done'
+        except Exception:
+            logger.exception('Feature importance for %s model %s failed', predictor.model_type, predictor.version)
+            state = 'failed'
+        with self._lock:
+            self.status[predictor.version] = state
+
+    def get_status(self, version):
+        with self._lock:
+            return self.status.get(version)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
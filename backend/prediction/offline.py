@@ -0,0 +1,187 @@
+"""
+Offline Scoring Module
+Streams a large CSV or Parquet file through the scoring pipeline into a result file that can be resumed
+"""
+
+import itertools
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from preprocessing.data_cleaning import DataCleaner, id_column
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+
+def file_format(path):
+    if path.lower().endswith(PARQUET_EXTENSIONS):
+        if not PYARROW_AVAILABLE:
+            raise ValueError('Parquet files need pyarrow installed')
+        return 'parquet'
+    if path.lower().endswith('.csv'):
+        return 'csv'
+    raise ValueError(f'Unsupported file type: {path} (use .csv or .parquet)')
+
+
+def progress_path(output_path):
+    return output_path.rstrip(os.sep) + '.progress.json'
+
+
+def iter_chunks(path, chunk_rows, skip_rows=0):
+    """DataFrames of at most chunk_rows rows, starting after the first skip_rows data rows"""
+    if file_format(path) == 'csv':
+        skip = range(1, skip_rows + 1) if skip_rows else None
+        yield from pd.read_csv(path, chunksize=chunk_rows, skiprows=skip)
+        return
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+        if skip_rows >= batch.num_rows:
+            skip_rows -= batch.num_rows
+            continue
+        yield batch.slice(skip_rows).to_pandas()
+        skip_rows = 0
+
+
+def with_student_ids(df, offset):
+    # Files without an id column get row numbers counted across the whole file
+    if id_column(df) is None:
+        df.insert(0, 'student_id', range(offset + 1, offset + len(df) + 1))
+    return df
+
+
+class CsvResultWriter:
+    """Appends result chunks to one CSV; position is the byte length of complete chunks"""
+
+    def __init__(self, path, position=0):
+        self.path = path
+        self.file = open(path, 'r+b' if position else 'wb')
+        # Drop any partial chunk written after the last recorded position
+        self.file.truncate(position)
+        self.file.seek(position)
+        self.position = position
+
+    def write(self, df):
+        self.file.write(df.to_csv(index=False, header=self.position == 0).encode())
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.position = self.file.tell()
+        return self.position
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetResultWriter:
+    """Writes each result chunk as a part file in a dataset directory; position is the part count"""
+
+    def __init__(self, path, position=0):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            # Parts past the recorded position (and unfinished .tmp files) are from the interrupted run
+            if name.startswith('part-') and (name.endswith('.tmp') or int(name[5:10]) >= position):
+                os.remove(os.path.join(path, name))
+        self.position = position
+
+    def write(self, df):
+        target = os.path.join(self.path, f'part-{self.position:05d}.parquet')
+        pq.write_table(pyarrow.Table.from_pandas(df, preserve_index=False), target + '.tmp')
+        os.replace(target + '.tmp', target)
+        self.position += 1
+        return self.position
+
+    def close(self):
+        pass
+
+
+def _save_progress(path, progress):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(progress, f, indent=2, default=lambda value: value.item())
+    os.replace(tmp_path, path)
+
+
+def _load_progress(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def score_to_file(scorer, predictor, model_path, input_path, output_path, chunk_rows=50000,
+                  explain_top_k=0, resume=True, on_chunk=None):
+    """Score input_path chunk by chunk through scorer's pool into output_path.
+
+    Progress (rows written, output position and the cleaning state fit on the
+    whole file) is saved after every chunk to <output>.progress.json, so an
+    interrupted run resumes where it stopped and produces the same file as an
+    uninterrupted one. on_chunk(rows_done, rows_per_s) is called after each
+    chunk. Returns a report with the throughput of this run.
+    """
+    file_format(input_path)
+    job = {
+        'input': os.path.abspath(input_path),
+        'input_bytes': os.path.getsize(input_path),
+        'model_version': predictor.version,
+        'format': file_format(output_path),
+        'explain_top_k': explain_top_k,
+    }
+    manifest_path = progress_path(output_path)
+    progress = _load_progress(manifest_path) if resume else None
+    if progress is not None and any(progress.get(key) != value for key, value in job.items()):
+        raise ValueError(f'{manifest_path} belongs to a different input, model or output format; restart the job')
+
+    resumed_from = progress['rows_done'] if progress else 0
+    report = {'output': output_path, 'resumed_from': resumed_from}
+    if progress is not None and progress['complete']:
+        return dict(report, rows=progress['rows_done'], rows_this_run=0, seconds=0.0, rows_per_s=None)
+
+    if progress is None:
+        # A first pass fits fill values on the whole file, so chunks are cleaned as the whole file would be
+        scan = iter_chunks(input_path, chunk_rows)
+        first = next(scan, None)
+        if first is None:
+            raise ValueError('Input file has no rows')
+        # Text columns the model never sees (e.g. names) would only bloat the progress file
+        state = DataCleaner().fit_cleaning_state_chunks(itertools.chain([first], scan), predictor.feature_names)
+        progress = dict(job, cleaning_state=state, rows_done=0, position=0, complete=False)
+    chunks = iter_chunks(input_path, chunk_rows, skip_rows=resumed_from)
+
+    def numbered(chunks, offset):
+        for df in chunks:
+            yield with_student_ids(df, offset)
+            offset += len(df)
+
+    writer_class = CsvResultWriter if job['format'] == 'csv' else ParquetResultWriter
+    writer = writer_class(output_path, progress['position'])
+    start = time.perf_counter()
+    try:
+        results = scorer.score_chunks(predictor, model_path, numbered(chunks, resumed_from),
+                                      progress['cleaning_state'], explain_top_k)
+        for result in results:
+            progress['position'] = writer.write(result)
+            progress['rows_done'] += len(result)
+            _save_progress(manifest_path, progress)
+            if on_chunk is not None:
+                elapsed = time.perf_counter() - start
+                on_chunk(progress['rows_done'], (progress['rows_done'] - resumed_from) / elapsed if elapsed else None)
+    finally:
+        writer.close()
+
+    progress['complete'] = True
+    _save_progress(manifest_path, progress)
+    seconds = time.perf_counter() - start
+    rows_this_run = progress['rows_done'] - resumed_from
+    return dict(report, rows=progress['rows_done'], rows_this_run=rows_this_run, seconds=round(seconds, 3),
+                rows_per_s=round(rows_this_run / seconds, 1) if seconds else None)
@@ -0,0 +1,220 @@
+"""
+Out-of-Core Training Module
+Trains on files larger than memory from a stratified reservoir sample, with streaming holdout metrics
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from preprocessing.data_cleaning import DataCleaner
+from preprocessing.feature_selection import create_new_features, create_risk_labels, prepare_for_training
+from prediction.offline import iter_chunks
+from monitoring.drift import DatasetSketch, feature_nulls
+from monitoring.metrics import timed
+
+
+SAMPLE_BUDGET_SHARE = 0.5  # Sample and model fit; the rest is for the chunk being processed
+CHUNK_MEMORY_FACTOR = 12  # Parsing, cleaning and feature copies of a chunk peak at ~12x its DataFrame size
+PROBE_ROWS = 1000
+
+
+class ReservoirSample:
+    """Uniform sample of at most capacity rows from a stream (Algorithm R, one chunk at a time)"""
+
+    def __init__(self, capacity, n_features, rng):
+        self.capacity = capacity
+        self.rng = rng
+        self.rows = np.empty((capacity, n_features), dtype=np.float64)
+        self.size = 0
+        self.seen = 0
+
+    def add(self, X):
+        n = len(X)
+        fill = min(self.capacity - self.size, n)
+        if fill:
+            self.rows[self.size:self.size + fill] = X[:fill]
+            self.size += fill
+        rest = X[fill:]
+        if len(rest):
+            # Row t of the stream (1-based) replaces a random slot with probability capacity / t
+            t = self.seen + fill + np.arange(1, len(rest) + 1)
+            slots = (self.rng.random(len(rest)) * t).astype(np.int64)
+            keep = np.flatnonzero(slots < self.capacity)
+            # A later row replacing the same slot wins, as it would row by row
+            _, last = np.unique(slots[keep][::-1], return_index=True)
+            chosen = keep[len(keep) - 1 - last]
+            self.rows[slots[chosen]] = rest[chosen]
+        self.seen += n
+
+    def take(self, n):
+        rows = self.rng.choice(self.size, size=n, replace=False)
+        return self.rows[np.sort(rows)]
+
+
+class StratifiedReservoir:
+    """One reservoir per class, drawn down to the classes' stream proportions at the end"""
+
+    def __init__(self, capacity, n_features, rng):
+        self.capacity = capacity
+        self.n_features = n_features
+        self.rng = rng
+        self.reservoirs = {}
+
+    def add(self, X, y):
+        for label in np.unique(y):
+            reservoir = self.reservoirs.get(label)
+            if reservoir is None:
+                reservoir = self.reservoirs[label] = ReservoirSample(self.capacity, self.n_features, self.rng)
+            reservoir.add(X[y == label])
+
+    @property
+    def seen(self):
+        return sum(r.seen for r in self.reservoirs.values())
+
+    def sample(self):
+        """(X, y) of about capacity rows with every class in its stream proportion (at least one row)"""
+        total = min(self.capacity, self.seen)
+        parts, labels = [], []
+        for label in sorted(self.reservoirs):
+            reservoir = self.reservoirs[label]
+            n = min(reservoir.size, max(1, round(total * reservoir.seen / self.seen)))
+            parts.append(reservoir.take(n))
+            labels.append(np.full(n, label))
+        return np.vstack(parts), np.concatenate(labels)
+
+
+class StreamingMetrics:
+    """Confusion counts and log loss accumulated batch by batch"""
+
+    def __init__(self):
+        self.tp = self.fp = self.tn = self.fn = 0
+        self.log_loss_sum = 0.0
+
+    def update(self, y_true, predictions, risk):
+        y_true = np.asarray(y_true).astype(bool)
+        predictions = np.asarray(predictions).astype(bool)
+        self.tp += int(np.sum(y_true & predictions))
+        self.fp += int(np.sum(~y_true & predictions))
+        self.tn += int(np.sum(~y_true & ~predictions))
+        self.fn += int(np.sum(y_true & ~predictions))
+        risk = np.clip(risk, 1e-15, 1 - 1e-15)
+        self.log_loss_sum += float(-np.sum(np.where(y_true, np.log(risk), np.log(1 - risk))))
+
+    def result(self):
+        rows = self.tp + self.fp + self.tn + self.fn
+        precision = self.tp / (self.tp + self.fp) if self.tp + self.fp else 0.0
+        recall = self.tp / (self.tp + self.fn) if self.tp + self.fn else 0.0
+        return {
+            'rows': rows,
+            'accuracy': (self.tp + self.tn) / rows if rows else None,
+            'precision': precision,
+            'recall': recall,
+            'f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+            'log_loss': self.log_loss_sum / rows if rows else None,
+        }
+
+
+def sample_capacity(memory_budget_mb, n_features, n_classes=2):
+    """Rows each class reservoir may hold within the sample share of the budget.
+
+    Besides the reservoirs, the drawn sample is one more copy and the forest
+    fit converts it to float32 (half a copy).
+    """
+    row_bytes = (n_features + 1) * 8
+    budget = memory_budget_mb * 1024 * 1024 * SAMPLE_BUDGET_SHARE
+    return max(1, int(budget / ((n_classes + 1.5) * row_bytes)))
+
+
+def budget_chunk_rows(path, memory_budget_mb, chunk_rows):
+    """chunk_rows, lowered so processing one chunk stays within the chunk share of the budget"""
+    probe = next(iter_chunks(path, PROBE_ROWS), None)
+    if probe is None or probe.empty:
+        return chunk_rows
+    row_bytes = probe.memory_usage(deep=True).sum() / len(probe)
+    budget = memory_budget_mb * 1024 * 1024 * (1 - SAMPLE_BUDGET_SHARE)
+    return int(max(PROBE_ROWS, min(chunk_rows, budget / (row_bytes * CHUNK_MEMORY_FACTOR))))
+
+
+def _labelled_chunks(chunks, cleaning_state, feature_names, threshold):
+    for df in chunks:
+        nulls = feature_nulls(df.isna().sum(), feature_names)
+        df = create_new_features(DataCleaner().apply_cleaning_state(df, cleaning_state))
+        X, y = prepare_for_training(create_risk_labels(df, threshold=threshold), 'at_risk')
+        if y is None:
+            raise ValueError('Training data needs marks columns to derive at-risk labels')
+        yield X.reindex(columns=feature_names, fill_value=0).to_numpy(dtype=np.float64), y.to_numpy(), nulls
+
+
+@timed('train')
+def train_out_of_core(predictor, path, memory_budget_mb=512, chunk_rows=50000, test_size=0.2,
+                      random_state=42, threshold=50):
+    """Train predictor on a CSV/Parquet file without loading it, in three passes.
+
+    A first pass fits fill values and categories on the whole file. Pass two
+    cleans and labels each chunk, sends a seeded test_size share of rows to
+    the holdout and adds the rest to per-class reservoirs sized from
+    memory_budget_mb; the forest then bootstraps each tree from that
+    stratified sample. Every chunk also goes into a drift profile of the
+    whole file, stored with the model. Pass three replays the same holdout draw and scores the
+    holdout rows chunk by chunk into streaming metrics. The budget covers the
+    data (chunks, reservoirs, sample and fit), not the interpreter and
+    libraries. Returns (metrics, X_sample, y_sample).
+    """
+    chunk_rows = budget_chunk_rows(path, memory_budget_mb, chunk_rows)
+    chunks = iter_chunks(path, chunk_rows)
+    first = next(chunks, None)
+    if first is None:
+        raise ValueError('Training file has no rows')
+    # Nulls or categories that first appear in a later chunk still get fill values and codes
+    cleaning_state = DataCleaner().fit_cleaning_state_chunks(iter_chunks(path, chunk_rows))
+    probe = create_new_features(DataCleaner().apply_cleaning_state(first.head(1), cleaning_state))
+    feature_names = prepare_for_training(create_risk_labels(probe, threshold=threshold), 'at_risk')[0].columns.tolist()
+
+    capacity = sample_capacity(memory_budget_mb, len(feature_names))
+    reservoir = StratifiedReservoir(capacity, len(feature_names), np.random.default_rng(random_state + 1))
+    holdout_rng = np.random.default_rng(random_state)
+    holdout_rows = 0
+    profile = None
+    for X, y, nulls in _labelled_chunks(itertools.chain([first], chunks), cleaning_state, feature_names, threshold):
+        if profile is None:
+            # Histogram edges come from the first chunk so every chunk adds into the same bins
+            profile = DatasetSketch.for_data(X, feature_names)
+        profile.update(X, nulls)
+        holdout = holdout_rng.random(len(X)) < test_size
+        holdout_rows += int(holdout.sum())
+        reservoir.add(X[~holdout], y[~holdout])
+    del first
+    if not reservoir.reservoirs:
+        raise ValueError('No training rows left after the holdout split')
+
+    X_sample, y_sample = reservoir.sample()
+    class_counts = {int(label): r.seen for label, r in reservoir.reservoirs.items()}
+    rows_seen = reservoir.seen + holdout_rows
+    del reservoir
+    X_sample = pd.DataFrame(X_sample, columns=feature_names, copy=False)
+    predictor.fit(X_sample, y_sample, profile=profile)
+    train_accuracy = predictor.model.score(X_sample.to_numpy(), y_sample)
+
+    holdout_metrics = StreamingMetrics()
+    holdout_rng = np.random.default_rng(random_state)
+    for X, y, _ in _labelled_chunks(iter_chunks(path, chunk_rows), cleaning_state, feature_names, threshold):
+        holdout = holdout_rng.random(len(X)) < test_size
+        if holdout.any():
+            predictions, probabilities = predictor.predict(X[holdout])
+            risk = probabilities[:, list(predictor.model.classes_).index(1)] if 1 in predictor.model.classes_ else np.zeros(int(holdout.sum()))
+            holdout_metrics.update(y[holdout], predictions, risk)
+
+    holdout = holdout_metrics.result()
+    metrics = {
+        'train_accuracy': train_accuracy,
+        'test_accuracy': holdout['accuracy'] if holdout['accuracy'] is not None else train_accuracy,
+        'holdout': holdout,
+        'rows_seen': rows_seen,
+        'sample_rows': len(X_sample),
+        'sample_capacity': capacity,
+        'chunk_rows': chunk_rows,
+        'class_counts': class_counts,
+    }
+    return metrics, X_sample, y_sample
@@ -0,0 +1,141 @@
+"""
+Prediction Pipeline Module
+The clean -> features -> score -> explain stages shared by the API and batch jobs
+"""
+
+
+import numpy as np
+import pandas as pd
+
+from preprocessing.data_cleaning import DataCleaner, id_column
+from preprocessing.feature_selection import add_history_features, create_new_features, prepare_for_training
+from preprocessing.history import upload_source
+from prediction.attribution import supports_attribution, top_contributions
+from prediction.explainability import explain_batch, summarize_results
+from prediction.result_cache import row_hashes
+from monitoring.metrics import timer
+
+
+def add_longitudinal_features(df, keys, history, source):
+    """Record this upload (an UploadSource) in the history store and add the students' window features"""
+    with timer('history'):
+        history.record(keys, df, source.name, source.scope, source.digest)
+        return add_history_features(df, history.window_features(keys, source.scope))
+
+
+def prepare_student_frame(df, history=None, source=None):
+    """Add ids, clean and featurize a raw student frame; returns (features df, student ids).
+
+    History features are only added with a source, whose scope keeps one
+    class's ids apart from another's.
+    """
+    cleaner = DataCleaner()
+    # History is only kept for uploads that carry their own student ids
+    key = id_column(df)
+    keys = df[key].tolist() if key else None
+    df = cleaner.add_student_ids(df)
+    student_ids = df['student_id'].tolist()
+    df = cleaner.clean_data(df)
+    df = create_new_features(df)
+    if history is not None and keys is not None and source:
+        df = add_longitudinal_features(df, keys, history, source)
+    return df, student_ids
+
+
+def explain_scores(predictor, X_pred, df, student_ids, predictions, probabilities, explain_budget=None, top_k=3):
+    # Model-driven attribution within the latency budget; rows it does not reach use the rules
+    attribution = predictor.explain_contributions(X_pred, time_budget=explain_budget)
+    top_features = []
+    if attribution is not None:
+        top_features = top_contributions(attribution['values'], attribution['feature_names'], top_k)
+    with timer('explain'):
+        results = explain_batch(df, student_ids, predictions, probabilities, top_features)
+    return results, len(top_features)
+
+
+def score_with_cache(cache, predictor, X_pred, df, student_ids, predict, explain_budget=None, top_k=3):
+    """Serve unchanged rows from the result cache and score only the rest with predict(X).
+
+    Returns (results, explained_rows, cache_hits). Rows whose attribution was
+    cut off by the time budget are not cached, so a later request can still
+    give them a model-driven explanation.
+    """
+    X = predictor.align_features(X_pred)
+    if cache is None or not predictor.version:
+        predictions, probabilities = predict(X)
+        results, explained_rows = explain_scores(predictor, X, df, student_ids, predictions, probabilities, explain_budget, top_k)
+        return results, explained_rows, 0
+
+    with timer('cache_lookup'):
+        hashes = row_hashes(X)
+        cached = cache.get_many(predictor.version, hashes)
+    misses = [i for i, row_hash in enumerate(hashes) if row_hash not in cached]
+    results = [None] * len(hashes)
+    explained_rows = 0
+    if misses:
+        predictions, probabilities = predict(X[misses])
+        miss_results, explained_rows = explain_scores(
+            predictor, X[misses], df.iloc[misses], [student_ids[i] for i in misses],
+            predictions, probabilities, explain_budget, top_k
+        )
+        cacheable = explained_rows if supports_attribution(predictor.model) else len(misses)
+        cache.put_many(predictor.model_type, predictor.version, [hashes[i] for i in misses[:cacheable]], miss_results[:cacheable])
+        for i, result in zip(misses, miss_results):
+            results[i] = result
+    for i, row_hash in enumerate(hashes):
+        if results[i] is None:
+            results[i] = {'student_id': student_ids[i], **cached[row_hash]}
+    return results, explained_rows, len(hashes) - len(misses)
+
+
+def score_frame(predictor, df, student_ids, explain_budget=None, top_k=3):
+    X_pred, _ = prepare_for_training(df, 'at_risk')
+    predictions, probabilities = predictor.predict(X_pred)
+    results, explained_rows = explain_scores(
+        predictor, X_pred, df, student_ids, predictions, probabilities, explain_budget, top_k
+    )
+    return {
+        'X': X_pred,
+        'predictions': predictions,
+        'probabilities': probabilities,
+        'results': results,
+        'explained_rows': explained_rows,
+    }
+
+
+def score_file(predictor, filepath, sheet=None, explain_budget=None, top_k=3, history=None, history_scope=None):
+    df = DataCleaner().load_data(filepath, sheet)
+    df, student_ids = prepare_student_frame(df, history, upload_source(filepath, history_scope))
+    scored = score_frame(predictor, df, student_ids, explain_budget, top_k)
+    with timer('summary'):
+        summary = summarize_results(scored['results'], student_ids)
+    return {'results': scored['results'], 'summary': summary, 'explained_rows': scored['explained_rows']}
+
+
+def score_chunk(predictor, df, cleaning_state, explain_top_k=0):
+    """Score one chunk of a large file into a result frame.
+
+    The chunk is cleaned with a cleaning state fit once for the whole file, so
+    every chunk sees the same fill values and category codes. Explanations
+    (rules plus the top explain_top_k attributed features) are only added
+    when explain_top_k is set; they cost far more than the scores.
+    """
+    key = id_column(df)
+    student_ids = df[key].tolist()
+    df = create_new_features(DataCleaner().apply_cleaning_state(df, cleaning_state))
+    X_pred, _ = prepare_for_training(df, 'at_risk')
+    predictions, probabilities = predictor.predict(X_pred)
+    risk = probabilities[:, 1]
+    out = pd.DataFrame({
+        'student_id': student_ids,
+        'prediction': predictions.astype(int),
+        'at_risk': np.where(predictions == 1, 'Yes', 'No'),
+        'risk_probability': np.round(risk * 100, 2),
+        'risk_level': np.select([risk > 0.7, risk > 0.4], ['High', 'Medium'], 'Low'),
+    })
+    if explain_top_k:
+        results, _ = explain_scores(predictor, X_pred, df, student_ids, predictions, probabilities, None, explain_top_k)
+        out['explanation'] = [r['explanation'] for r in results]
+        out['risk_factors'] = ['; '.join(r['risk_factors']) for r in results]
+        out['recommendations'] = ['; '.join(r['recommendations']) for r in results]
+    return out
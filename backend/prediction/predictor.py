@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.svm import SVC
@@ -5,21 +6,49 @@ from sklearn.model_selection import train_test_split
 import joblib
 import os
 
+from prediction.attribution import supports_attribution, get_explainer, compute_contributions
+from prediction.artifact import is_compact_artifact, load_compact, save_compact, supports_compact
+from preprocessing.data_cleaning import DataCleaner, outlier_bounds_from_sketch
+from monitoring.drift import sketch_frame
+from monitoring.metrics import timed
+
+
+DEFAULT_MODEL_PARAMS = {
+    'random_forest': {'n_estimators': 100, 'max_depth': 10, 'random_state': 42},
+    'svm': {'kernel': 'rbf', 'probability': True, 'random_state': 42},
+}
+
 
 class StudentPredictor:
-    def __init__(self, model_type='random_forest'):
+    def __init__(self, model_type='random_forest', model_params=None):
         self.model_type = model_type
+        self.model_params = model_params or {}
         self.model = None
         self.feature_names = None
         self.is_trained = False
+        self.version = None
+        # Sketch of the training features (DatasetSketch.to_dict()), the reference for drift checks
+        self.profile = None
+        # Robust {feature: [low, high]} fences from the training rows; features are clipped to them
+        self.outlier_bounds = None
 
     def create_model(self):
         if self.model_type == 'random_forest':
-            self.model = RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42)
+            params = {**DEFAULT_MODEL_PARAMS['random_forest'], **self.model_params}
+            self.model = RandomForestClassifier(**params)
         else:
-            self.model = SVC(kernel='rbf', probability=True, random_state=42)
+            params = {**DEFAULT_MODEL_PARAMS['svm'], **self.model_params}
+            self.model = SVC(**params)
+
+    def fit_outlier_bounds(self, X_train):
+        """Exact fences from the training rows (an array in feature order); returns X_train clipped to them"""
+        names = self.feature_names or self.profile['feature_names']
+        self.outlier_bounds = DataCleaner().fit_outlier_bounds(pd.DataFrame(X_train, columns=names))
+        return self.clip_outliers(X_train)
 
-    def train(self, X, y, test_size=0.2, random_state=42):
+    @timed('train')
+    def train(self, X, y, test_size=0.2, random_state=42, nulls=None):
+        self.profile = sketch_frame(X, nulls).to_dict()
         if isinstance(X, pd.DataFrame):
             self.feature_names = X.columns.tolist()
             X = X.values
@@ -27,6 +56,9 @@ class StudentPredictor:
             y = y.values
 
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+        # Fences come from the training split only, and the holdout is scored as predict() would score it
+        X_train = self.fit_outlier_bounds(X_train)
+        X_test = self.clip_outliers(X_test)
         self.create_model()
         self.model.fit(X_train, y_train)
 
@@ -36,9 +68,50 @@ class StudentPredictor:
 
         return {'train_accuracy': train_accuracy, 'test_accuracy': test_accuracy}
 
-    def predict(self, X):
-        if not self.is_trained and self.model is None:
-            raise Exception('Model not trained')
+    def fit(self, X, y, profile=None):
+        """Fit on all of X (no holdout split), e.g. a sample drawn by out-of-core training.
+
+        profile is the sketch of the full training data when X is only a sample
+        of it; the outlier fences then come from its streaming quantiles.
+        """
+        self.profile = (profile if profile is not None else sketch_frame(X)).to_dict()
+        if isinstance(X, pd.DataFrame):
+            self.feature_names = X.columns.tolist()
+            X = X.values
+        if profile is not None:
+            self.outlier_bounds = outlier_bounds_from_sketch(profile)
+            X = self.clip_outliers(X)
+        else:
+            X = self.fit_outlier_bounds(X)
+        self.create_model()
+        self.model.fit(X, np.asarray(y))
+        self.is_trained = True
+
+    def _outlier_limits(self, n_features):
+        """(low, high) arrays in feature order, or None when there are no bounds for these features"""
+        names = self.feature_names or (self.profile or {}).get('feature_names') or []
+        if not self.outlier_bounds or len(names) != n_features:
+            return None
+        limits = np.array([self.outlier_bounds.get(name, (-np.inf, np.inf)) for name in names], dtype=np.float64)
+        return limits[:, 0], limits[:, 1]
+
+    def clip_outliers(self, X):
+        limits = self._outlier_limits(X.shape[1])
+        return X if limits is None else np.clip(X, *limits)
+
+    def outlier_mask(self, X):
+        """Boolean (rows x features) array of values outside the training bounds, or None without bounds"""
+        X = self._align(X)
+        limits = self._outlier_limits(X.shape[1])
+        if limits is None:
+            return None
+        X = np.asarray(X, dtype=np.float64)
+        return (X < limits[0]) | (X > limits[1])
+
+    def align_features(self, X):
+        return self.clip_outliers(self._align(X))
+
+    def _align(self, X):
         if isinstance(X, pd.DataFrame):
             # Ensure columns match the feature names used during training.
             if self.feature_names:
@@ -62,10 +135,35 @@ class StudentPredictor:
                         for i in range(expected - X.shape[1]):
                             X[f'_pad_{i}'] = 0
             X = X.values
+        return X
+
+    @timed('predict')
+    def predict(self, X):
+        if not self.is_trained and self.model is None:
+            raise Exception('Model not trained')
+        X = self.align_features(X)
         predictions = self.model.predict(X)
         probabilities = self.model.predict_proba(X)
         return predictions, probabilities
 
+    @timed('attribution')
+    def explain_contributions(self, X, time_budget=None):
+        """Per-feature contributions to the risk probability (random forest only).
+
+        Returns None when the model does not support path attribution, otherwise
+        a dict with the shared bias and a (rows x features) contribution array.
+        Rows past the time budget are left out of the array.
+        """
+        if not self.is_trained or not supports_attribution(self.model):
+            return None
+        X = self.align_features(X)
+        explainer = get_explainer(self.model, X.shape[1], self.version)
+        return {
+            'bias': explainer.bias,
+            'feature_names': self.feature_names or [f'feature_{i}' for i in range(X.shape[1])],
+            'values': compute_contributions(explainer, X, time_budget=time_budget)
+        }
+
     def predict_single_student(self, student_data):
         import pandas as _pd
         if isinstance(student_data, dict):
@@ -75,21 +173,33 @@ class StudentPredictor:
         prediction, probability = self.predict(student_data)
         return {'prediction': int(prediction[0]), 'risk_probability': float(probability[0][1]), 'is_at_risk': bool(prediction[0] == 1)}
 
-    def save_model(self, file_path):
+    def save_model(self, file_path, compact=False):
+        """Save as a joblib pickle, or with compact=True as a compact artifact when the model supports it"""
         if not self.is_trained:
             raise Exception('Cannot save untrained model')
-        model_data = {'model': self.model, 'model_type': self.model_type, 'feature_names': self.feature_names, 'is_trained': self.is_trained}
+        model_data = {'model': self.model, 'model_type': self.model_type, 'model_params': self.model_params, 'feature_names': self.feature_names, 'is_trained': self.is_trained, 'profile': self.profile, 'outlier_bounds': self.outlier_bounds}
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        if compact and supports_compact(self.model):
+            model_data.pop('model')
+            save_compact(file_path, self.model, model_data)
+            return True
         joblib.dump(model_data, file_path)
+        return False
 
-    def load_model(self, file_path):
+    def load_model(self, file_path, mmap_mode=None):
         if not os.path.exists(file_path):
             raise Exception(f'Model file not found: {file_path}')
-        model_data = joblib.load(file_path)
-        self.model = model_data['model']
+        if is_compact_artifact(file_path):
+            self.model, model_data = load_compact(file_path)
+        else:
+            model_data = joblib.load(file_path, mmap_mode=mmap_mode)
+            self.model = model_data['model']
         self.model_type = model_data['model_type']
+        self.model_params = model_data.get('model_params', {})
         self.feature_names = model_data.get('feature_names')
         self.is_trained = model_data.get('is_trained', False)
+        self.profile = model_data.get('profile')
+        self.outlier_bounds = model_data.get('outlier_bounds')
 
     def get_feature_importance(self):
         if self.model_type == 'random_forest' and self.is_trained:
@@ -0,0 +1,255 @@
+"""
+Model Registry Module
+Content-addressed model versions with atomic promotion and shadow scoring
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from prediction.predictor import StudentPredictor
+
+
+MODEL_TYPES = ('random_forest', 'svm')
+VERSION_PATTERN = re.compile(r'^[0-9a-f]{16}$')
+# Compact forest artifacts for random forests, joblib pickles for everything else
+MODEL_FILES = ('model.forest', 'model.pkl')
+
+
+class ModelRegistry:
+    """Stores every trained model under the hash of its serialized bytes.
+
+    Version directories are written once and never modified, so a model being
+    read by one request cannot be overwritten by a concurrent training run.
+    The live version of each model type is a small pointer file that is
+    replaced atomically with os.replace.
+    """
+
+    def __init__(self, root, compact=True):
+        self.root = root
+        self.compact = compact
+        self.versions_dir = os.path.join(root, 'versions')
+        os.makedirs(self.versions_dir, exist_ok=True)
+        # Version files never change, so anything read from them can be kept.
+        self._importance_cache = {}
+
+    def version_dir(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    def has_version(self, version):
+        return bool(version) and bool(VERSION_PATTERN.match(version)) and os.path.exists(self.model_path(version))
+
+    def model_path(self, version):
+        for name in MODEL_FILES:
+            path = os.path.join(self.version_dir(version), name)
+            if os.path.exists(path):
+                return path
+        return os.path.join(self.version_dir(version), MODEL_FILES[-1])
+
+    def _pointer_path(self, model_type):
+        if model_type not in MODEL_TYPES:
+            raise ValueError(f'Unknown model type: {model_type}')
+        return os.path.join(self.root, f'{model_type}.current.json')
+
+    def _write_json_atomic(self, path, payload):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(payload, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def register(self, predictor, metadata=None):
+        """Serialize a trained predictor and store it under its content hash"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.pkl.tmp')
+        os.close(fd)
+        try:
+            # Uncompressed so the arrays can be memory-mapped on load.
+            compact = predictor.save_model(tmp_path, compact=self.compact)
+            digest = hashlib.sha256()
+            with open(tmp_path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            version = digest.hexdigest()[:16]
+
+            target_dir = self.version_dir(version)
+            if os.path.exists(self.model_path(version)):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(target_dir, exist_ok=True)
+                os.replace(tmp_path, os.path.join(target_dir, MODEL_FILES[0] if compact else MODEL_FILES[1]))
+                info = {
+                    'version': version,
+                    'model_type': predictor.model_type,
+                    'model_params': predictor.model_params,
+                    'feature_names': predictor.feature_names,
+                    'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                }
+                info.update(metadata or {})
+                self._write_json_atomic(os.path.join(target_dir, 'meta.json'), info)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        predictor.version = version
+        return version
+
+    def check_model_type(self, model_type, version):
+        """Raise ValueError unless version was registered as a model_type model"""
+        registered = self.get_metadata(version).get('model_type')
+        if registered != model_type:
+            raise ValueError(f'Version {version} is a {registered} model, not {model_type}')
+
+    def promote(self, model_type, version):
+        if not self.has_version(version):
+            raise Exception(f'Unknown model version: {version}')
+        self.check_model_type(model_type, version)
+        previous = self.current_version(model_type)
+        self._write_json_atomic(self._pointer_path(model_type), {
+            'version': version,
+            'previous_version': previous,
+            'promoted_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        })
+        return version
+
+    def current_version(self, model_type):
+        try:
+            with open(self._pointer_path(model_type)) as f:
+                return json.load(f)['version']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def load(self, model_type, version=None):
+        """Load a version (the promoted one by default); forest arrays are memory-mapped read-only"""
+        version = version or self.current_version(model_type)
+        if version is None:
+            return None
+        self.check_model_type(model_type, version)
+        predictor = StudentPredictor(model_type)
+        # libsvm cannot predict from read-only buffers, so only forests are memory-mapped
+        predictor.load_model(self.model_path(version), mmap_mode='r' if model_type == 'random_forest' else None)
+        predictor.version = version
+        return predictor
+
+    def get_metadata(self, version):
+        with open(os.path.join(self.version_dir(version), 'meta.json')) as f:
+            return json.load(f)
+
+    def save_importance(self, version, payload):
+        self._write_json_atomic(os.path.join(self.version_dir(version), 'importance.json'), payload)
+        self._importance_cache[version] = payload
+
+    def load_importance(self, version):
+        if version in self._importance_cache:
+            return self._importance_cache[version]
+        try:
+            with open(os.path.join(self.version_dir(version), 'importance.json')) as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._importance_cache[version] = payload
+        return payload
+
+    def list_versions(self, model_type=None):
+        versions = []
+        for version in os.listdir(self.versions_dir):
+            try:
+                meta = self.get_metadata(version)
+            except (OSError, ValueError):
+                continue
+            if model_type is None or meta.get('model_type') == model_type:
+                versions.append(meta)
+        return sorted(versions, key=lambda m: m.get('created_at', ''), reverse=True)
+
+
+class ShadowScorer:
+    """Scores the same batches as the live model with a candidate, off the request path.
+
+    Batches are dropped rather than queued once max_pending are outstanding, so
+    a slow candidate can never build up an unbounded backlog.
+    """
+
+    def __init__(self, max_workers=1, max_pending=4):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='shadow')
+        self.max_pending = max_pending
+        self.candidates = {}
+        self.stats = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def set_candidate(self, model_type, predictor):
+        with self._lock:
+            self.candidates[model_type] = predictor
+            self.stats[model_type] = {
+                'candidate_version': predictor.version,
+                'batches': 0,
+                'rows': 0,
+                'agreements': 0,
+                'dropped_batches': 0,
+                'errors': 0,
+                'primary_latency_total': 0.0,
+                'candidate_latency_total': 0.0,
+                'probability_abs_diff_total': 0.0,
+            }
+
+    def clear_candidate(self, model_type):
+        with self._lock:
+            self.candidates.pop(model_type, None)
+
+    def get_candidate(self, model_type):
+        return self.candidates.get(model_type)
+
+    def submit(self, model_type, X, primary_predictions, primary_probabilities, primary_latency):
+        candidate = self.candidates.get(model_type)
+        if candidate is None:
+            return None
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats[model_type]['dropped_batches'] += 1
+                return None
+            self._pending += 1
+        return self.executor.submit(
+            self._score, model_type, candidate, X.copy(), np.asarray(primary_predictions),
+            np.asarray(primary_probabilities), primary_latency
+        )
+
+    def _score(self, model_type, candidate, X, primary_predictions, primary_probabilities, primary_latency):
+        try:
+            start = time.perf_counter()
+            predictions, probabilities = candidate.predict(X)
+            latency = time.perf_counter() - start
+            with self._lock:
+                stats = self.stats.get(model_type)
+                if stats is None or stats['candidate_version'] != candidate.version:
+                    return
+                stats['batches'] += 1
+                stats['rows'] += len(predictions)
+                stats['agreements'] += int(np.sum(predictions == primary_predictions))
+                stats['primary_latency_total'] += primary_latency
+                stats['candidate_latency_total'] += latency
+                stats['probability_abs_diff_total'] += float(np.abs(probabilities[:, 1] - primary_probabilities[:, 1]).sum())
+        except Exception:
+            with self._lock:
+                if model_type in self.stats:
+                    self.stats[model_type]['errors'] += 1
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def report(self, model_type):
+        with self._lock:
+            stats = dict(self.stats.get(model_type) or {})
+        if not stats:
+            return None
+        batches = stats['batches']
+        rows = stats['rows']
+        stats['active'] = model_type in self.candidates
+        stats['agreement_rate'] = stats['agreements'] / rows if rows else None
+        stats['mean_probability_abs_diff'] = stats['probability_abs_diff_total'] / rows if rows else None
+        stats['primary_latency_ms'] = stats['primary_latency_total'] / batches * 1000 if batches else None
+        stats['candidate_latency_ms'] = stats['candidate_latency_total'] / batches * 1000 if batches else None
+        return stats
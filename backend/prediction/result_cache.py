@@ -0,0 +1,145 @@
+"""
+Result Cache Module
+Per-student prediction results keyed by model version and feature-row hash
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def row_hashes(X):
+    """One signed 64-bit hash per row of an aligned feature matrix"""
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(np.asarray(X)), index=False)
+    return hashes.to_numpy().view(np.int64).tolist()
+
+
+class ResultCache:
+    """SQLite-backed store of scored rows shared by every worker process.
+
+    Entries are keyed by (model version, row hash), so a retrained model never
+    sees results from an earlier version; promoting a version also drops the
+    entries of the versions it replaces. When the table grows past
+    max_entries the least recently used rows are evicted. A hit only
+    refreshes last_used when it is older than touch_interval seconds, and
+    the row count is kept by triggers, so reads and writes stay cheap.
+    """
+
+    _SCHEMA = '''
+        BEGIN IMMEDIATE;
+        CREATE TABLE IF NOT EXISTS results (
+            version TEXT NOT NULL,
+            row_hash INTEGER NOT NULL,
+            model_type TEXT NOT NULL,
+            result TEXT NOT NULL,
+            last_used REAL NOT NULL,
+            PRIMARY KEY (version, row_hash)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+        CREATE TABLE IF NOT EXISTS result_count (id INTEGER PRIMARY KEY CHECK (id = 0), entries INTEGER NOT NULL);
+        INSERT OR IGNORE INTO result_count VALUES (0, (SELECT COUNT(*) FROM results));
+        CREATE TRIGGER IF NOT EXISTS results_inserted AFTER INSERT ON results
+            BEGIN UPDATE result_count SET entries = entries + 1; END;
+        CREATE TRIGGER IF NOT EXISTS results_deleted AFTER DELETE ON results
+            BEGIN UPDATE result_count SET entries = entries - 1; END;
+        COMMIT;
+    '''
+
+    def __init__(self, path, max_entries=500000, touch_interval=60.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect().executescript(self._SCHEMA)
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads, or across fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_many(self, version, hashes):
+        """{row_hash: result} for the hashes already scored by this version"""
+        conn = self._connect()
+        found = {}
+        stale = []
+        now = time.time()
+        unique = list(set(hashes))
+        for begin in range(0, len(unique), 500):
+            chunk = unique[begin:begin + 500]
+            rows = conn.execute(
+                f"SELECT row_hash, result, last_used FROM results WHERE version = ? AND row_hash IN ({','.join('?' * len(chunk))})",
+                [version, *chunk]
+            ).fetchall()
+            for row_hash, result, last_used in rows:
+                found[row_hash] = json.loads(result)
+                if now - last_used >= self.touch_interval:
+                    stale.append((now, version, row_hash))
+        if stale:
+            # One write transaction for all the touches instead of one per row
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany('UPDATE results SET last_used = ? WHERE version = ? AND row_hash = ?', stale)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return found
+
+    def put_many(self, model_type, version, hashes, results):
+        now = time.time()
+        rows = [
+            (version, row_hash, model_type, json.dumps({k: v for k, v in result.items() if k != 'student_id'}), now)
+            for row_hash, result in zip(hashes, results)
+        ]
+        if not rows:
+            return
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # An upsert, not INSERT OR REPLACE, so re-scored rows do not fire the count triggers
+            conn.executemany(
+                'INSERT INTO results VALUES (?, ?, ?, ?, ?) ON CONFLICT (version, row_hash) DO UPDATE SET '
+                'model_type = excluded.model_type, result = excluded.result, last_used = excluded.last_used',
+                rows
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._evict(conn)
+
+    def _evict(self, conn):
+        count = conn.execute('SELECT entries FROM result_count').fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # Trim to 90% so eviction does not run again on every insert
+        excess = count - int(self.max_entries * 0.9)
+        conn.execute(
+            'DELETE FROM results WHERE (version, row_hash) IN '
+            '(SELECT version, row_hash FROM results ORDER BY last_used LIMIT ?)',
+            (excess,)
+        )
+
+    def invalidate(self, model_type, keep_version=None):
+        self._connect().execute('DELETE FROM results WHERE model_type = ? AND version IS NOT ?',
+                                (model_type, keep_version))
+
+    def stats(self):
+        rows = self._connect().execute('SELECT model_type, version, COUNT(*) FROM results GROUP BY model_type, version').fetchall()
+        return {
+            'entries': sum(count for _, _, count in rows),
+            'max_entries': self.max_entries,
+            'versions': [{'model_type': m, 'version': v, 'entries': c} for m, v, c in rows],
+        }
@@ -0,0 +1,234 @@
+"""
+Roster Module
+Stored roster snapshots so re-uploads of a class only re-score the students that changed
+"""
+
+import contextlib
+import fcntl
+import os
+import pickle
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from preprocessing.data_cleaning import DataCleaner, add_student_ids, id_column
+from preprocessing.feature_selection import create_new_features, prepare_for_training
+from prediction.pipeline import add_longitudinal_features, score_with_cache
+
+
+ROSTER_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{1,100}$')
+
+
+def diff_rosters(previous, current, key):
+    """Student ids of current that are new or changed, plus removed and unchanged ids"""
+    previous = previous.set_index(key)
+    current = current.set_index(key)
+    common = current.index.intersection(previous.index)
+    old = previous.loc[common, current.columns]
+    new = current.loc[common]
+    same = ((old == new) | (old.isna() & new.isna())).all(axis=1)
+    return {
+        'new': current.index.difference(previous.index, sort=False).tolist(),
+        'changed': same.index[~same.values].tolist(),
+        'removed': previous.index.difference(current.index, sort=False).tolist(),
+        'unchanged': same.index[same.values].tolist(),
+    }
+
+
+def _risk_bucket(result):
+    probability = result['risk_probability'] / 100
+    return 'high' if probability > 0.7 else 'medium' if probability > 0.4 else 'low'
+
+
+def update_totals(totals, removed=(), added=()):
+    """Running class counts; results leaving the roster are subtracted, new ones added"""
+    totals = dict(totals or {'total_students': 0, 'at_risk_count': 0, 'risk_sum': 0.0, 'high': 0, 'medium': 0, 'low': 0})
+    for sign, results in ((-1, removed), (1, added)):
+        for result in results:
+            totals['total_students'] += sign
+            totals['at_risk_count'] += sign * (result['at_risk'] == 'Yes')
+            totals['risk_sum'] += sign * result['risk_probability'] / 100
+            totals[_risk_bucket(result)] += sign
+    return totals
+
+
+def summary_from_totals(totals):
+    """Same fields as generate_class_summary"""
+    total = totals['total_students']
+    return {
+        'total_students': total,
+        'at_risk_count': totals['at_risk_count'],
+        'at_risk_percentage': (totals['at_risk_count'] / total * 100) if total > 0 else 0,
+        'average_risk': totals['risk_sum'] / total if total > 0 else 0,
+        'high_risk_count': totals['high'],
+        'medium_risk_count': totals['medium'],
+        'low_risk_count': totals['low'],
+    }
+
+
+def risk_transitions(previous_results, new_results):
+    """Students whose risk level differs from the previous upload (new students come from None)"""
+    transitions = []
+    for student_id, result in new_results.items():
+        before = previous_results.get(student_id)
+        old_level = before['risk_level'] if before else None
+        if old_level != result['risk_level']:
+            transitions.append({
+                'student_id': student_id,
+                'from': old_level,
+                'to': result['risk_level'],
+                'risk_probability': result['risk_probability'],
+            })
+    return transitions
+
+
+class RosterStore:
+    """One pickled snapshot per roster: raw rows, cleaning state, results and class totals"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, roster):
+        if not ROSTER_NAME_PATTERN.match(roster or ''):
+            raise ValueError(f'Invalid roster name: {roster}')
+        return os.path.join(self.folder, f'{roster}.pkl')
+
+    @contextlib.contextmanager
+    def lock(self, roster):
+        """Hold an exclusive lock on a roster, across threads and worker processes"""
+        with open(self.path(roster)[:-len('.pkl')] + '.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def load(self, roster):
+        try:
+            with open(self.path(roster), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def save(self, roster, state):
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix='.pkl.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path(roster))
+
+    def delete(self, roster):
+        path = self.path(roster)
+        with self.lock(roster):
+            if os.path.exists(path):
+                os.remove(path)
+                return True
+            return False
+
+
+def unfilled_nulls(rows, cleaning):
+    """Whether rows have nulls in a column the cleaning state has no fill value for"""
+    fill_values = cleaning['fill_values']
+    return any(pd.isna(fill_values.get(col, np.nan)) for col in rows.columns[rows.isnull().any()])
+
+
+def can_diff(state, raw, key, predictor):
+    """Whether a stored snapshot is comparable with a new upload scored by predictor"""
+    return (
+        state is not None
+        and state['model_type'] == predictor.model_type
+        and state['model_version'] == predictor.version
+        and state['key'] == key
+        and state['raw'].columns.tolist() == raw.columns.tolist()
+        and raw[key].is_unique
+    )
+
+
+def score_roster(store, roster, raw, predictor, predict, cache=None, explain_budget=None, top_k=3,
+                 history=None, source=None):
+    """Score an upload of a roster, re-scoring only students whose rows changed since the last one.
+
+    Changed and new rows are cleaned with the fill values and categories fit
+    on the roster's first upload, so they come out exactly as they would have
+    in a full run. A full re-score happens when there is no comparable
+    snapshot (first upload, different columns or a different model version),
+    or when those rows have nulls the stored state has no fill value for.
+    Only re-scored students are added to the history store, so the stored
+    results of unchanged students stay consistent with their history.
+    The roster stays locked from load to save, so concurrent uploads of one
+    roster (from any worker) are applied one after the other.
+    """
+    with store.lock(roster):
+        return _score_locked(store, roster, raw, predictor, predict, cache, explain_budget, top_k, history, source)
+
+
+def _score_locked(store, roster, raw, predictor, predict, cache, explain_budget, top_k, history, source):
+    cleaner = DataCleaner()
+    raw = add_student_ids(raw)
+    key = id_column(raw)
+    state = store.load(roster)
+    previous_results = state['results'] if state is not None and state['key'] == key else {}
+
+    diffable = can_diff(state, raw, key, predictor)
+    if diffable:
+        delta = diff_rosters(state['raw'], raw, key)
+        diffable = not unfilled_nulls(raw[raw[key].isin(set(delta['new']) | set(delta['changed']))], state['cleaning'])
+    if diffable:
+        mode = 'delta'
+        cleaning = state['cleaning']
+        totals = state['totals']
+        leaving = delta['removed'] + delta['changed']
+    else:
+        mode = 'full'
+        ids = raw[key].tolist()
+        current = set(ids)
+        delta = {
+            'new': [i for i in ids if i not in previous_results],
+            'changed': [i for i in ids if i in previous_results],
+            'removed': [i for i in previous_results if i not in current],
+            'unchanged': [],
+        }
+        cleaning = cleaner.fit_cleaning_state(raw)
+        totals = None
+        leaving = []
+
+    rows = raw[raw[key].isin(set(delta['new']) | set(delta['changed']))]
+    student_ids = rows[key].tolist()
+    new_results = {}
+    explained_rows = cache_hits = 0
+    if len(rows):
+        df = create_new_features(cleaner.apply_cleaning_state(rows.copy(), cleaning))
+        if history is not None and source:
+            df = add_longitudinal_features(df, student_ids, history, source)
+        X_pred, _ = prepare_for_training(df, 'at_risk')
+        scored, explained_rows, cache_hits = score_with_cache(
+            cache, predictor, X_pred, df, student_ids, predict, explain_budget, top_k
+        )
+        new_results = dict(zip(student_ids, scored))
+
+    removed = set(delta['removed'])
+    results_by_id = {} if mode == 'full' else {i: r for i, r in previous_results.items() if i not in removed}
+    results_by_id.update(new_results)
+    totals = update_totals(totals, [previous_results[i] for i in leaving], new_results.values())
+
+    store.save(roster, {
+        'key': key,
+        'model_type': predictor.model_type,
+        'model_version': predictor.version,
+        'raw': raw,
+        'cleaning': cleaning,
+        'results': results_by_id,
+        'totals': totals,
+    })
+    return {
+        'mode': mode,
+        'results': [results_by_id[i] for i in raw[key].tolist()],
+        'summary': summary_from_totals(totals),
+        'delta': delta,
+        'transitions': risk_transitions(previous_results, new_results),
+        'rescored': len(new_results),
+        'explained_rows': explained_rows,
+        'cache_hits': cache_hits,
+    }
@@ -0,0 +1,280 @@
+"""
+Sharded Forest Training Module
+Grows a random forest as independent sub-forests in worker processes or on other nodes, then merges the trees
+"""
+
+import copy
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+
+from prediction.predictor import DEFAULT_MODEL_PARAMS
+from monitoring.drift import sketch_frame
+from monitoring.metrics import timed
+
+
+JOB_FILE = 'job.json'
+SHARD_MODES = ('bootstrap', 'shard')
+DEFAULT_LEASE_SECONDS = 600  # A claimed task with no result after this long may be run by another worker
+
+
+def _write_atomic(path, write):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _save_array(path, array):
+    def write(tmp_path):
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+    _write_atomic(path, write)
+
+
+def _save_json(path, payload):
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f, indent=2)
+    _write_atomic(path, write)
+
+
+def split_trees(n_estimators, n_tasks):
+    """Tree counts per task, as even as possible"""
+    base, extra = divmod(n_estimators, n_tasks)
+    return [base + (i < extra) for i in range(n_tasks)]
+
+
+def stratified_shards(y, n_shards, random_state):
+    """Row indices of n_shards disjoint shards, each class dealt round-robin so every shard sees every class"""
+    rng = np.random.default_rng(random_state)
+    shards = [[] for _ in range(n_shards)]
+    for label in np.unique(y):
+        rows = rng.permutation(np.flatnonzero(y == label))
+        if len(rows) < n_shards:
+            raise ValueError(f'Class {label} has {len(rows)} rows; shard mode needs at least one per shard ({n_shards})')
+        for i in range(n_shards):
+            shards[i].append(rows[i::n_shards])
+    return [np.sort(np.concatenate(parts)) for parts in shards]
+
+
+def plan_job(job_dir, X, y, n_tasks, model_params=None, mode='bootstrap', random_state=42, feature_names=None):
+    """Write the training data and one task per sub-forest into job_dir.
+
+    In bootstrap mode every task bootstraps its trees from the full data; in
+    shard mode each task only gets (and only reads) its own stratified slice
+    of the rows. Task seeds come from random_state, so the merged forest is
+    the same however many workers run the tasks.
+    """
+    if mode not in SHARD_MODES:
+        raise ValueError(f"Unknown shard mode: {mode} (use {' or '.join(SHARD_MODES)})")
+    params = {**DEFAULT_MODEL_PARAMS['random_forest'], **(model_params or {})}
+    tree_counts = split_trees(params.pop('n_estimators'), n_tasks)
+    if min(tree_counts) < 1:
+        raise ValueError(f'Cannot split {sum(tree_counts)} trees into {n_tasks} tasks')
+    params.pop('random_state', None)
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.asarray(y)
+
+    os.makedirs(job_dir, exist_ok=True)
+    for name in os.listdir(job_dir):
+        # Results and claims of an earlier job in the same directory
+        if name.startswith(('trees-', 'task-')) or name == JOB_FILE:
+            os.remove(os.path.join(job_dir, name))
+    seeds = np.random.SeedSequence(random_state).generate_state(n_tasks)
+    if mode == 'bootstrap':
+        _save_array(os.path.join(job_dir, 'X.npy'), X)
+        _save_array(os.path.join(job_dir, 'y.npy'), y)
+        data = [('X.npy', 'y.npy')] * n_tasks
+    else:
+        data = []
+        for i, rows in enumerate(stratified_shards(y, n_tasks, random_state)):
+            _save_array(os.path.join(job_dir, f'X-{i:03d}.npy'), X[rows])
+            _save_array(os.path.join(job_dir, f'y-{i:03d}.npy'), y[rows])
+            data.append((f'X-{i:03d}.npy', f'y-{i:03d}.npy'))
+
+    job = {
+        'mode': mode,
+        'model_params': params,
+        'feature_names': feature_names,
+        'classes': np.unique(y).tolist(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'tasks': [
+            {'task': i, 'n_estimators': trees, 'seed': int(seed), 'X': X_file, 'y': y_file}
+            for i, (trees, seed, (X_file, y_file)) in enumerate(zip(tree_counts, seeds, data))
+        ],
+    }
+    _save_json(os.path.join(job_dir, JOB_FILE), job)
+    return job
+
+
+def load_job(job_dir):
+    with open(os.path.join(job_dir, JOB_FILE)) as f:
+        return json.load(f)
+
+
+def result_path(job_dir, task):
+    return os.path.join(job_dir, f'trees-{task:03d}.joblib')
+
+
+def _claim(job_dir, task, lease_seconds):
+    """Claim a task by creating its claim file; an expired claim without a result can be taken over"""
+    path = os.path.join(job_dir, f'task-{task:03d}.claim')
+    owner = f'{socket.gethostname()}:{os.getpid()}'
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            expired = time.time() - os.path.getmtime(path) > lease_seconds
+        except OSError:
+            return False
+        if not expired:
+            return False
+        # Two workers may both take over an expired task; the seeded trees they write are identical
+        fd = os.open(path, os.O_WRONLY | os.O_TRUNC)
+    with os.fdopen(fd, 'w') as f:
+        f.write(owner)
+    return True
+
+
+def run_task(job_dir, task, model_params, classes):
+    X = np.load(os.path.join(job_dir, task['X']), mmap_mode='r')
+    y = np.load(os.path.join(job_dir, task['y']), mmap_mode='r')
+    forest = RandomForestClassifier(n_estimators=task['n_estimators'], random_state=task['seed'], **model_params)
+    forest.fit(X, y)
+    if forest.classes_.tolist() != classes:
+        raise ValueError(f"Task {task['task']} saw classes {forest.classes_.tolist()}, expected {classes}")
+    _write_atomic(result_path(job_dir, task['task']), lambda tmp: joblib.dump(forest, tmp))
+
+
+def run_worker(job_dir, lease_seconds=DEFAULT_LEASE_SECONDS, poll_seconds=0.5, wait=False):
+    """Claim and run tasks of the job in job_dir until none are left; returns the task ids this worker ran.
+
+    Workers on other nodes only need job_dir on a shared filesystem. With
+    wait, the worker first waits for the job to be planned and keeps
+    checking for expired claims until every task has a result.
+    """
+    while not os.path.exists(os.path.join(job_dir, JOB_FILE)):
+        if not wait:
+            raise FileNotFoundError(f'No {JOB_FILE} in {job_dir}')
+        time.sleep(poll_seconds)
+    job = load_job(job_dir)
+    done = []
+    while True:
+        pending = [t for t in job['tasks'] if not os.path.exists(result_path(job_dir, t['task']))]
+        if not pending:
+            return done
+        claimed = False
+        for task in pending:
+            if _claim(job_dir, task['task'], lease_seconds):
+                run_task(job_dir, task, job['model_params'], job['classes'])
+                done.append(task['task'])
+                claimed = True
+        if not claimed:
+            if not wait:
+                return done
+            time.sleep(poll_seconds)
+
+
+def wait_for_results(job_dir, timeout=None, poll_seconds=0.5, workers=()):
+    job = load_job(job_dir)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        missing = [t['task'] for t in job['tasks'] if not os.path.exists(result_path(job_dir, t['task']))]
+        if not missing:
+            return job
+        if workers and all(not w.is_alive() for w in workers):
+            raise RuntimeError(f'Workers exited without finishing tasks {missing}')
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError(f'Tasks {missing} not finished after {timeout}s')
+        time.sleep(poll_seconds)
+
+
+def merge_forests(forests):
+    """One forest holding the trees of all sub-forests, which must share classes and features"""
+    merged = copy.copy(forests[0])
+    for forest in forests[1:]:
+        if not np.array_equal(forest.classes_, merged.classes_) or forest.n_features_in_ != merged.n_features_in_:
+            raise ValueError('Sub-forests were trained on different classes or features')
+    merged.estimators_ = [tree for forest in forests for tree in forest.estimators_]
+    merged.n_estimators = len(merged.estimators_)
+    merged.random_state = None
+    return merged
+
+
+def merge_job(job_dir):
+    job = load_job(job_dir)
+    return merge_forests([joblib.load(result_path(job_dir, t['task'])) for t in job['tasks']])
+
+
+def start_local_workers(job_dir, n_workers, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Worker processes on this machine standing in for nodes (spawned, like the batch pool)"""
+    context = multiprocessing.get_context('spawn')
+    workers = [
+        context.Process(target=run_worker, args=(job_dir, lease_seconds), name=f'forest-worker-{i}', daemon=True)
+        for i in range(n_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+@timed('train')
+def train_sharded(predictor, X, y, n_workers=2, n_tasks=None, mode='bootstrap', job_dir=None,
+                  test_size=0.2, random_state=42, timeout=None):
+    """Train predictor's random forest as n_tasks sub-forests on worker processes and merge them.
+
+    The held-out split matches StudentPredictor.train. With n_workers=0 no
+    local workers are started and the job in job_dir (shared with the other
+    nodes) waits for their run_worker calls. Returns train and test accuracy
+    like train().
+    """
+    if predictor.model_type != 'random_forest':
+        raise ValueError('Sharded training only applies to random forests')
+    predictor.profile = sketch_frame(X).to_dict()
+    if hasattr(X, 'columns'):
+        predictor.feature_names = X.columns.tolist()
+        X = X.values
+    y = np.asarray(y)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    X_train = predictor.fit_outlier_bounds(X_train)
+    X_test = predictor.clip_outliers(X_test)
+
+    n_tasks = n_tasks or max(1, n_workers)
+    temporary = job_dir is None
+    job_dir = job_dir or tempfile.mkdtemp(prefix='forest-job-')
+    try:
+        plan_job(job_dir, X_train, y_train, n_tasks, predictor.model_params, mode, random_state, predictor.feature_names)
+        workers = start_local_workers(job_dir, n_workers) if n_workers else []
+        try:
+            wait_for_results(job_dir, timeout, workers=workers)
+        finally:
+            for worker in workers:
+                worker.join(timeout=5)
+                if worker.is_alive():
+                    worker.terminate()
+        predictor.model = merge_job(job_dir)
+    finally:
+        if temporary:
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+    predictor.is_trained = True
+    return {
+        'train_accuracy': predictor.model.score(X_train, y_train),
+        'test_accuracy': predictor.model.score(X_test, y_test),
+        'tasks': n_tasks,
+        'n_estimators': predictor.model.n_estimators,
+    }
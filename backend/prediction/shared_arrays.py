@@ -0,0 +1,80 @@
+"""
+Shared Arrays Module
+NumPy arrays that pool workers attach to by name instead of receiving pickled copies
+"""
+
+import os
+import tempfile
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+SHARED_BACKENDS = ('shm', 'memmap')
+
+
+class SharedArray:
+    """An ndarray backed by multiprocessing.shared_memory or a .npy memmap file.
+
+    The creating process owns the buffer and unlinks it on close. Workers call
+    attach(spec) with the small picklable spec to get a view of the same
+    memory; their writes are visible to the owner without any copying.
+    """
+
+    def __init__(self, array, spec, shm=None, owner=False):
+        self.array = array
+        self.spec = spec
+        self._shm = shm
+        self._owner = owner
+
+    @classmethod
+    def create(cls, shape, dtype='float64', backend='shm', folder=None):
+        if backend not in SHARED_BACKENDS:
+            raise ValueError(f'Unknown shared array backend: {backend}')
+        shape = tuple(int(n) for n in shape)
+        dtype = np.dtype(dtype)
+        if backend == 'shm':
+            size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+            shm = shared_memory.SharedMemory(create=True, size=size)
+            array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            spec = {'backend': 'shm', 'name': shm.name, 'shape': shape, 'dtype': dtype.str}
+            return cls(array, spec, shm=shm, owner=True)
+
+        fd, path = tempfile.mkstemp(dir=folder, prefix='shared_', suffix='.npy')
+        os.close(fd)
+        array = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+        spec = {'backend': 'memmap', 'path': path, 'shape': shape, 'dtype': dtype.str}
+        return cls(array, spec, owner=True)
+
+    @classmethod
+    def from_array(cls, values, backend='shm', folder=None):
+        values = np.asarray(values)
+        shared = cls.create(values.shape, values.dtype, backend, folder)
+        shared.array[...] = values
+        return shared
+
+    @classmethod
+    def attach(cls, spec):
+        if spec['backend'] == 'shm':
+            shm = shared_memory.SharedMemory(name=spec['name'])
+            array = np.ndarray(spec['shape'], dtype=np.dtype(spec['dtype']), buffer=shm.buf)
+            return cls(array, spec, shm=shm)
+        return cls(np.load(spec['path'], mmap_mode='r+'), spec)
+
+    def close(self):
+        # Views must be released before the shared memory buffer can be closed
+        self.array = None
+        if self._shm is not None:
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+            self._shm = None
+        elif self._owner and os.path.exists(self.spec['path']):
+            os.remove(self.spec['path'])
+        self._owner = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,233 @@
+"""
+Hyperparameter Tuning Module
+Cross-validated successive-halving search over the Random Forest and SVM grids
+"""
+
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold
+from sklearn.svm import SVC
+
+from preprocessing.data_cleaning import DataCleaner
+from prediction.predictor import DEFAULT_MODEL_PARAMS, StudentPredictor
+
+
+DEFAULT_GRIDS = {
+    'random_forest': {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [5, 10, None],
+        'min_samples_leaf': [1, 2, 4],
+    },
+    'svm': {
+        'C': [0.1, 1.0, 10.0],
+        'gamma': ['scale', 0.01, 0.1],
+    },
+}
+
+# Set in each worker process by _init_worker so the folds are shipped once per
+# worker rather than once per candidate.
+_FOLD_CACHE = None
+
+
+def expand_grid(grid):
+    """Turn {'param': [values]} into a list of parameter dicts"""
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def build_estimator(model_type, params):
+    if model_type == 'random_forest':
+        return RandomForestClassifier(**{**DEFAULT_MODEL_PARAMS['random_forest'], **params})
+    return SVC(**{**DEFAULT_MODEL_PARAMS['svm'], **params})
+
+
+class FoldCache:
+    """Cross-validation folds with their preprocessing done once up front.
+
+    Each fold is preprocessed as StudentPredictor.train does it: outlier
+    fences are fit on the training fold and both sides are clipped to them.
+    Candidates are then fitted on the same features the predictor sees.
+    """
+
+    def __init__(self, X, y, n_splits=5, random_state=42):
+        names = X.columns.tolist() if isinstance(X, pd.DataFrame) else [f'feature_{j}' for j in range(np.shape(X)[1])]
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y)
+        n_splits = max(2, min(n_splits, int(np.bincount(pd.factorize(y)[0]).min())))
+        splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+
+        self.n_splits = n_splits
+        self.folds = []
+        for train_idx, test_idx in splitter.split(X, y):
+            fold = {
+                'X_train': X[train_idx],
+                'X_test': X[test_idx],
+                'y_train': y[train_idx],
+                'y_test': y[test_idx],
+            }
+            bounds = DataCleaner().fit_outlier_bounds(pd.DataFrame(fold['X_train'], columns=names))
+            if bounds:
+                limits = np.array([bounds.get(name, (-np.inf, np.inf)) for name in names])
+                fold['X_train'] = np.clip(fold['X_train'], limits[:, 0], limits[:, 1])
+                fold['X_test'] = np.clip(fold['X_test'], limits[:, 0], limits[:, 1])
+            self.folds.append(fold)
+
+    def get(self, fold_id):
+        fold = self.folds[fold_id]
+        return fold['X_train'], fold['X_test'], fold['y_train'], fold['y_test']
+
+
+def _init_worker(fold_cache):
+    global _FOLD_CACHE
+    _FOLD_CACHE = fold_cache
+
+
+def _score_candidate(model_type, params, fold_id):
+    X_train, X_test, y_train, y_test = _FOLD_CACHE.get(fold_id)
+    start = time.perf_counter()
+    model = build_estimator(model_type, params)
+    model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+    return model.score(X_test, y_test), fit_time
+
+
+def halving_schedule(n_candidates, n_folds, eta=3):
+    """Number of folds each successive-halving round is evaluated on"""
+    n_rounds = max(1, int(math.ceil(math.log(max(n_candidates, 1), eta))) + 1)
+    schedule = [max(1, int(round(n_folds / eta ** (n_rounds - 1 - r)))) for r in range(n_rounds)]
+    schedule[-1] = n_folds
+    return sorted(set(schedule))
+
+
+def successive_halving(candidates, fold_cache, eta=3, n_jobs=1):
+    """Evaluate candidates on a growing number of folds, keeping the top 1/eta each round.
+
+    Scores from earlier rounds are reused, so a surviving candidate is only
+    fitted on folds it has not seen yet. Returns a leaderboard sorted best first.
+    """
+    entries = [
+        {'model_type': model_type, 'params': params, 'scores': [], 'fit_time': 0.0, 'eliminated_round': None}
+        for model_type, params in candidates
+    ]
+    alive = list(range(len(entries)))
+    schedule = halving_schedule(len(entries), fold_cache.n_splits, eta)
+
+    executor = None
+    if n_jobs and n_jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(fold_cache,))
+    else:
+        _init_worker(fold_cache)
+
+    try:
+        for round_id, n_folds in enumerate(schedule):
+            tasks = [
+                (i, fold_id)
+                for i in alive
+                for fold_id in range(len(entries[i]['scores']), n_folds)
+            ]
+            if executor is not None:
+                futures = [
+                    executor.submit(_score_candidate, entries[i]['model_type'], entries[i]['params'], fold_id)
+                    for i, fold_id in tasks
+                ]
+                outcomes = [f.result() for f in futures]
+            else:
+                outcomes = [_score_candidate(entries[i]['model_type'], entries[i]['params'], fold_id) for i, fold_id in tasks]
+
+            for (i, _), (score, fit_time) in zip(tasks, outcomes):
+                entries[i]['scores'].append(score)
+                entries[i]['fit_time'] += fit_time
+
+            if round_id == len(schedule) - 1 or len(alive) == 1:
+                break
+            alive.sort(key=lambda i: np.mean(entries[i]['scores']), reverse=True)
+            keep = max(1, int(math.ceil(len(alive) / eta)))
+            for i in alive[keep:]:
+                entries[i]['eliminated_round'] = round_id
+            alive = alive[:keep]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    leaderboard = []
+    for entry in entries:
+        scores = entry['scores']
+        leaderboard.append({
+            'model_type': entry['model_type'],
+            'params': entry['params'],
+            'mean_score': float(np.mean(scores)),
+            'std_score': float(np.std(scores)),
+            'folds_evaluated': len(scores),
+            'fit_time': round(entry['fit_time'], 4),
+            'eliminated_round': entry['eliminated_round'],
+        })
+    # Candidates that survived to the end rank ahead of those cut early.
+    leaderboard.sort(key=lambda e: (e['folds_evaluated'], e['mean_score']), reverse=True)
+    for rank, entry in enumerate(leaderboard, 1):
+        entry['rank'] = rank
+    return leaderboard
+
+
+def tune_models(X, y, model_types=('random_forest', 'svm'), grids=None, n_splits=5, eta=3, n_jobs=1, random_state=42):
+    grids = grids or DEFAULT_GRIDS
+    feature_names = X.columns.tolist() if isinstance(X, pd.DataFrame) else None
+    fold_cache = FoldCache(X, y, n_splits=n_splits, random_state=random_state)
+
+    candidates = [(model_type, params) for model_type in model_types for params in expand_grid(grids[model_type])]
+    start = time.perf_counter()
+    leaderboard = successive_halving(candidates, fold_cache, eta=eta, n_jobs=n_jobs)
+
+    best = {}
+    for entry in leaderboard:
+        best.setdefault(entry['model_type'], entry)
+    return {
+        'leaderboard': leaderboard,
+        'best': best,
+        'winner': leaderboard[0],
+        'n_candidates': len(candidates),
+        'n_splits': fold_cache.n_splits,
+        'feature_names': feature_names,
+        'elapsed_seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def fit_winner(model_type, params, X, y):
+    """Refit a tuned configuration on the full dataset as a StudentPredictor"""
+    predictor = StudentPredictor(model_type=model_type, model_params=params)
+    predictor.fit(X, y)
+    return predictor
+
+
+def save_tuning_results(result, X, y, registry, leaderboard_path=None, promote=True):
+    """Register (and by default promote) the best model of each type and write the leaderboard report"""
+    saved = {}
+    for model_type, entry in result['best'].items():
+        predictor = fit_winner(model_type, entry['params'], X, y)
+        version = registry.register(predictor, {'source': 'tuning', 'cv_score': entry['mean_score']})
+        if promote:
+            registry.promote(model_type, version)
+        saved[model_type] = version
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'winner': result['winner'],
+        'n_candidates': result['n_candidates'],
+        'n_splits': result['n_splits'],
+        'elapsed_seconds': result['elapsed_seconds'],
+        'saved_versions': saved,
+        'promoted': promote,
+        'leaderboard': result['leaderboard'],
+    }
+    leaderboard_path = leaderboard_path or os.path.join(registry.root, 'tuning_leaderboard.json')
+    os.makedirs(os.path.dirname(leaderboard_path), exist_ok=True)
+    with open(leaderboard_path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    return report
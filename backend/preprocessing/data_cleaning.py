@@ -2,12 +2,24 @@ import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 
+from monitoring.metrics import timed
+from ingestion.excel import is_excel, load_sheet
+
+
+# Default fence multipliers: Tukey's "far out" fences and the modified z-score cut-off
+OUTLIER_METHODS = {'iqr': 3.0, 'mad': 3.5}
+MAD_SCALE = 1.4826  # MAD x this = standard deviation for normal data
+OUTLIER_ACTIONS = ('clip', 'flag', 'drop')
+STATE_MAX_DISTINCT = 100000  # Values counted per numeric column before the counts are folded (approximate median)
+
 
 class DataCleaner:
     def __init__(self):
         self.scaler = StandardScaler()
         self.label_encoders = {}
+        self.outlier_bounds = None
 
+    @timed('load_csv')
     def load_csv(self, file_path):
         df = pd.read_csv(file_path)
         return df
@@ -34,16 +46,119 @@ class DataCleaner:
                 df[col] = self.label_encoders[col].fit_transform(df[col].astype(str))
         return df
 
+    @timed('load_excel')
+    def load_excel(self, file_path, sheet=None):
+        return load_sheet(file_path, sheet)
+
+    def load_data(self, file_path, sheet=None):
+        if is_excel(file_path):
+            return self.load_excel(file_path, sheet)
+        return self.load_csv(file_path)
+
+    @timed('clean_data')
     def clean_data(self, df):
         df = self.handle_missing_values(df)
         df = self.encode_text_to_numbers(df)
         return df
 
+    def fit_cleaning_state(self, df):
+        """Fill values and text categories clean_data would derive from df, for reuse on later rows.
+
+        Every numeric column gets its median, not just those with nulls in df,
+        so later rows with nulls in other columns are filled too.
+        """
+        fill_values = {}
+        for col in df.select_dtypes(include=[np.number]).columns:
+            fill_values[col] = df[col].median()
+        categories = {}
+        for col in df.select_dtypes(include=['object']).columns:
+            mode = df[col].mode()
+            fill_values[col] = mode[0] if len(mode) > 0 else 'Unknown'
+            categories[col] = sorted(df[col].fillna(fill_values[col]).astype(str).unique())
+        return {'fill_values': fill_values, 'categories': categories}
+
+    def fit_cleaning_state_chunks(self, chunks, text_columns=None):
+        """fit_cleaning_state over all chunks of a file, keeping only per-column value counts.
+
+        Fill values are the whole file's medians and modes, so chunks cleaned
+        with the state match clean_data on the whole file. text_columns limits
+        the text columns that get categories (e.g. to the model's features).
+        """
+        numeric, text, text_seen, has_nulls = {}, {}, set(), set()
+        for df in chunks:
+            has_nulls.update(df.columns[df.isnull().any()])
+            for col in df.select_dtypes(include=[np.number]).columns:
+                counts = _merge_counts(numeric.get(col), df[col].value_counts())
+                numeric[col] = _fold_counts(counts, STATE_MAX_DISTINCT // 2) if len(counts) > STATE_MAX_DISTINCT else counts
+            for col in df.select_dtypes(include=['object']).columns:
+                text_seen.add(col)
+                if text_columns is None or col in text_columns:
+                    text[col] = _merge_counts(text.get(col), df[col].value_counts())
+
+        fill_values = {col: _counts_median(counts) for col, counts in numeric.items() if col not in text_seen}
+        categories = {}
+        for col, counts in text.items():
+            modes = counts.index[counts.to_numpy() == counts.max()] if len(counts) else []
+            fill_values[col] = sorted(modes)[0] if len(modes) else 'Unknown'
+            values = set(counts.index) | ({fill_values[col]} if col in has_nulls else set())
+            categories[col] = sorted({str(value) for value in values})
+        return {'fill_values': fill_values, 'categories': categories}
+
+    def apply_cleaning_state(self, df, state):
+        """Clean rows with a stored state; matches clean_data on the frame the state was fit on"""
+        fill_values = {col: value for col, value in state['fill_values'].items() if col in df.columns}
+        df = df.fillna(fill_values)
+        for col, categories in state['categories'].items():
+            if col in df.columns:
+                codes = {category: code for code, category in enumerate(categories)}
+                # Categories not seen when the state was fit get the next free code
+                df[col] = df[col].astype(str).map(codes).fillna(len(categories)).astype(int)
+        return df
+
+    def fit_outlier_bounds(self, df, method='iqr', k=None):
+        """Robust {column: [low, high]} fences for every numeric column, in one vectorized pass"""
+        columns = [c for c in df.select_dtypes(include=[np.number]).columns if c not in ID_COLUMNS]
+        values = df[columns].to_numpy(dtype=np.float64)
+        if not values.size:
+            return {}
+        q1, median, q3 = np.nanquantile(values, [0.25, 0.5, 0.75], axis=0)
+        mad = np.nanmedian(np.abs(values - median), axis=0) if method == 'mad' else None
+        return bounds_by_column(columns, *robust_bounds(q1, median, q3, mad, method, k))
+
+    def outlier_mask(self, df, bounds):
+        """Boolean frame of the bounded columns: True where a value falls outside its fences"""
+        columns = [c for c in bounds if c in df.columns]
+        low, high = np.array([bounds[c] for c in columns], dtype=np.float64).reshape(-1, 2).T
+        values = df[columns].to_numpy(dtype=np.float64)
+        return pd.DataFrame((values < low) | (values > high), index=df.index, columns=columns)
+
+    def remove_outliers(self, df, bounds, action='clip'):
+        """clip values to their fences, flag rows (outlier_count column) or drop them"""
+        if action not in OUTLIER_ACTIONS:
+            raise ValueError(f"Unknown outlier action: {action} (use {', '.join(OUTLIER_ACTIONS)})")
+        mask = self.outlier_mask(df, bounds)
+        if action == 'clip':
+            columns = mask.columns.tolist()
+            low, high = np.array([bounds[c] for c in columns], dtype=np.float64).reshape(-1, 2).T
+            df[columns] = np.clip(df[columns].to_numpy(dtype=np.float64), low, high)
+        elif action == 'flag':
+            df['outlier_count'] = mask.sum(axis=1)
+        else:
+            df = df[~mask.any(axis=1)]
+        return df
+
     def encode_categorical_features(self, df):
         return self.encode_text_to_numbers(df)
 
-    def clean_pipeline(self, df, remove_outliers_flag=True, normalize_flag=True):
+    @timed('clean_pipeline')
+    def clean_pipeline(self, df, remove_outliers_flag=True, normalize_flag=True, outlier_bounds=None,
+                       outlier_action='clip'):
         df = self.handle_missing_values(df)
+        if remove_outliers_flag:
+            # Fences come from the numeric columns before text is encoded; pass the
+            # training bounds (self.outlier_bounds) when cleaning new data
+            self.outlier_bounds = outlier_bounds if outlier_bounds is not None else self.fit_outlier_bounds(df)
+            df = self.remove_outliers(df, self.outlier_bounds, outlier_action)
         df = self.encode_text_to_numbers(df)
         if normalize_flag:
             numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
@@ -55,8 +170,75 @@ class DataCleaner:
         return add_student_ids(df)
 
 
+ID_COLUMNS = ('student_id', 'roll_number', 'id')
+
+
+def id_column(df):
+    """The column students are keyed by, if the upload has one"""
+    for column in ID_COLUMNS:
+        if column in df.columns:
+            return column
+    return None
+
+
+def _merge_counts(counts, more):
+    return more if counts is None else pd.concat([counts, more]).groupby(level=0).sum()
+
+
+def _fold_counts(counts, size):
+    """Fold sorted value counts into size weighted centroids"""
+    weights = counts.to_numpy(dtype=np.float64)
+    cumulative = np.cumsum(weights)
+    bucket = np.minimum(((cumulative - weights / 2) / cumulative[-1] * size).astype(np.int64), size - 1)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    merged = np.add.reduceat(weights, starts)
+    return pd.Series(merged, index=np.add.reduceat(counts.index.to_numpy(dtype=np.float64) * weights, starts) / merged)
+
+
+def _counts_median(counts):
+    """Median of the values counts was taken from (the mean of the middle two for an even count)"""
+    if not len(counts):
+        return np.nan
+    cumulative = np.cumsum(counts.to_numpy())
+    values = counts.index.to_numpy(dtype=np.float64)
+    total = cumulative[-1]
+    lower = values[np.searchsorted(cumulative, (total - 1) // 2, side='right')]
+    upper = values[np.searchsorted(cumulative, total // 2, side='right')]
+    return float((lower + upper) / 2)
+
+
+def robust_bounds(q1, median, q3, mad=None, method='iqr', k=None):
+    """(low, high) arrays of IQR or MAD fences; columns without spread are left unbounded"""
+    if method not in OUTLIER_METHODS:
+        raise ValueError(f"Unknown outlier method: {method} (use {' or '.join(OUTLIER_METHODS)})")
+    k = OUTLIER_METHODS[method] if k is None else k
+    if method == 'iqr':
+        spread = q3 - q1
+        low, high = q1 - k * spread, q3 + k * spread
+    else:
+        spread = MAD_SCALE * mad
+        low, high = median - k * spread, median + k * spread
+    unbounded = ~(spread > 0)
+    return np.where(unbounded, -np.inf, low), np.where(unbounded, np.inf, high)
+
+
+def bounds_by_column(columns, low, high):
+    return {c: [float(lo), float(hi)] for c, lo, hi in zip(columns, low, high) if np.isfinite(lo) and np.isfinite(hi)}
+
+
+def outlier_bounds_from_sketch(sketch, method='iqr', k=None):
+    """Fences from a streaming DatasetSketch's quantile digests, for data seen in chunks"""
+    n = len(sketch.feature_names)
+    quantiles = np.array([[sketch.quantile(j, q) for q in (0.25, 0.5, 0.75)] for j in range(n)], dtype=np.float64).reshape(n, 3)
+    q1, median, q3 = quantiles.T
+    mad = None
+    if method == 'mad':
+        mad = np.array([sketch.deviation_median(j, median[j]) for j in range(n)], dtype=np.float64)
+    return bounds_by_column(sketch.feature_names, *robust_bounds(q1, median, q3, mad, method, k))
+
+
 def add_student_ids(df):
-    if 'student_id' not in df.columns and 'roll_number' not in df.columns and 'id' not in df.columns:
+    if id_column(df) is None:
         df.insert(0, 'student_id', range(1, len(df) + 1))
     return df
 
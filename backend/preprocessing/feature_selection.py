@@ -1,10 +1,13 @@
 import pandas as pd
 
+from monitoring.metrics import timed
+
 
 class FeatureEngineer:
     def __init__(self):
         self.selected_features = None
 
+    @timed('create_new_features')
     def create_new_features(self, df):
         mark_cols = [col for col in df.columns if 'mark' in col.lower() or 'score' in col.lower()]
         if len(mark_cols) > 1:
@@ -24,6 +27,12 @@ class FeatureEngineer:
 
         return df
 
+    def add_history_features(self, df, history_features):
+        # history_features has one row per row of df, in the same order
+        for column in history_features.columns:
+            df[column] = history_features[column].to_numpy()
+        return df
+
     def prepare_for_training(self, df, target_column='at_risk'):
         id_cols = ['student_id', 'roll_number', 'id', 'name']
         feature_df = df.copy()
@@ -60,3 +69,7 @@ def prepare_for_training(df, target='at_risk'):
 
 def create_new_features(df):
     return FeatureEngineer().create_new_features(df)
+
+
+def add_history_features(df, history_features):
+    return FeatureEngineer().add_history_features(df, history_features)
@@ -0,0 +1,177 @@
+"""
+Student History Module
+Accumulates every scored upload per student and serves longitudinal window features
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from ingestion.uploads import read_metadata
+
+
+# Per-upload values kept for each student (NULL when an upload lacks the column)
+HISTORY_METRICS = ('average_marks', 'attendance_rate', 'assignment_completion_rate')
+HISTORY_FEATURES = ['history_uploads', 'marks_trend', 'marks_volatility', 'rolling_attendance']
+
+# An upload as the history store sees it: file name, the class/roster its ids belong to and its content hash
+UploadSource = namedtuple('UploadSource', ['name', 'scope', 'digest'])
+
+
+def upload_source(filepath, scope):
+    """UploadSource of an uploaded file, or None without a scope (its ids could collide with another class's)"""
+    if not scope:
+        return None
+    info = read_metadata(filepath) or {}
+    return UploadSource(os.path.basename(filepath), str(scope), info.get('sha256'))
+
+
+def scoped_keys(keys, scope=None):
+    return [f'{scope}/{k}' if scope else str(k) for k in keys]
+
+
+class HistoryStore:
+    """SQLite store of one snapshot per (student, upload).
+
+    Snapshots are keyed by the student's id value within a scope (class or
+    roster) and the upload they came from. Uploads are identified by content
+    hash when known, so scoring the same file twice, or a re-upload of it,
+    does not add a second point.
+    Window features for a whole cohort come from one indexed join of the
+    cohort's ids against the (student_key, upload_id) primary key; the
+    per-student window aggregates are then computed with grouped array ops.
+    """
+
+    _SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS uploads (
+            upload_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL UNIQUE,
+            recorded_at REAL NOT NULL,
+            digest TEXT
+        );
+        CREATE TABLE IF NOT EXISTS snapshots (
+            student_key TEXT NOT NULL,
+            upload_id INTEGER NOT NULL,
+            average_marks REAL,
+            attendance_rate REAL,
+            assignment_completion_rate REAL,
+            PRIMARY KEY (student_key, upload_id)
+        ) WITHOUT ROWID;
+    '''
+
+    # Walks the primary key in order, so no sort is needed for the window step
+    _SNAPSHOT_QUERY = '''
+        SELECT s.student_key, s.average_marks, s.attendance_rate
+        FROM temp.history_lookup l JOIN snapshots s ON s.student_key = l.student_key
+        ORDER BY s.student_key, s.upload_id
+    '''
+
+    def __init__(self, path, window=5):
+        self.path = path
+        self.window = window
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.executescript(self._SCHEMA)
+        if 'digest' not in [row[1] for row in conn.execute('PRAGMA table_info(uploads)')]:
+            conn.execute('ALTER TABLE uploads ADD COLUMN digest TEXT')
+        conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS uploads_digest ON uploads (digest)')
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads, or across fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS history_lookup (student_key TEXT PRIMARY KEY)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def record(self, keys, df, source, scope=None, digest=None):
+        """Store the HISTORY_METRICS of a featurized upload; keys are the students' id values in scope"""
+        keys = scoped_keys(keys, scope)
+        columns = []
+        for metric in HISTORY_METRICS:
+            if metric == 'attendance_rate' and metric not in df.columns and 'attendance' in df.columns:
+                metric = 'attendance'
+            values = df[metric].astype(float) if metric in df.columns else pd.Series(np.nan, index=df.index)
+            columns.append(values.astype(object).where(values.notna(), None).tolist())
+
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if digest:
+                # A file name can be re-uploaded with new contents, so hashed uploads are told apart by hash
+                source = f'{source}@{digest[:12]}'
+                conn.execute('INSERT OR IGNORE INTO uploads (source, recorded_at, digest) VALUES (?, ?, ?)',
+                             (source, time.time(), digest))
+                row = conn.execute('SELECT upload_id FROM uploads WHERE digest = ?', (digest,)).fetchone()
+            else:
+                conn.execute('INSERT OR IGNORE INTO uploads (source, recorded_at) VALUES (?, ?)', (source, time.time()))
+                row = conn.execute('SELECT upload_id FROM uploads WHERE source = ?', (source,)).fetchone()
+            upload_id = row[0]
+            conn.executemany(
+                'INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)',
+                zip(keys, [upload_id] * len(keys), *columns)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return upload_id
+
+    def window_features(self, keys, scope=None):
+        """HISTORY_FEATURES for each key in order; all but the upload count use the last `window` uploads"""
+        keys = scoped_keys(keys, scope)
+        conn = self._connect()
+        conn.execute('DELETE FROM temp.history_lookup')
+        conn.executemany('INSERT OR IGNORE INTO temp.history_lookup VALUES (?)', ((k,) for k in keys))
+        snapshots = pd.read_sql_query(self._SNAPSHOT_QUERY, conn)
+        snapshots[['average_marks', 'attendance_rate']] = snapshots[['average_marks', 'attendance_rate']].astype(float)
+
+        # Upload index within each student (1 = oldest); keep the last `window` of them
+        groups = snapshots.groupby('student_key', sort=False)
+        snapshots['total'] = groups['student_key'].transform('size')
+        snapshots['x'] = groups.cumcount() + 1
+        recent = snapshots[snapshots['x'] > snapshots['total'] - self.window]
+        y = recent['average_marks']
+        x = recent['x'].where(y.notna())
+        stats = recent.assign(x=x, xy=x * y, xx=x * x, yy=y * y).groupby('student_key').agg(
+            uploads=('total', 'max'), n=('average_marks', 'count'), sx=('x', 'sum'), sy=('average_marks', 'sum'),
+            sxy=('xy', 'sum'), sxx=('xx', 'sum'), syy=('yy', 'sum'), rolling_attendance=('attendance_rate', 'mean'),
+        ).reindex(keys)
+
+        n = stats['n'].fillna(0).to_numpy()
+        sx, sy, sxy, sxx, syy = (stats[c].fillna(0).to_numpy(dtype=float) for c in ('sx', 'sy', 'sxy', 'sxx', 'syy'))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            denominator = n * sxx - sx * sx
+            trend = np.where((n >= 2) & (denominator > 0), (n * sxy - sx * sy) / denominator, 0.0)
+            mean = np.where(n > 0, sy / n, 0.0)
+            volatility = np.where(n >= 2, np.sqrt(np.maximum(syy / np.maximum(n, 1) - mean * mean, 0.0)), 0.0)
+
+        return pd.DataFrame({
+            'history_uploads': stats['uploads'].fillna(0).astype(int).to_numpy(),
+            'marks_trend': trend,
+            'marks_volatility': volatility,
+            'rolling_attendance': stats['rolling_attendance'].fillna(0).to_numpy(dtype=float),
+        })
+
+    def student_history(self, key, scope=None):
+        """All snapshots of one student, oldest first"""
+        rows = self._connect().execute(
+            'SELECT u.source, u.recorded_at, s.average_marks, s.attendance_rate, s.assignment_completion_rate '
+            'FROM snapshots s JOIN uploads u ON u.upload_id = s.upload_id '
+            'WHERE s.student_key = ? ORDER BY s.upload_id',
+            (scoped_keys([key], scope)[0],)
+        ).fetchall()
+        return [
+            dict(zip(('source', 'recorded_at', *HISTORY_METRICS), row))
+            for row in rows
+        ]
@@ -0,0 +1,100 @@
+"""
+Production Server
+Runs the Flask app under gunicorn with models preloaded in the master process
+"""
+
+import gc
+import os
+import signal
+import threading
+import time
+
+from gunicorn.app.base import BaseApplication
+
+from config import Config
+import app as api
+
+
+def watch_registry(poll_seconds):
+    """Send SIGHUP to the master when a model version is promoted.
+
+    On HUP gunicorn runs on_reload (which reloads the models in the master)
+    and then replaces the workers gracefully, so the new workers fork with
+    the new models already in shared memory.
+    """
+    def loaded_versions():
+        return {model_type: api.get_predictor(model_type).version for model_type in api.MODEL_TYPES}
+
+    def current_versions():
+        return {model_type: api.registry.current_version(model_type) for model_type in api.MODEL_TYPES}
+
+    def loop():
+        while True:
+            time.sleep(poll_seconds)
+            current, loaded = current_versions(), loaded_versions()
+            if any(v is not None and v != loaded[m] for m, v in current.items()):
+                os.kill(os.getpid(), signal.SIGHUP)
+
+    threading.Thread(target=loop, name='registry-watcher', daemon=True).start()
+
+
+def preload_models():
+    api.load_models()
+    # Move everything allocated so far out of the collector's generations so
+    # gc passes in the workers do not touch (and un-share) those pages.
+    gc.freeze()
+
+
+def when_ready(server):
+    watch_registry(Config.REGISTRY_POLL_SECONDS)
+
+
+def on_reload(server):
+    gc.unfreeze()
+    preload_models()
+    server.log.info('Reloaded models: %s', {m: api.get_predictor(m).version for m in api.MODEL_TYPES})
+
+
+def post_fork(server, worker):
+    api.reinit_after_fork()
+
+
+class StudentServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return api.app
+
+
+def build_options(workers=None, threads=None, bind=None):
+    return {
+        'bind': bind or Config.WEB_BIND,
+        'workers': workers or Config.WEB_WORKERS,
+        'threads': threads or Config.WEB_THREADS,
+        'worker_class': 'gthread',
+        'timeout': Config.WEB_TIMEOUT,
+        'graceful_timeout': Config.WEB_TIMEOUT,
+        'preload_app': True,
+        'when_ready': when_ready,
+        'on_reload': on_reload,
+        'post_fork': post_fork,
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--bind', type=str, default=None)
+    args = parser.parse_args()
+    options = build_options(args.workers, args.threads, args.bind)
+    api.configure_threads(options['threads'])
+    preload_models()
+    StudentServer(options).run()
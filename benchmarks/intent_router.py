@@ -0,0 +1,108 @@
+"""
+Intent Router Benchmark
+Compares chained substring checks with the compiled intent router as the intent table grows
+"""
+
+import json
+import os
+import random
+import statistics
+import string
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from genai.intents import QUICK_INTENTS, IntentRouter
+
+
+MESSAGES = [
+    'Why is this student at risk?',
+    'How can I help improve their marks?',
+    'What interventions work for students with poor attendance?',
+    'Explain how the prediction model works',
+    'Which grade band should we focus on this term?',
+    'hello',
+]
+
+
+def synthetic_intents(n_intents, seed=3):
+    """The real quick-reply table padded with random keyword intents of lower priority"""
+    rng = random.Random(seed)
+    intents = list(QUICK_INTENTS)
+    for i in range(n_intents - len(intents)):
+        keywords = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(6, 10))) for _ in range(3)]
+        intents.append({'name': f'intent_{i}', 'priority': 5, 'keywords': keywords, 'response': keywords[0]})
+    return intents
+
+
+def chained_match(intents, message):
+    """The if/elif chain the router replaces, in priority order"""
+    msg = message.lower()
+    for intent in intents:
+        if any(keyword in msg for keyword in intent['keywords']):
+            return intent
+    return None
+
+
+def _per_message_us(fn, messages, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for message in messages:
+            fn(message)
+        samples.append((time.perf_counter() - start) / len(messages))
+    return round(statistics.median(samples) * 1e6, 2)
+
+
+def run_intent_benchmark(intent_counts, repeats=200):
+    report = {'created_at': datetime.now().isoformat(), 'repeats': repeats, 'results': {}}
+    for n_intents in intent_counts:
+        intents = synthetic_intents(n_intents)
+        ordered = sorted(intents, key=lambda intent: -intent['priority'])
+        start = time.perf_counter()
+        router = IntentRouter(intents)
+        compile_s = time.perf_counter() - start
+
+        agree = all(
+            (router.match(m) or {}).get('name') == (chained_match(ordered, m) or {}).get('name')
+            for m in MESSAGES
+        )
+        chained_us = _per_message_us(lambda m: chained_match(ordered, m), MESSAGES, repeats)
+        router_us = _per_message_us(router.match, MESSAGES, repeats)
+        report['results'][str(n_intents)] = {
+            'compile_ms': round(compile_s * 1000, 2),
+            'chained_us': chained_us,
+            'router_us': router_us,
+            'speedup': round(chained_us / router_us, 2) if router_us else None,
+            'same_intents': agree,
+        }
+    return report
+
+
+def print_report(report):
+    print(f"{'intents':>8} {'chained us':>11} {'router us':>10} {'compile ms':>11} {'speedup':>8}")
+    for n_intents, r in report['results'].items():
+        print(f"{n_intents:>8} {r['chained_us']:>11.2f} {r['router_us']:>10.2f} {r['compile_ms']:>11.2f} "
+              f"{'x' + str(r['speedup']):>8}")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--intents', type=int, nargs='+', default=[5, 50, 500, 5000])
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--output', type=str, default=None)
+    args = parser.parse_args()
+
+    report = run_intent_benchmark(args.intents, args.repeats)
+    print_report(report)
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results',
+                                         f"intents_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
@@ -0,0 +1,158 @@
+"""
+Load Test
+Measures /api/predict throughput of backend/serve.py at several worker counts
+"""
+
+import json
+import os
+import signal
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BACKEND = os.path.join(ROOT, 'backend')
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_data import write_cohort_csv
+from run_benchmarks import train_benchmark_model
+from config import Config
+from prediction.registry import ModelRegistry
+
+
+def post_json(url, payload, timeout=120):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+        return response.status
+
+
+def wait_for_health(base_url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'{base_url}/api/health', timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            time.sleep(0.25)
+    return False
+
+
+def drive_load(base_url, filename, concurrency, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def client():
+        while time.time() < deadline:
+            start = time.perf_counter()
+            try:
+                post_json(f'{base_url}/api/predict', {'filename': filename, 'model_type': 'random_forest'})
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+            except OSError:
+                with lock:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'throughput_rps': round(len(latencies) / wall, 2),
+        'latency_p50_ms': round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        'latency_p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1) if latencies else None,
+    }
+
+
+def run_load_test(worker_counts, threads=2, students=2000, concurrency=None, duration=15, port=5055):
+    # The servers get their own registry, uploads and result cache so the live model and data are untouched
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    env = dict(
+        os.environ,
+        MODEL_REGISTRY_FOLDER=os.path.join(workdir, 'registry'),
+        UPLOAD_FOLDER=os.path.join(workdir, 'uploads'),
+        RESULT_CACHE_PATH=os.path.join(workdir, 'result_cache.sqlite3'),
+        HISTORY_ENABLED='False',
+    )
+    registry = ModelRegistry(env['MODEL_REGISTRY_FOLDER'], compact=Config.MODEL_COMPACT_ARTIFACTS)
+    registry.promote('random_forest', registry.register(train_benchmark_model('random_forest')))
+
+    filename = f'loadtest_{students}.csv'
+    os.makedirs(env['UPLOAD_FOLDER'])
+    write_cohort_csv(os.path.join(env['UPLOAD_FOLDER'], filename), students)
+    concurrency = concurrency or 2 * max(worker_counts) * threads
+
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'students_per_request': students,
+        'threads_per_worker': threads,
+        'concurrency': concurrency,
+        'duration_s': duration,
+        'cpu_count': os.cpu_count(),
+        'results': {},
+    }
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        for workers in worker_counts:
+            server = subprocess.Popen(
+                [sys.executable, 'serve.py', '--workers', str(workers), '--threads', str(threads), '--bind', f'127.0.0.1:{port}'],
+                cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            try:
+                if not wait_for_health(base_url):
+                    raise RuntimeError(f'Server with {workers} workers did not start')
+                post_json(f'{base_url}/api/predict', {'filename': filename, 'model_type': 'random_forest'})
+                report['results'][str(workers)] = drive_load(base_url, filename, concurrency, duration)
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=60)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = report['results'].get(str(worker_counts[0]), {}).get('throughput_rps')
+    for result in report['results'].values():
+        result['speedup'] = round(result['throughput_rps'] / baseline, 2) if baseline else None
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=2)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=None)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--output', type=str, default=None)
+    args = parser.parse_args()
+
+    report = run_load_test(args.workers, args.threads, args.students, args.concurrency, args.duration, args.port)
+    for workers, result in report['results'].items():
+        print(f"{workers:>3} workers: {result['throughput_rps']:>8.2f} req/s  p50 {result['latency_p50_ms']} ms  "
+              f"p95 {result['latency_p95_ms']} ms  x{result['speedup']}")
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results',
+                                         f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
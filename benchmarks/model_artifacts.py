@@ -0,0 +1,135 @@
+"""
+Model Artifact Benchmark
+Compares the joblib pickle and the compact forest artifact on size, load time and memory
+"""
+
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_data import generate_cohort
+from config import Config
+from preprocessing.data_cleaning import DataCleaner
+from preprocessing.feature_selection import create_new_features, create_risk_labels, prepare_for_training
+from prediction.predictor import StudentPredictor
+
+
+def training_data(n_students=5000, seed=11):
+    df = DataCleaner().clean_data(generate_cohort(n_students, seed=seed, missing_rate=0.02))
+    df = create_risk_labels(create_new_features(df), threshold=Config.RISK_THRESHOLD)
+    return prepare_for_training(df, 'at_risk')
+
+
+def measure_load(path, repeats=3):
+    """Load the artifact in fresh interpreters; returns median seconds and peak RSS growth in MB"""
+    samples = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--measure', path],
+            check=True, capture_output=True, text=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'load_s': round(statistics.median(s['load_s'] for s in samples), 5),
+        'rss_mb': round(statistics.median(s['rss_mb'] for s in samples), 1),
+    }
+
+
+def _measure_in_process(path):
+    import resource
+    import numpy as np
+
+    def rss_mb():
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+
+    before = rss_mb()
+    start = time.perf_counter()
+    predictor = StudentPredictor()
+    predictor.load_model(path)
+    elapsed = time.perf_counter() - start
+    predictor.model.predict_proba(np.zeros((1, predictor.model.n_features_in_)))
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({'load_s': elapsed, 'rss_mb': max(peak, rss_mb()) - before}))
+
+
+def run_artifact_benchmark(tree_counts, n_students=5000, repeats=3):
+    X, y = training_data(n_students)
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'training_rows': n_students,
+        'repeats': repeats,
+        'results': {},
+    }
+    work_dir = tempfile.mkdtemp(prefix='artifact_bench_')
+    try:
+        for n_trees in tree_counts:
+            predictor = StudentPredictor('random_forest', model_params={'n_estimators': n_trees, 'max_depth': None})
+            predictor.train(X, y)
+            pickle_path = os.path.join(work_dir, f'rf_{n_trees}.pkl')
+            compact_path = os.path.join(work_dir, f'rf_{n_trees}.forest')
+            predictor.save_model(pickle_path)
+            predictor.save_model(compact_path, compact=True)
+
+            result = {}
+            for name, path in (('pickle', pickle_path), ('compact', compact_path)):
+                result[name] = dict(measure_load(path, repeats), size_bytes=os.path.getsize(path),
+                                    size_mb=round(os.path.getsize(path) / 1024 / 1024, 3))
+
+            loaded = StudentPredictor()
+            loaded.load_model(compact_path)
+            sample = X.values[:2000]
+            result['identical_predictions'] = bool(
+                (loaded.model.predict_proba(sample) == predictor.model.predict_proba(sample)).all()
+            )
+            result['size_ratio'] = round(result['pickle']['size_bytes'] / result['compact']['size_bytes'], 2)
+            result['load_speedup'] = round(result['pickle']['load_s'] / max(result['compact']['load_s'], 1e-6), 2)
+            report['results'][str(n_trees)] = result
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+
+def print_report(report):
+    print(f"{'trees':>6} {'format':<8} {'size MB':>9} {'load ms':>9} {'RSS MB':>8}")
+    for n_trees, result in report['results'].items():
+        for name in ('pickle', 'compact'):
+            r = result[name]
+            print(f"{n_trees:>6} {name:<8} {r['size_mb']:>9.2f} {r['load_s'] * 1000:>9.1f} {r['rss_mb']:>8.1f}")
+        print(f"{'':>6} x{result['size_ratio']} smaller, x{result['load_speedup']} faster load, "
+              f"identical predictions: {result['identical_predictions']}")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--trees', type=int, nargs='+', default=[100, 300, 1000])
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', type=str, default=None)
+    parser.add_argument('--measure', type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        _measure_in_process(args.measure)
+        sys.exit(0)
+
+    report = run_artifact_benchmark(args.trees, args.students, args.repeats)
+    print_report(report)
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results',
+                                         f"artifacts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
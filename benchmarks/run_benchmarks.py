@@ -0,0 +1,239 @@
+"""
+Benchmark Harness
+Times each stage of the prediction pipeline on synthetic cohorts and records JSON results
+"""
+
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_data import generate_cohort, write_cohort_csv
+from config import Config
+from preprocessing.data_cleaning import DataCleaner
+from preprocessing.feature_selection import create_new_features, create_risk_labels, prepare_for_training
+from prediction.predictor import StudentPredictor
+from prediction.registry import ModelRegistry
+from prediction.attribution import top_contributions
+from prediction.explainability import explain_batch, summarize_results
+
+
+STAGES = ['load_csv', 'clean_data', 'create_new_features', 'predict', 'explain', 'summary', 'json_serialization', 'api_predict']
+
+try:
+    import resource
+
+    def peak_rss_mb():
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+except ImportError:
+    def peak_rss_mb():
+        return None
+
+
+def train_benchmark_model(model_type='random_forest', n_students=2000, seed=7):
+    cleaner = DataCleaner()
+    df = generate_cohort(n_students, seed=seed)
+    df = cleaner.clean_data(df)
+    df = create_new_features(df)
+    df = create_risk_labels(df, threshold=Config.RISK_THRESHOLD)
+    X, y = prepare_for_training(df, 'at_risk')
+    predictor = StudentPredictor(model_type)
+    predictor.train(X, y)
+    return predictor
+
+
+def run_pipeline_once(csv_path, predictor, flask_app):
+    """Run the /api/predict stages in order and return seconds per stage"""
+    timings = {}
+
+    start = time.perf_counter()
+    cleaner = DataCleaner()
+    df = cleaner.load_csv(csv_path)
+    df = cleaner.add_student_ids(df)
+    student_ids = df['student_id'].tolist()
+    timings['load_csv'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = cleaner.clean_data(df)
+    timings['clean_data'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = create_new_features(df)
+    timings['create_new_features'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    X_pred, _ = prepare_for_training(df, 'at_risk')
+    predictions, probabilities = predictor.predict(X_pred)
+    timings['predict'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    attribution = predictor.explain_contributions(X_pred, time_budget=Config.EXPLAIN_TIME_BUDGET_MS / 1000)
+    top_features = []
+    if attribution is not None:
+        top_features = top_contributions(attribution['values'], attribution['feature_names'], Config.EXPLAIN_TOP_FEATURES)
+    results = explain_batch(df, student_ids, predictions, probabilities, top_features)
+    timings['explain'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    summary = summarize_results(results, student_ids)
+    timings['summary'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with flask_app.app_context():
+        flask_app.json.dumps({'predictions': results, 'summary': summary})
+    timings['json_serialization'] = time.perf_counter() - start
+    return timings
+
+
+def run_api_once(client, filename, model_type):
+    start = time.perf_counter()
+    response = client.post('/api/predict', json={'filename': filename, 'model_type': model_type})
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError(f'/api/predict returned {response.status_code}')
+    return elapsed
+
+
+def summarize_timings(samples, n_students):
+    median = statistics.median(samples)
+    return {
+        'runs': len(samples),
+        'min_s': round(min(samples), 6),
+        'median_s': round(median, 6),
+        'mean_s': round(statistics.mean(samples), 6),
+        'rows_per_s': round(n_students / median, 1) if median > 0 else None,
+    }
+
+
+@contextlib.contextmanager
+def isolated_app(backend_app, work_dir):
+    """Point the app at scratch upload and registry folders, with the history store and result cache off.
+
+    Otherwise every timed request would be served from (and add to) the
+    production cache and student history.
+    """
+    saved_config = {name: backend_app.app.config[name] for name in ('UPLOAD_FOLDER', 'MODEL_REGISTRY_FOLDER')}
+    saved = {
+        name: getattr(backend_app, name)
+        for name in ('registry', 'result_cache', 'history', 'predictor_rf', 'predictor_svm')
+    }
+    upload_folder = os.path.join(work_dir, 'uploads')
+    registry_folder = os.path.join(work_dir, 'models')
+    os.makedirs(upload_folder, exist_ok=True)
+    backend_app.app.config.update(UPLOAD_FOLDER=upload_folder, MODEL_REGISTRY_FOLDER=registry_folder)
+    backend_app.registry = ModelRegistry(registry_folder)
+    backend_app.result_cache = None
+    backend_app.history = None
+    try:
+        yield upload_folder
+    finally:
+        backend_app.app.config.update(saved_config)
+        for name, value in saved.items():
+            setattr(backend_app, name, value)
+
+
+def run_benchmarks(sizes, repeats=3, model_type='random_forest', include_api=True):
+    import app as backend_app
+
+    predictor = train_benchmark_model(model_type)
+
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'model_type': model_type,
+        'repeats': repeats,
+        'results': {},
+    }
+    work_dir = tempfile.mkdtemp(prefix='student_bench_')
+    try:
+        with isolated_app(backend_app, work_dir) if include_api else contextlib.nullcontext() as upload_folder:
+            if include_api:
+                backend_app.set_predictor(model_type, predictor)
+                client = backend_app.app.test_client()
+            for n_students in sizes:
+                csv_path = write_cohort_csv(os.path.join(work_dir, f'cohort_{n_students}.csv'), n_students)
+                samples = {stage: [] for stage in STAGES}
+                for _ in range(repeats):
+                    for stage, seconds in run_pipeline_once(csv_path, predictor, backend_app.app).items():
+                        samples[stage].append(seconds)
+
+                if include_api:
+                    upload_name = f'benchmark_{n_students}.csv'
+                    shutil.copyfile(csv_path, os.path.join(upload_folder, upload_name))
+                    for _ in range(repeats):
+                        samples['api_predict'].append(run_api_once(client, upload_name, model_type))
+
+                report['results'][str(n_students)] = {
+                    'file_size_mb': round(os.path.getsize(csv_path) / 1024 / 1024, 3),
+                    'peak_rss_mb': peak_rss_mb(),
+                    'stages': {stage: summarize_timings(values, n_students) for stage, values in samples.items() if values},
+                }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+
+def compare_reports(current, previous, tolerance=0.2):
+    """Stages whose median time grew by more than tolerance relative to a previous run"""
+    regressions = []
+    for size, result in current['results'].items():
+        old = previous.get('results', {}).get(size)
+        if not old:
+            continue
+        for stage, timing in result['stages'].items():
+            old_timing = old['stages'].get(stage)
+            if not old_timing or not old_timing['median_s']:
+                continue
+            ratio = timing['median_s'] / old_timing['median_s']
+            if ratio > 1 + tolerance:
+                regressions.append({'size': size, 'stage': stage, 'ratio': round(ratio, 3),
+                                    'previous_s': old_timing['median_s'], 'current_s': timing['median_s']})
+    return regressions
+
+
+def print_report(report):
+    for size, result in report['results'].items():
+        print(f"\n{size} students ({result['file_size_mb']} MB)")
+        for stage, timing in result['stages'].items():
+            print(f"  {stage:<22}{timing['median_s'] * 1000:>12.1f} ms{timing['rows_per_s'] or 0:>14.0f} rows/s")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--model', type=str, default='random_forest', choices=['random_forest', 'svm'])
+    parser.add_argument('--skip-api', action='store_true')
+    parser.add_argument('--output', type=str, default=None)
+    parser.add_argument('--compare', type=str, default=None, help='Previous results JSON to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, repeats=args.repeats, model_type=args.model, include_api=not args.skip_api)
+    print_report(report)
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results',
+                                         f"pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_reports(report, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['size']} {r['stage']}: {r['previous_s']}s -> {r['current_s']}s (x{r['ratio']})")
+        sys.exit(1 if regressions else 0)
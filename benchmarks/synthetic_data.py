@@ -0,0 +1,69 @@
+"""
+Synthetic Cohort Generator
+Produces student records with the same schema as backend/data/sample_data.csv
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+COLUMNS = [
+    'student_id', 'name', 'math_marks', 'science_marks', 'english_marks', 'history_marks',
+    'attendance', 'total_classes', 'assignments_completed', 'total_assignments',
+    'previous_marks', 'class_participation'
+]
+
+SUBJECTS = ['math_marks', 'science_marks', 'english_marks', 'history_marks']
+
+
+def generate_cohort(n_students, seed=42, start_id=1, missing_rate=0.0):
+    """Generate n_students rows whose marks, attendance and assignments share a latent ability"""
+    rng = np.random.default_rng(seed)
+    ability = rng.normal(65, 15, n_students)
+
+    data = {
+        'student_id': np.arange(start_id, start_id + n_students),
+        'name': [f'Student {i}' for i in range(start_id, start_id + n_students)],
+    }
+    for subject in SUBJECTS:
+        data[subject] = np.clip(np.round(ability + rng.normal(0, 6, n_students)), 0, 100).astype(int)
+    data['total_classes'] = np.full(n_students, 100)
+    data['attendance'] = np.clip(np.round(55 + 0.5 * ability + rng.normal(0, 8, n_students)), 0, 100).astype(int)
+    data['total_assignments'] = np.full(n_students, 20)
+    data['assignments_completed'] = np.clip(np.round(ability / 5 + rng.normal(0, 2, n_students)), 0, 20).astype(int)
+    data['previous_marks'] = np.clip(np.round(ability + rng.normal(0, 8, n_students)), 0, 100).astype(int)
+    data['class_participation'] = np.clip(np.round(ability / 20 + rng.normal(0, 0.7, n_students)), 1, 5).astype(int)
+
+    df = pd.DataFrame(data)[COLUMNS]
+    if missing_rate > 0:
+        for column in SUBJECTS + ['attendance', 'previous_marks']:
+            mask = rng.random(n_students) < missing_rate
+            df[column] = df[column].astype(float).mask(mask)
+    return df
+
+
+def write_cohort_csv(path, n_students, seed=42, chunk_size=100000, missing_rate=0.0):
+    """Write a cohort to CSV chunk by chunk so large files never sit in memory at once"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    written = 0
+    with open(path, 'w', newline='') as f:
+        while written < n_students:
+            size = min(chunk_size, n_students - written)
+            chunk = generate_cohort(size, seed=seed + written, start_id=written + 1, missing_rate=missing_rate)
+            chunk.to_csv(f, header=written == 0, index=False)
+            written += size
+    return path
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--output', type=str, default='synthetic_cohort.csv')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--missing-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    write_cohort_csv(args.output, args.students, seed=args.seed, missing_rate=args.missing_rate)
+    print(f"Wrote {args.students} students to {args.output}")
@@ -1,6 +1,7 @@
 import os
 from typing import List, Dict, Optional
 from rag_pipeline import RAGPipeline, create_educational_knowledge_base
+from intents import CHATBOT_DEFAULT, CHATBOT_ROUTER
 
 try:
     import openai
@@ -68,59 +69,14 @@ Be empathetic, professional, and focus on solutions that help students succeed."
             return self._generate_fallback_response(user_message, None)
 
     def _generate_fallback_response(self, user_message: str, student_id: Optional[str]) -> str:
-        message_lower = user_message.lower()
-        if student_id:
-            student_context = self.rag_pipeline.retrieve_student_context(student_id)
-            if 'why' in message_lower and 'risk' in message_lower:
-                return self._explain_risk(student_context)
-            if 'how' in message_lower and ('improve' in message_lower or 'help' in message_lower):
-                return self._suggest_improvements(student_context)
-            if 'what' in message_lower and 'intervention' in message_lower:
-                return self._suggest_interventions(student_context)
-
-        if 'at risk' in message_lower or 'failing' in message_lower:
-            return """At-risk students are those predicted to have academic difficulties based on factors like:
-- Low attendance rates
-- Declining grades or marks
-- Incomplete assignments
-- Poor class participation
-
-Early identification allows for timely intervention and support."""
-
-        if 'intervention' in message_lower or 'help' in message_lower:
-            return """Effective interventions for at-risk students include:
-1. Personalized learning plans tailored to individual needs
-2. Regular one-on-one meetings to track progress
-3. Peer tutoring and mentorship programs
-4. Parent-teacher collaboration and communication
-5. Additional academic support and tutoring
-6. Study skills and time management training
-7. Addressing attendance and engagement issues
-8. Setting clear, achievable goals with regular check-ins"""
-
-        if 'attendance' in message_lower:
-            return """Attendance is critical for academic success. To improve attendance:
-- Identify and address barriers (transportation, health, family issues)
-- Implement positive reinforcement for good attendance
-- Communicate regularly with parents
-- Make learning engaging and relevant
-- Provide support for students facing challenges"""
-
-        if 'model' in message_lower or 'prediction' in message_lower:
-            return """The prediction system uses machine learning models (Random Forest and SVM) trained on historical student data.
-The models analyze factors like marks, attendance, assignments, and participation to predict which students may need support.
-The system provides probability scores and explanations to help educators make informed decisions."""
-
-        return """I can help you understand student performance predictions and suggest interventions.
-
-You can ask me:
-- \"Why is student X at risk?\"
-- \"How can I help improve this student's performance?\"
-- \"What interventions work for at-risk students?\"
-- \"Explain the prediction model\"
-- \"What factors indicate a student is at risk?\"
-
-Please provide more details about your question, and I'll do my best to assist you."""
+        context = ['student'] if student_id else []
+        intent = CHATBOT_ROUTER.match(user_message, context)
+        if intent is None:
+            return CHATBOT_DEFAULT
+        if 'response' in intent:
+            return intent['response']
+        student_context = self.rag_pipeline.retrieve_student_context(student_id)
+        return getattr(self, '_' + intent['name'])(student_context)
 
     def _explain_risk(self, student_context: Dict) -> str:
         if not student_context:
@@ -0,0 +1,148 @@
+"""
+Intent Router
+Declarative intent tables for the canned chatbot replies, compiled into one matcher
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+
+def _trie_pattern(node: Dict) -> str:
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    return f'(?:{body})?' if '' in node else body
+
+
+def compile_keywords(keywords: Iterable[str]):
+    """One regex reporting, at every position, the longest keyword starting there.
+
+    Keywords are folded into a character trie so the alternation branches on
+    one character at a time; matching cost depends on the message, not on how
+    many keywords there are.
+    """
+    trie = {}
+    for word in keywords:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+    return re.compile(f'(?=({_trie_pattern(trie)}))')
+
+
+class IntentRouter:
+    """Picks the highest-priority intent whose keywords appear in a message.
+
+    Each intent is a dict with a 'name', a 'priority' (higher wins, ties go to
+    table order) and either 'keywords' (any one must appear) or 'all_of' (a
+    list of keyword groups that must each match). Keywords match as lowercase
+    substrings, like the `in` checks they replace. 'requires' lists context
+    flags that must be set, e.g. 'student' when a student is selected.
+    """
+
+    def __init__(self, intents: List[Dict]):
+        self.intents = []
+        self._by_keyword = {}
+        for order, intent in enumerate(intents):
+            groups = intent.get('all_of') or [intent['keywords']]
+            groups = [frozenset(k.lower() for k in group) for group in groups]
+            self.intents.append(dict(intent, groups=groups, order=order))
+            for keyword in groups[0]:
+                self._by_keyword.setdefault(keyword, []).append(order)
+
+        keywords = {k for intent in self.intents for group in intent['groups'] for k in group}
+        self._pattern = compile_keywords(keywords)
+        # Only the longest keyword at each position is reported; the shorter
+        # ones that are its prefixes matched there too.
+        self._prefixes = {k: [k[:n] for n in range(1, len(k) + 1) if k[:n] in keywords] for k in keywords}
+
+    def keywords_in(self, message: str) -> set:
+        found = set()
+        for match in self._pattern.finditer(message.lower()):
+            word = match.group(1)
+            if word and word not in found:
+                found.update(self._prefixes[word])
+        return found
+
+    def match(self, message: str, context: Iterable[str] = ()) -> Optional[Dict]:
+        found = self.keywords_in(message)
+        candidates = {i for k in found for i in self._by_keyword.get(k, ())}
+        context = set(context)
+        best = None
+        for i in candidates:
+            intent = self.intents[i]
+            if best is not None and (-best.get('priority', 0), best['order']) < (-intent.get('priority', 0), i):
+                continue
+            if set(intent.get('requires', ())) <= context and all(group & found for group in intent['groups']):
+                best = intent
+        return best
+
+    def respond(self, message: str, default: str, context: Iterable[str] = ()) -> str:
+        intent = self.match(message, context)
+        return intent['response'] if intent and 'response' in intent else default
+
+
+QUICK_INTENTS = [
+    {'name': 'at_risk', 'priority': 50, 'keywords': ['risk'],
+     'response': "Students are at-risk with low grades (below 50%), poor attendance (below 75%), low assignment completion, or declining performance."},
+    {'name': 'interventions', 'priority': 40, 'keywords': ['intervention', 'help'],
+     'response': "Best interventions: tutoring, regular check-ins, parent communication, peer mentoring, study skills training."},
+    {'name': 'attendance', 'priority': 30, 'keywords': ['attendance'],
+     'response': "Good attendance (75%+) is crucial. Remove barriers, communicate with parents, make classes engaging."},
+    {'name': 'grades', 'priority': 20, 'keywords': ['grade', 'mark'],
+     'response': "Improve grades with: targeted tutoring, identifying gaps, varied teaching, regular feedback, extra practice."},
+    {'name': 'model', 'priority': 10, 'keywords': ['model', 'prediction'],
+     'response': "Uses Random Forest and SVM models with 80-90% accuracy. Analyzes grades, attendance, assignments."},
+]
+
+QUICK_DEFAULT = "I can help with: why students are at-risk, interventions, improving attendance/grades, how the model works."
+
+CHATBOT_INTENTS = [
+    {'name': 'explain_risk', 'priority': 100, 'requires': ['student'], 'all_of': [['why'], ['risk']]},
+    {'name': 'suggest_improvements', 'priority': 90, 'requires': ['student'], 'all_of': [['how'], ['improve', 'help']]},
+    {'name': 'suggest_interventions', 'priority': 80, 'requires': ['student'], 'all_of': [['what'], ['intervention']]},
+    {'name': 'at_risk', 'priority': 40, 'keywords': ['at risk', 'failing'],
+     'response': """At-risk students are those predicted to have academic difficulties based on factors like:
+- Low attendance rates
+- Declining grades or marks
+- Incomplete assignments
+- Poor class participation
+
+Early identification allows for timely intervention and support."""},
+    {'name': 'interventions', 'priority': 30, 'keywords': ['intervention', 'help'],
+     'response': """Effective interventions for at-risk students include:
+1. Personalized learning plans tailored to individual needs
+2. Regular one-on-one meetings to track progress
+3. Peer tutoring and mentorship programs
+4. Parent-teacher collaboration and communication
+5. Additional academic support and tutoring
+6. Study skills and time management training
+7. Addressing attendance and engagement issues
+8. Setting clear, achievable goals with regular check-ins"""},
+    {'name': 'attendance', 'priority': 20, 'keywords': ['attendance'],
+     'response': """Attendance is critical for academic success. To improve attendance:
+- Identify and address barriers (transportation, health, family issues)
+- Implement positive reinforcement for good attendance
+- Communicate regularly with parents
+- Make learning engaging and relevant
+- Provide support for students facing challenges"""},
+    {'name': 'model', 'priority': 10, 'keywords': ['model', 'prediction'],
+     'response': """The prediction system uses machine learning models (Random Forest and SVM) trained on historical student data.
+The models analyze factors like marks, attendance, assignments, and participation to predict which students may need support.
+The system provides probability scores and explanations to help educators make informed decisions."""},
+]
+
+CHATBOT_DEFAULT = """I can help you understand student performance predictions and suggest interventions.
+
+You can ask me:
+- \"Why is student X at risk?\"
+- \"How can I help improve this student's performance?\"
+- \"What interventions work for at-risk students?\"
+- \"Explain the prediction model\"
+- \"What factors indicate a student is at risk?\"
+
+Please provide more details about your question, and I'll do my best to assist you."""
+
+QUICK_ROUTER = IntentRouter(QUICK_INTENTS)
+CHATBOT_ROUTER = IntentRouter(CHATBOT_INTENTS)
@@ -3,24 +3,69 @@ RAG (Retrieval-Augmented Generation) Pipeline
 Handles context retrieval and enhanced AI responses
 """
 
+import bisect
 import logging
+import math
 from typing import List, Dict, Any
 import json
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+CHARS_PER_TOKEN = 4  # Rough size of an English token; avoids needing the model's tokenizer
+
+BEST_PRACTICES = "\n".join([
+    "\nEducational Best Practices:",
+    "- Early intervention is key to student success",
+    "- Personalized learning approaches improve outcomes",
+    "- Parent involvement significantly impacts student performance",
+    "- Regular feedback and monitoring prevent issues from escalating",
+])
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def fit_token_budget(sections: List[str], max_tokens: int) -> str:
+    """Join sections (most important first) until the token budget is spent.
+
+    The section that crosses the budget is cut short; later ones are dropped.
+    """
+    budget = max_tokens * CHARS_PER_TOKEN
+    kept = []
+    for section in sections:
+        cost = len(section) + (1 if kept else 0)
+        if cost > budget:
+            if budget > (1 if kept else 0):
+                kept.append(section[:budget - (1 if kept else 0)])
+            break
+        kept.append(section)
+        budget -= cost
+    return "\n".join(kept)
+
 
 class RAGPipeline:
     """Retrieval-Augmented Generation for student performance analysis"""
     
-    def __init__(self):
+    def __init__(self, max_context_tokens: int = 1024, similar_cases: int = 3):
         self.knowledge_base = []
         self.student_data = {}
+        self.max_context_tokens = max_context_tokens
+        self.similar_cases = similar_cases
+        # Per-student context and serialized LLM sections, rebuilt on every index
+        self.context_cache = {}
+        self.document_cache = {}
         
     def index_student_data(self, students_data: List[Dict]):
-        """Index student data for retrieval"""
+        """Index student data for retrieval and precompute each student's context document"""
         self.student_data = {str(s.get('student_id', i)): s for i, s in enumerate(students_data)}
+        self.context_cache = {sid: self._build_student_context(sid, s) for sid, s in self.student_data.items()}
+        similar = self._nearest_by_risk(self.similar_cases)
+        self.document_cache = {
+            sid: self._student_document(self.context_cache[sid], similar.get(sid, []))
+            for sid in self.student_data
+        }
         logger.info(f"Indexed {len(self.student_data)} student records")
     
     def add_to_knowledge_base(self, documents: List[str]):
@@ -30,11 +75,9 @@ class RAGPipeline:
     
     def retrieve_student_context(self, student_id: str) -> Dict[str, Any]:
         """Retrieve relevant context for a student"""
-        student = self.student_data.get(str(student_id))
-        
-        if not student:
-            return {}
-        
+        return self.context_cache.get(str(student_id), {})
+    
+    def _build_student_context(self, student_id: str, student: Dict) -> Dict[str, Any]:
         context = {
             'student_id': student_id,
             'academic_info': {},
@@ -60,6 +103,46 @@ class RAGPipeline:
         
         return context
     
+    def _nearest_by_risk(self, top_k: int) -> Dict[str, List[str]]:
+        """top_k other students closest in risk probability, for every student at once.
+
+        Same order as retrieve_similar_cases (smallest difference first, ties
+        in index order). Students are sorted by (risk, index), so only the
+        first top_k of each block of equal risks nearest to a student can
+        qualify; a few blocks on either side are enough.
+        """
+        scored = sorted((s['risk_probability'], i, sid) for i, (sid, s) in enumerate(self.student_data.items())
+                        if 'risk_probability' in s)
+        risks = [r for r, _, _ in scored]
+        nearest = {}
+        for risk, _, sid in scored:
+            lo, hi = bisect.bisect_left(risks, risk), bisect.bisect_right(risks, risk)
+            candidates = scored[lo:min(hi, lo + top_k + 1)]
+            j, taken = lo - 1, 0
+            while j >= 0 and taken < top_k:
+                start = bisect.bisect_left(risks, risks[j])
+                block = scored[start:min(j + 1, start + top_k)]
+                candidates += block
+                taken += len(block)
+                j = start - 1
+            j, taken = hi, 0
+            while j < len(scored) and taken < top_k:
+                end = bisect.bisect_right(risks, risks[j])
+                block = scored[j:min(end, j + top_k)]
+                candidates += block
+                taken += len(block)
+                j = end
+            candidates.sort(key=lambda c: (abs(c[0] - risk), c[1]))
+            nearest[sid] = [other for _, _, other in candidates if other != sid][:top_k]
+        return nearest
+    
+    def _student_document(self, context: Dict, similar: List[str]) -> List[str]:
+        sections = [f"\nStudent Context:\n{json.dumps(context, separators=(',', ':'), default=str)}"]
+        if similar:
+            lines = [f"- Student {sid}: {self.student_data[sid]['risk_probability']:.1f}% risk" for sid in similar]
+            sections.append("\nSimilar Student Cases:\n" + "\n".join(lines))
+        return sections
+    
     def retrieve_similar_cases(self, student_context: Dict, top_k: int = 3) -> List[Dict]:
         """Retrieve similar student cases for comparison"""
         # Simple similarity based on risk probability
@@ -128,35 +211,12 @@ class RAGPipeline:
         return strategies[:10]  # Return top 10 strategies
     
     def build_context_for_llm(self, query: str, student_id: str = None) -> str:
-        """Build comprehensive context for LLM query"""
-        context_parts = []
-        
-        # Add query
-        context_parts.append(f"User Query: {query}")
-        
-        # Add student-specific context if provided
+        """Build comprehensive context for LLM query, within max_context_tokens"""
+        sections = [f"User Query: {query}"]
         if student_id:
-            student_context = self.retrieve_student_context(student_id)
-            if student_context:
-                context_parts.append(f"\nStudent Context:")
-                context_parts.append(json.dumps(student_context, indent=2))
-                
-                # Add similar cases
-                similar = self.retrieve_similar_cases(student_context)
-                if similar:
-                    context_parts.append(f"\nSimilar Student Cases:")
-                    for case in similar:
-                        context_parts.append(f"- Student {case['student_id']}: {case['risk_probability']:.1f}% risk")
-        
-        # Add general educational knowledge
-        context_parts.append("\nEducational Best Practices:")
-        context_parts.append("- Early intervention is key to student success")
-        context_parts.append("- Personalized learning approaches improve outcomes")
-        context_parts.append("- Parent involvement significantly impacts student performance")
-        context_parts.append("- Regular feedback and monitoring prevent issues from escalating")
-        
-        return "\n".join(context_parts)
-
+            sections.extend(self.document_cache.get(str(student_id), []))
+        sections.append(BEST_PRACTICES)
+        return fit_token_budget(sections, self.max_context_tokens)
 
 def create_educational_knowledge_base() -> List[str]:
     """Create a knowledge base of educational best practices"""
@@ -6,9 +6,10 @@ import pandas as pd
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
 
 from preprocessing.data_cleaning import DataCleaner, validate_student_data
-from preprocessing.feature_selection import FeatureEngineer, create_risk_label
-from prediction.predictor import StudentPerformancePredictor
-from prediction.explainability import PredictionExplainer
+from preprocessing.feature_selection import create_new_features, create_risk_labels, prepare_for_training
+from prediction.predictor import StudentPredictor
+from prediction.explainability import explain_prediction
+from prediction.registry import ModelRegistry
 from config import Config
 
 
@@ -17,24 +18,25 @@ def quick_start():
     cleaner = DataCleaner()
     df = cleaner.load_csv(data_path)
     df = validate_student_data(df)
-    df_cleaned = cleaner.clean_pipeline(df.copy(), remove_outliers_flag=False, normalize_flag=False)
+    df_cleaned = cleaner.clean_data(df.copy())
 
-    engineer = FeatureEngineer()
-    df_features = engineer.create_derived_features(df_cleaned)
-    df_features = create_risk_label(df_features, threshold=50)
+    df_features = create_new_features(df_cleaned)
+    df_features = create_risk_labels(df_features, threshold=50)
 
-    rf_model_path = Config.RANDOM_FOREST_MODEL
-    if not os.path.exists(rf_model_path):
-        X, y = engineer.prepare_features_for_training(df_features, target_column='at_risk')
-        predictor = StudentPerformancePredictor(model_type='random_forest')
+    registry = ModelRegistry(Config.MODEL_REGISTRY_FOLDER, compact=Config.MODEL_COMPACT_ARTIFACTS)
+    predictor = registry.load('random_forest')
+    if predictor is None:
+        X, y = prepare_for_training(df_features, 'at_risk')
+        predictor = StudentPredictor(model_type='random_forest')
         metrics = predictor.train(X, y)
-        os.makedirs(os.path.dirname(rf_model_path), exist_ok=True)
-        predictor.save_model(rf_model_path)
-    else:
-        predictor = StudentPerformancePredictor(model_type='random_forest')
-        predictor.load_model(rf_model_path)
+        version = registry.register(predictor, {
+            'source_file': data_path,
+            'train_accuracy': metrics['train_accuracy'],
+            'test_accuracy': metrics['test_accuracy']
+        })
+        registry.promote('random_forest', version)
 
-    X, _ = engineer.prepare_features_for_training(df_features, target_column='at_risk')
+    X, _ = prepare_for_training(df_features, 'at_risk')
     predictions, probabilities = predictor.predict(X)
 
     df_results = df.copy()
@@ -46,13 +48,12 @@ def quick_start():
     if len(at_risk_students) > 0:
         sample_idx = at_risk_students.index[0]
         sample_student = df_features.loc[sample_idx].to_dict()
-        explainer = PredictionExplainer(predictor)
         prediction_result = {
             'is_at_risk': True,
             'risk_probability': probabilities[sample_idx, 1],
             'safe_probability': probabilities[sample_idx, 0]
         }
-        explanation = explainer.explain_prediction(sample_student, prediction_result)
+        explanation = explain_prediction(sample_student, prediction_result)
         return {
             'results': df_results,
             'explanation': explanation
@@ -0,0 +1,72 @@
+import os
+import sys
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from prediction.batch import BatchScorer
+from prediction.offline import score_to_file
+from prediction.predictor import StudentPredictor
+from prediction.registry import ModelRegistry
+from config import Config
+
+
+def load_scoring_model(model_type='random_forest', model_path=None):
+    """(predictor, model file) from an explicit path, the promoted registry version or the legacy path"""
+    if model_path is None:
+        registry = ModelRegistry(Config.MODEL_REGISTRY_FOLDER, compact=Config.MODEL_COMPACT_ARTIFACTS)
+        version = registry.current_version(model_type)
+        if version is not None:
+            return registry.load(model_type, version), registry.model_path(version)
+        model_path = Config.RANDOM_FOREST_MODEL if model_type == 'random_forest' else Config.SVM_MODEL
+    if not os.path.exists(model_path):
+        raise SystemExit(f'No {model_type} model found; train one first (python3 train_models.py)')
+    predictor = StudentPredictor(model_type)
+    predictor.load_model(model_path)
+    return predictor, model_path
+
+
+def run_scoring(input_path, output_path, model_type='random_forest', model_path=None, workers=None,
+                chunk_rows=None, explain_top_k=0, restart=False, quiet=False):
+    predictor, model_file = load_scoring_model(model_type, model_path)
+    scorer = BatchScorer(max_workers=workers or Config.BATCH_MAX_WORKERS)
+
+    def report_progress(rows_done, rows_per_s):
+        if not quiet:
+            print(f'\r{rows_done:>12,} rows  {rows_per_s or 0:>10,.0f} rows/s', end='', file=sys.stderr, flush=True)
+
+    try:
+        return score_to_file(
+            scorer, predictor, model_file, input_path, output_path,
+            chunk_rows=chunk_rows or Config.SCORING_CHUNK_ROWS,
+            explain_top_k=explain_top_k,
+            resume=not restart,
+            on_chunk=report_progress
+        )
+    finally:
+        scorer.shutdown()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Score a large CSV or Parquet file of students')
+    parser.add_argument('--input', type=str, required=True)
+    parser.add_argument('--output', type=str, required=True, help='.csv file or .parquet dataset directory')
+    parser.add_argument('--model-type', type=str, default='random_forest', choices=['random_forest', 'svm'])
+    parser.add_argument('--model', type=str, default=None, help='Model file; defaults to the promoted registry version')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-rows', type=int, default=None)
+    parser.add_argument('--explain', type=int, default=0, metavar='K', help='Add explanations with the top K features')
+    parser.add_argument('--restart', action='store_true', help='Ignore saved progress and score from the start')
+    args = parser.parse_args()
+
+    try:
+        report = run_scoring(args.input, args.output, args.model_type, args.model, args.workers,
+                             args.chunk_rows, args.explain, args.restart)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print(file=sys.stderr)
+    if report['resumed_from']:
+        print(f"Resumed after {report['resumed_from']:,} rows")
+    print(f"Scored {report['rows_this_run']:,} rows in {report['seconds']}s ({report['rows_per_s']} rows/s); "
+          f"{report['rows']:,} rows in {report['output']}")
@@ -0,0 +1,15 @@
+import pytest
+import sys
+import os
+
+# Add backend and benchmarks to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+from run_benchmarks import train_benchmark_model
+
+
+@pytest.fixture(scope='module')
+def predictor():
+    """A small random forest trained on a synthetic cohort, shared by a module's tests"""
+    return train_benchmark_model('random_forest', n_students=300)
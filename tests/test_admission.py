@@ -0,0 +1,74 @@
+import pytest
+import sys
+import os
+import threading
+import time
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from admission import AdmissionController, AdmissionRejected, queue_depth, rejected_total, wait_seconds
+
+
+def test_queue_then_reject():
+    controller = AdmissionController({'train': (1, 1)}, max_wait=5)
+    controller.acquire('train')
+
+    waiter_done = threading.Event()
+
+    def waiter():
+        controller.acquire('train')
+        waiter_done.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    deadline = time.time() + 2
+    while controller.snapshot()['train']['queued'] != 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert queue_depth.get(endpoint='train') == 1
+
+    # Queue full: rejected at once
+    start = time.perf_counter()
+    with pytest.raises(AdmissionRejected) as info:
+        controller.acquire('train')
+    assert info.value.status == 429
+    assert info.value.retry_after >= 1
+    assert time.perf_counter() - start < 0.5
+
+    controller.release('train', 3.0)
+    thread.join(timeout=2)
+    assert waiter_done.is_set()
+    assert controller.snapshot()['train'] == {'running': 1, 'queued': 0, 'max_concurrent': 1, 'max_queue': 1}
+    assert wait_seconds.get(endpoint='train')['count'] >= 2
+
+
+def test_wait_timeout_and_retry_after():
+    controller = AdmissionController({'predict': (1, 2)}, max_wait=0.05)
+    controller.acquire('predict')
+    controller.release('predict', 4.0)
+    controller.acquire('predict')
+    before = rejected_total.get(endpoint='predict', status=503)
+    with pytest.raises(AdmissionRejected) as info:
+        controller.acquire('predict')
+    assert info.value.status == 503
+    assert info.value.retry_after == 8  # running + queued (2) x 4s per request
+    assert rejected_total.get(endpoint='predict', status=503) == before + 1
+
+
+def test_max_total_and_run():
+    controller = AdmissionController({'train': (2, 2), 'predict': (2, 2)}, max_total=2)
+    assert controller.run('predict', lambda: threading.current_thread()) is threading.current_thread()
+    assert controller.run('predict', lambda: 1 / 4) == 0.25
+    controller.acquire('train')
+    controller.acquire('predict')
+    with pytest.raises(AdmissionRejected) as info:
+        controller.acquire('train')
+    assert info.value.status == 429
+    controller.release('predict', 0.1)
+    with pytest.raises(ZeroDivisionError):
+        controller.run('predict', lambda: 1 / 0)
+    assert controller.snapshot()['predict']['running'] == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
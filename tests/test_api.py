@@ -6,7 +6,10 @@ import json
 # Add backend to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
+import app as app_module
 from app import app
+from monitoring.profiling import ProfileStore
+from ingestion.uploads import ResumableUploads
 
 
 @pytest.fixture
@@ -16,6 +19,15 @@ def client():
         yield client
 
 
+@pytest.fixture
+def upload_folder(tmp_path, monkeypatch):
+    folder = tmp_path / 'uploads'
+    folder.mkdir()
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(folder))
+    monkeypatch.setattr(app_module, 'resumable_uploads', ResumableUploads(str(folder)))
+    return folder
+
+
 def test_health_check(client):
     response = client.get('/api/health')
     assert response.status_code == 200
@@ -31,7 +43,7 @@ def test_upload_no_file(client):
     assert 'error' in data
 
 
-def test_upload_with_file(client, tmp_path):
+def test_upload_with_file(client, tmp_path, upload_folder):
     csv_file = tmp_path / "test_data.csv"
     csv_file.write_text("student_id,marks\n1,85\n2,65\n3,75\n")
     with open(csv_file, 'rb') as f:
@@ -46,6 +58,60 @@ def test_upload_with_file(client, tmp_path):
     assert 'rows' in data
 
 
+def test_upload_excel(client, tmp_path, upload_folder):
+    openpyxl = pytest.importorskip('openpyxl')
+    workbook = openpyxl.Workbook()
+    workbook.active.append(['student_id', 'marks'])
+    for i in range(1, 8):
+        workbook.active.append([i, 50 + i])
+    path = tmp_path / 'grades.xlsx'
+    workbook.save(path)
+    with open(path, 'rb') as f:
+        response = client.post(
+            '/api/upload',
+            data={'file': (f, 'grades.xlsx')},
+            content_type='multipart/form-data'
+        )
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['rows'] == 7
+    assert data['sheets'][0]['rows'] == 7
+
+
+def test_chunked_upload(client, upload_folder):
+    content = b"student_id,marks\n" + b"".join(f"{i},{60 + i}\n".encode() for i in range(30))
+    response = client.post('/api/uploads', data=json.dumps({'filename': 'class.csv'}), content_type='application/json')
+    assert response.status_code == 201
+    upload_id = json.loads(response.data)['upload_id']
+
+    response = client.put(f'/api/uploads/{upload_id}', data=content[:100], headers={'Upload-Offset': '0'})
+    assert json.loads(response.data)['offset'] == 100
+    response = client.put(f'/api/uploads/{upload_id}', data=content[100:], headers={'Upload-Offset': '0'})
+    assert response.status_code == 409
+    assert json.loads(response.data)['offset'] == 100
+    client.put(f'/api/uploads/{upload_id}', data=content[100:], headers={'Upload-Offset': '100'})
+
+    response = client.post(f'/api/uploads/{upload_id}/complete')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['rows'] == 30
+    assert len(data['preview']) == 5
+    assert os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], data['filename']))
+
+
+def test_chunk_racing_delete_is_not_found(client, upload_folder, monkeypatch):
+    response = client.post('/api/uploads', data=json.dumps({'filename': 'class.csv'}), content_type='application/json')
+    upload_id = json.loads(response.data)['upload_id']
+
+    def deleted_meanwhile(upload_id, offset, stream):
+        raise KeyError(upload_id)
+
+    monkeypatch.setattr(app_module.resumable_uploads, 'append', deleted_meanwhile)
+    response = client.put(f'/api/uploads/{upload_id}', data=b'student_id\n', headers={'Upload-Offset': '0'})
+    assert response.status_code == 404
+    assert client.delete(f'/api/uploads/{upload_id}').status_code == 200
+
+
 def test_predict_no_filename(client):
     response = client.post(
         '/api/predict',
@@ -57,5 +123,164 @@ def test_predict_no_filename(client):
     assert 'error' in data
 
 
+def test_list_models(client):
+    response = client.get('/api/models')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert 'random_forest' in data
+    assert 'versions' in data['svm']
+
+
+def test_promote_unknown_version(client):
+    response = client.post(
+        '/api/models/random_forest/promote',
+        data=json.dumps({'version': '../../etc'}),
+        content_type='application/json'
+    )
+    assert response.status_code == 404
+
+
+def test_unknown_model_type(client):
+    for endpoint in ('/api/predict', '/api/train'):
+        response = client.post(
+            endpoint,
+            data=json.dumps({'filename': 'class.csv', 'model_type': '../../tmp/pwn'}),
+            content_type='application/json'
+        )
+        assert response.status_code == 400
+
+
+def test_importance_unknown_model_type(client):
+    response = client.get('/api/model/importance?model_type=knn')
+    assert response.status_code == 400
+
+
+def test_metrics_endpoint(client):
+    client.get('/api/health', headers={'X-Server-Timing': '1'})
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert b'http_requests_total{endpoint="health"' in response.data
+
+
+def test_server_timing_header(client):
+    response = client.get('/api/health', headers={'X-Server-Timing': '1'})
+    assert 'total;dur=' in response.headers['Server-Timing']
+
+
+def test_profile_request(client, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'PROFILING_ENABLED', True)
+    monkeypatch.setattr(app_module, 'profiles', ProfileStore(str(tmp_path), max_profiles=2))
+    for _ in range(3):
+        response = client.post(
+            '/api/chatbot',
+            data=json.dumps({'message': 'how does the model work'}),
+            content_type='application/json',
+            headers={'X-Profile': '1'}
+        )
+        assert response.status_code == 200
+    name = response.headers['X-Profile-Id']
+
+    # Without a PROFILING_TOKEN configured, profiles cannot be read at all
+    assert client.get('/api/profiles', headers={'X-Profile': '1'}).status_code == 403
+    monkeypatch.setitem(app.config, 'PROFILING_TOKEN', 'secret')
+    assert client.get('/api/profiles').status_code == 403
+    assert client.get(f'/api/profiles/{name}', headers={'X-Profile': 'wrong'}).status_code == 403
+
+    auth = {'X-Profile': 'secret'}
+    listing = json.loads(client.get('/api/profiles', headers=auth).data)['profiles']
+    assert len(listing) == 2
+    assert listing[0]['endpoint'] == 'chatbot'
+
+    report = client.get(f'/api/profiles/{name}?format=text', headers=auth)
+    assert b'function calls' in report.data
+    assert client.get('/api/profiles/..%2Fconfig.py', headers=auth).status_code == 404
+
+
+def test_profiling_disabled_by_default(client):
+    response = client.post(
+        '/api/chatbot',
+        data=json.dumps({'message': 'hello'}),
+        content_type='application/json',
+        headers={'X-Profile': '1'}
+    )
+    assert 'X-Profile-Id' not in response.headers
+    assert client.get('/api/profiles').status_code == 404
+
+
+def test_admission_rejects_busy_endpoint(client, monkeypatch):
+    controller = app_module.AdmissionController({'predict': (1, 0)}, max_wait=0.1)
+    monkeypatch.setattr(app_module, 'admission', controller)
+    controller.acquire('predict')
+    response = client.post('/api/predict', data=json.dumps({'filename': 'missing.csv'}), content_type='application/json')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert client.get('/api/health').status_code == 200
+
+    controller.release('predict', 0.5)
+    response = client.post('/api/predict', data=json.dumps({'filename': 'missing.csv'}),
+                           content_type='application/json', headers={'X-Server-Timing': '1'})
+    assert response.status_code == 404
+    assert 'total;dur=' in response.headers['Server-Timing']
+    assert 'admission_queue_depth{endpoint="predict"} 0' in client.get('/metrics').data.decode()
+
+
+def test_admission_cap_follows_server_threads(monkeypatch):
+    monkeypatch.setitem(app.config, 'WEB_THREADS', app.config['WEB_THREADS'])
+    monkeypatch.setattr(app_module, 'admission', app_module.admission)
+    app_module.configure_threads(8)
+    assert app_module.admission.max_total == 7
+
+
+def test_predict_batch_validation(client):
+    response = client.post('/api/predict/batch', json={'filenames': []})
+    assert response.status_code == 400
+
+    response = client.post('/api/predict/batch', json={'filenames': ['no_such_class.csv']})
+    assert response.status_code == 404
+    assert json.loads(response.data)['missing'] == ['no_such_class.csv']
+
+
+def test_export_validation(client):
+    assert client.get('/api/export').status_code == 400
+    assert client.get('/api/export?filename=a.csv&format=xml').status_code == 400
+    assert client.get('/api/export?filename=a.csv&model_type=knn').status_code == 400
+    assert client.get('/api/export?filename=missing.csv').status_code == 404
+
+
+def test_importance_holdout_is_the_training_holdout():
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({'math_marks': rng.integers(20, 100, 200), 'attendance': rng.integers(40, 100, 200)})
+    y = pd.Series((X['math_marks'] < 50).astype(int))
+    predictor = app_module.StudentPredictor('random_forest', model_params={'n_estimators': 5})
+    metrics = app_module.train_in_memory(predictor, X, y)
+    X_test, y_test = app_module.holdout_rows(X, y)
+    assert len(X_test) == 40
+    assert predictor.model.score(predictor.align_features(X_test), y_test) == metrics['test_accuracy']
+
+
+def test_importance_without_holdout_is_unavailable(client, tmp_path, monkeypatch):
+    import numpy as np
+    import pandas as pd
+    registry = app_module.ModelRegistry(str(tmp_path / 'models'))
+    monkeypatch.setattr(app_module, 'registry', registry)
+    monkeypatch.setattr(app_module, 'importance_jobs', app_module.ImportanceJobRunner(registry))
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({'math_marks': rng.integers(20, 100, 200), 'attendance': rng.integers(40, 100, 200)})
+    predictor = app_module.StudentPredictor('svm')
+    app_module.train_in_memory(predictor, X, pd.Series((X['math_marks'] < 50).astype(int)))
+    version = app_module.register_model(predictor)
+    response = client.get(f'/api/model/importance?model_type=svm&version={version}')
+    assert response.status_code == 404
+    assert json.loads(response.data)['status'] == 'unavailable'
+
+
+def test_student_history_requires_scope(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, 'history', app_module.HistoryStore(str(tmp_path / 'history.sqlite3')))
+    assert client.get('/api/students/1/history').status_code == 400
+    assert client.get('/api/students/1/history?scope=class-a').status_code == 404
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
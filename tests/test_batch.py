@@ -0,0 +1,75 @@
+import pytest
+import numpy as np
+import os
+
+from synthetic_data import write_cohort_csv
+from prediction.batch import BatchScorer, combine_summaries
+from prediction.registry import ModelRegistry
+from prediction.shared_arrays import SharedArray
+
+
+@pytest.fixture
+def class_files(tmp_path):
+    return [write_cohort_csv(str(tmp_path / f'class_{i}.csv'), 40 + i * 10, seed=i) for i in range(3)]
+
+
+def test_inline_batch_matches_file_sizes(predictor, class_files, tmp_path):
+    scorer = BatchScorer(max_workers=1)
+    bad_file = tmp_path / 'bad.xlsx'
+    bad_file.write_bytes(b'not a workbook')
+    results = scorer.score(predictor, None, class_files + [str(bad_file)])
+    assert [len(r['results']) for r in results[:3]] == [40, 50, 60]
+    assert 'error' in results[3]
+
+    district = combine_summaries(results)
+    assert district['total_students'] == 150
+    assert district['at_risk_count'] == sum(r['summary']['at_risk_count'] for r in results[:3])
+
+
+def test_process_pool_matches_inline(predictor, class_files, tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    predictor.version = registry.register(predictor)
+
+    inline = BatchScorer(max_workers=1).score(predictor, None, class_files)
+    scorer = BatchScorer(max_workers=2)
+    try:
+        pooled = scorer.score(predictor, registry.model_path(predictor.version), class_files)
+    finally:
+        scorer.shutdown()
+    for a, b in zip(inline, pooled):
+        assert [r['risk_probability'] for r in a['results']] == [r['risk_probability'] for r in b['results']]
+        assert a['summary'] == b['summary']
+
+
+@pytest.mark.parametrize('backend', ['shm', 'memmap'])
+def test_shared_array_roundtrip(backend, tmp_path):
+    values = np.arange(12, dtype=np.float64).reshape(4, 3)
+    with SharedArray.from_array(values, backend, str(tmp_path)) as owner:
+        worker = SharedArray.attach(owner.spec)
+        worker.array[1:3] *= 10
+        worker.close()
+        assert owner.array[1].tolist() == [30.0, 40.0, 50.0]
+        spec = owner.spec
+    if backend == 'memmap':
+        assert not os.path.exists(spec['path'])
+    else:
+        with pytest.raises(FileNotFoundError):
+            SharedArray.attach(spec)
+
+
+@pytest.mark.parametrize('backend', ['shm', 'memmap'])
+def test_shared_predict_matches_predictor(predictor, tmp_path, backend):
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    predictor.version = registry.register(predictor)
+    X = np.random.RandomState(0).uniform(0, 100, size=(500, len(predictor.feature_names)))
+
+    scorer = BatchScorer(max_workers=2)
+    try:
+        predictions, probabilities = scorer.predict(predictor, registry.model_path(predictor.version), X,
+                                                    backend=backend, folder=str(tmp_path), min_rows=1, chunk_rows=100)
+    finally:
+        scorer.shutdown()
+    expected_predictions, expected_probabilities = predictor.predict(X)
+    np.testing.assert_array_equal(predictions, expected_predictions)
+    np.testing.assert_allclose(probabilities, expected_probabilities)
+    assert not [f for f in os.listdir(tmp_path) if f.startswith('shared_')]
@@ -0,0 +1,64 @@
+import pandas as pd
+import sys
+import os
+
+# Add backend and benchmarks to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+from synthetic_data import generate_cohort, write_cohort_csv
+from run_benchmarks import run_benchmarks, compare_reports
+from model_artifacts import run_artifact_benchmark
+from intent_router import run_intent_benchmark
+
+
+def test_cohort_matches_sample_schema(tmp_path):
+    sample = pd.read_csv(os.path.join(os.path.dirname(__file__), '..', 'backend', 'data', 'sample_data.csv'))
+    path = write_cohort_csv(str(tmp_path / 'cohort.csv'), 250, chunk_size=100)
+    cohort = pd.read_csv(path)
+    assert cohort.columns.tolist() == sample.columns.tolist()
+    assert len(cohort) == 250
+    assert cohort['student_id'].is_unique
+    assert cohort['attendance'].between(0, 100).all()
+
+
+def test_cohort_missing_values():
+    cohort = generate_cohort(500, missing_rate=0.2)
+    assert cohort['math_marks'].isnull().any()
+    assert cohort['student_id'].notnull().all()
+
+
+def test_run_benchmarks_and_compare():
+    report = run_benchmarks([200], repeats=1, include_api=False)
+    stages = report['results']['200']['stages']
+    assert {'load_csv', 'clean_data', 'create_new_features', 'predict', 'explain', 'summary', 'json_serialization'} <= set(stages)
+
+    slower = {'results': {'200': {'stages': {'predict': dict(stages['predict'], median_s=stages['predict']['median_s'] * 2)}}}}
+    regressions = compare_reports(slower, report)
+    assert [r['stage'] for r in regressions] == ['predict']
+
+
+def test_api_benchmark_leaves_app_state_alone():
+    import app as backend_app
+    cache, upload_folder = backend_app.result_cache, backend_app.app.config['UPLOAD_FOLDER']
+    uploads = set(os.listdir(upload_folder))
+
+    report = run_benchmarks([100], repeats=1, include_api=True)
+    assert report['results']['100']['stages']['api_predict']['runs'] == 1
+    assert backend_app.result_cache is cache
+    assert backend_app.app.config['UPLOAD_FOLDER'] == upload_folder
+    assert set(os.listdir(upload_folder)) == uploads
+
+
+def test_artifact_benchmark():
+    report = run_artifact_benchmark([5], n_students=300, repeats=1)
+    result = report['results']['5']
+    assert result['identical_predictions']
+    assert result['compact']['size_bytes'] < result['pickle']['size_bytes']
+    assert result['compact']['load_s'] > 0
+
+
+def test_intent_benchmark():
+    report = run_intent_benchmark([5, 200], repeats=3)
+    assert all(r['same_intents'] for r in report['results'].values())
+    assert report['results']['200']['router_us'] > 0
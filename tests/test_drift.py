@@ -0,0 +1,142 @@
+import pytest
+import json
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from monitoring.drift import DatasetSketch, drift_report, feature_nulls, sketch_frame
+from prediction.predictor import StudentPredictor
+from preprocessing.data_cleaning import DataCleaner, outlier_bounds_from_sketch
+
+
+@pytest.fixture
+def training():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'marks': rng.normal(65, 12, 5000),
+        'attendance': rng.integers(40, 100, 5000).astype(float),
+        'participation': rng.integers(1, 6, 5000).astype(float),
+    })
+
+
+def test_chunk_sketches_merge_into_the_whole(training):
+    whole = sketch_frame(training)
+    merged = whole.empty_like()
+    for start in range(0, len(training), 700):
+        merged.merge(sketch_frame(training.iloc[start:start + 700], reference=whole))
+    assert merged.rows == whole.rows == 5000
+    assert all(np.array_equal(a, b) for a, b in zip(merged.histograms, whole.histograms))
+    assert np.array_equal(merged.registers, whole.registers)
+    assert merged.quantile(0, 0.5) == pytest.approx(training['marks'].median(), abs=0.5)
+    assert merged.quantile(1, 0.9) == pytest.approx(training['attendance'].quantile(0.9), abs=1)
+
+    with pytest.raises(ValueError):
+        merged.merge(sketch_frame(training.head(100)))  # Edges fit on other data
+
+
+def test_distinct_counts(training):
+    distinct = sketch_frame(training).distinct()
+    assert distinct[1] == pytest.approx(training['attendance'].nunique(), abs=2)
+    assert distinct[2] == pytest.approx(5, abs=0.5)
+    assert distinct[0] == pytest.approx(5000, rel=0.1)
+
+
+def test_report_flags_shifted_features_and_nulls(training):
+    reference = DatasetSketch.from_dict(json.loads(json.dumps(sketch_frame(training).to_dict())))
+    same = drift_report(reference, sketch_frame(training.sample(1000, random_state=1), reference=reference))
+    assert same['drifted_features'] == [] and same['max_psi'] < 0.1
+
+    batch = training.head(1000).copy()
+    batch['attendance'] = batch['attendance'] - 30
+    raw = batch.copy()
+    raw.loc[:199, 'marks'] = np.nan
+    report = drift_report(reference, sketch_frame(batch, feature_nulls(raw.isna().sum(), reference.feature_names), reference))
+    attendance = report['features']['attendance']
+    assert report['drifted_features'] == ['attendance'] and attendance['status'] == 'drift'
+    assert attendance['out_of_range'] > 0.3 and attendance['median'] < attendance['reference_median']
+    assert report['features']['marks']['null_rate'] == 0.2 and report['features']['marks']['reference_null_rate'] == 0
+
+
+def test_missing_feature_counts_as_null(training):
+    reference = sketch_frame(training)
+    report = drift_report(reference, sketch_frame(training[['marks', 'attendance']].head(50), reference=reference))
+    participation = report['features']['participation']
+    assert participation['null_rate'] == 1.0 and participation['status'] == 'no_data'
+
+
+def test_profile_is_saved_with_the_model(training, tmp_path):
+    y = (training['marks'] < 60).astype(int)
+    predictor = StudentPredictor('random_forest', {'n_estimators': 5})
+    predictor.train(training, y)
+    path = str(tmp_path / 'model.pkl')
+    predictor.save_model(path, compact=True)
+    loaded = StudentPredictor()
+    loaded.load_model(path)
+    assert loaded.profile == predictor.profile
+    assert DatasetSketch.from_dict(loaded.profile).rows == 5000
+
+
+
+def test_outlier_bounds_from_chunked_sketch(training):
+    whole = sketch_frame(training)
+    merged = whole.empty_like()
+    for start in range(0, len(training), 700):
+        merged.merge(sketch_frame(training.iloc[start:start + 700], reference=whole))
+    for method in ('iqr', 'mad'):
+        expected = DataCleaner().fit_outlier_bounds(training, method)
+        streamed = outlier_bounds_from_sketch(merged, method)
+        assert sorted(streamed) == sorted(expected)
+        for name, (low, high) in expected.items():
+            spread = high - low
+            assert streamed[name][0] == pytest.approx(low, abs=0.05 * spread)
+            assert streamed[name][1] == pytest.approx(high, abs=0.05 * spread)
+
+
+def test_predictor_clips_to_saved_outlier_bounds(training, tmp_path):
+    y = (training['marks'] < 60).astype(int)
+    predictor = StudentPredictor('random_forest', {'n_estimators': 5})
+    predictor.train(training, y)
+    path = str(tmp_path / 'model.pkl')
+    predictor.save_model(path, compact=True)
+    loaded = StudentPredictor()
+    loaded.load_model(path)
+    assert loaded.outlier_bounds == predictor.outlier_bounds
+    assert set(loaded.outlier_bounds) == {'marks', 'attendance', 'participation'}
+
+    batch = training.head(3).copy()
+    batch.loc[0, 'marks'] = 10000
+    mask = loaded.outlier_mask(batch.copy())
+    assert mask.tolist() == [[True, False, False], [False, False, False], [False, False, False]]
+    assert loaded.align_features(batch.copy())[0, 0] == loaded.outlier_bounds['marks'][1]
+    capped = batch.copy()
+    capped.loc[0, 'marks'] = loaded.outlier_bounds['marks'][1]
+    np.testing.assert_array_equal(loaded.predict(batch)[1], loaded.predict(capped)[1])
+
+
+
+def test_outlier_bounds_use_exact_quartiles_of_the_training_split():
+    # A count feature with tied quartiles: 74% zeros, the rest 1-3 (digest centroids get its fences wrong)
+    rng = np.random.default_rng(3)
+    X = pd.DataFrame({
+        'absences': np.r_[np.zeros(740), rng.integers(1, 4, 260)].astype(float),
+        'marks': rng.normal(65, 12, 1000),
+    }).sample(frac=1, random_state=3).reset_index(drop=True)
+    y = (X['marks'] < 60).astype(int)
+    predictor = StudentPredictor('random_forest', {'n_estimators': 5})
+    predictor.train(X, y, test_size=0.2, random_state=0)
+    assert predictor.outlier_bounds['absences'] == [-3.0, 4.0]
+    assert predictor.outlier_mask(X.copy())[:, 0].sum() == 0
+
+    # Fitted on the training rows only: an extreme holdout row does not widen the fences
+    X.loc[X.index[-1], 'marks'] = 10000
+    holdout_only = StudentPredictor('random_forest', {'n_estimators': 5})
+    holdout_only.train(X, y, test_size=0.2, random_state=0)
+    assert holdout_only.outlier_bounds['marks'] == predictor.outlier_bounds['marks']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,84 @@
+import pytest
+import io
+import numpy as np
+import pandas as pd
+
+from synthetic_data import write_cohort_csv
+from admission import AdmissionController
+from prediction.export import csv_stream, export_stream, scored_chunks
+from prediction.pipeline import prepare_student_frame, score_frame, score_with_cache
+from preprocessing.feature_selection import prepare_for_training
+from prediction.result_cache import ResultCache
+
+
+@pytest.fixture(scope='module')
+def predictor(predictor):
+    predictor.version = 'export-test'
+    return predictor
+
+
+@pytest.fixture
+def cohort(tmp_path):
+    path = write_cohort_csv(str(tmp_path / 'cohort.csv'), 700, seed=4)
+    df = pd.read_csv(path)
+    rng = np.random.default_rng(4)
+    for column in df.columns[2:]:
+        df.loc[rng.random(len(df)) < 0.1, column] = np.nan
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_chunked_export_matches_whole_file_scoring(predictor, cohort):
+    body = b''.join(csv_stream(scored_chunks(predictor, cohort, chunk_rows=150)))
+    exported = pd.read_csv(io.BytesIO(body))
+
+    df, student_ids = prepare_student_frame(pd.read_csv(cohort))
+    expected = score_frame(predictor, df, student_ids)['results']
+    assert len(exported) == len(expected) and body.count(b'student_id') == 1
+    assert exported['student_id'].tolist() == student_ids
+    assert exported['risk_probability'].tolist() == [r['risk_probability'] for r in expected]
+    assert exported['risk_level'].tolist() == [r['risk_level'] for r in expected]
+    assert exported['recommendations'].tolist() == ['; '.join(r['recommendations']) for r in expected]
+
+
+def test_export_reads_stored_predictions(predictor, cohort, tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite3'))
+    # Scored the way /api/predict scores the whole file
+    df, student_ids = prepare_student_frame(pd.read_csv(cohort))
+    X_pred, _ = prepare_for_training(df, 'at_risk')
+    score_with_cache(cache, predictor, X_pred, df, student_ids, predictor.predict, None, 3)
+    calls = []
+    original = predictor.predict
+
+    def counting_predict(X):
+        calls.append(len(X))
+        return original(X)
+
+    predictor.predict = counting_predict
+    try:
+        exported = b''.join(csv_stream(scored_chunks(predictor, cohort, 200, cache=cache)))
+    finally:
+        del predictor.predict
+    assert sum(calls) == 0
+    assert exported == b''.join(csv_stream(scored_chunks(predictor, cohort, 200)))
+
+
+def test_admission_slot_held_while_streaming(predictor, cohort):
+    controller = AdmissionController({'export_results': (1, 0)}, max_wait=0.1)
+    body = controller.stream('export_results', export_stream(scored_chunks(predictor, cohort, 100), 'csv'))
+    next(body)
+    assert controller.snapshot()['export_results']['running'] == 1
+    body.close()
+    body.close()
+    assert controller.snapshot()['export_results']['running'] == 0
+
+
+def test_parquet_export(predictor, cohort):
+    pytest.importorskip('pyarrow')
+    body = b''.join(export_stream(scored_chunks(predictor, cohort, 300), 'parquet'))
+    exported = pd.read_parquet(io.BytesIO(body))
+    assert len(exported) == len(pd.read_csv(cohort)) and exported['risk_level'].notnull().all()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,75 @@
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from preprocessing.history import HistoryStore, HISTORY_FEATURES, UploadSource
+from prediction.pipeline import prepare_student_frame
+
+
+def upload(marks, attendance):
+    return pd.DataFrame({'average_marks': marks, 'attendance_rate': attendance})
+
+
+def test_window_features(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'), window=3)
+    for week, marks in enumerate([50, 60, 70, 80]):
+        store.record(['s1', 's2'], upload([marks, 55.0], [90.0, 60.0 + week]), f'week{week}.csv')
+    # Re-scoring the same file does not add another snapshot
+    store.record(['s1', 's2'], upload([80, 55.0], [90.0, 63.0]), 'week3.csv')
+
+    features = store.window_features(['s2', 's1', 'unknown'])
+    assert features.columns.tolist() == HISTORY_FEATURES
+    assert features['history_uploads'].tolist() == [4, 4, 0]
+    # Last three uploads only: s1 marks 60, 70, 80
+    assert features['marks_trend'].tolist() == pytest.approx([0.0, 10.0, 0.0])
+    assert features['marks_volatility'].tolist() == pytest.approx([0.0, np.std([60, 70, 80]), 0.0])
+    assert features['rolling_attendance'].tolist() == pytest.approx([62.0, 90.0, 0.0])
+    assert [s['average_marks'] for s in store.student_history('s1')] == [50, 60, 70, 80]
+
+
+def test_missing_metrics_are_skipped(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    store.record([1], upload([np.nan], [80.0]), 'a.csv')
+    store.record([1], upload([70.0], [70.0]), 'b.csv')
+    features = store.window_features([1])
+    assert features.loc[0, 'marks_trend'] == 0.0
+    assert features.loc[0, 'rolling_attendance'] == pytest.approx(75.0)
+
+
+def test_prepare_student_frame_adds_history_for_keyed_uploads(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    keyed = pd.DataFrame({'student_id': [1, 2], 'math_marks': [50, 70], 'science_marks': [60, 80]})
+    df, _ = prepare_student_frame(keyed.copy(), store, UploadSource('class.csv', '7a', None))
+    assert set(HISTORY_FEATURES) <= set(df.columns)
+
+    unkeyed = pd.DataFrame({'math_marks': [50, 70], 'science_marks': [60, 80]})
+    df, _ = prepare_student_frame(unkeyed, store, UploadSource('other.csv', '7a', None))
+    assert not set(HISTORY_FEATURES) & set(df.columns)
+
+    # Without a scope the ids could belong to any class, so nothing is recorded
+    df, _ = prepare_student_frame(keyed, store, None)
+    assert not set(HISTORY_FEATURES) & set(df.columns)
+
+
+def test_scopes_keep_classes_apart(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    store.record([1], upload([40.0], [50.0]), 'a.csv', scope='7a')
+    store.record([1], upload([90.0], [95.0]), 'b.csv', scope='7b')
+    assert [s['average_marks'] for s in store.student_history(1, '7a')] == [40.0]
+    assert store.window_features([1], '7b').loc[0, 'history_uploads'] == 1
+    assert store.window_features([1]).loc[0, 'history_uploads'] == 0
+
+
+def test_uploads_are_deduplicated_by_content_hash(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    first = store.record([1], upload([40.0], [50.0]), 'week1.csv', '7a', 'aaaa')
+    # The same file uploaded again under another name is the same point
+    assert store.record([1], upload([40.0], [50.0]), 'week1 (1).csv', '7a', 'aaaa') == first
+    # New contents under a reused name are a new point
+    assert store.record([1], upload([60.0], [70.0]), 'week1.csv', '7a', 'bbbb') != first
+    assert store.window_features([1], '7a').loc[0, 'history_uploads'] == 2
@@ -0,0 +1,151 @@
+import pytest
+import hashlib
+import io
+import sys
+import os
+import time
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from ingestion.uploads import CSVStreamInspector, ResumableUploads, UploadError, read_metadata, save_upload
+
+
+CSV_BYTES = b"student_id,name,math_marks\n" + b"".join(f"{i},Student {i},{50 + i}\n".encode() for i in range(1, 21))
+
+
+def test_inspector_single_pass_small_chunks():
+    inspector = CSVStreamInspector(preview_rows=5)
+    for start in range(0, len(CSV_BYTES), 7):
+        inspector.update(CSV_BYTES[start:start + 7])
+    info = inspector.finalize()
+    assert info['rows'] == 20
+    assert info['column_names'] == ['student_id', 'name', 'math_marks']
+    assert len(info['preview']) == 5
+    assert info['preview'][0]['name'] == 'Student 1'
+    assert info['sha256'] == hashlib.sha256(CSV_BYTES).hexdigest()
+
+
+def test_inspector_without_trailing_newline():
+    inspector = CSVStreamInspector()
+    inspector.update(b"student_id,marks\n1,85\n2,65")
+    assert inspector.finalize()['rows'] == 2
+
+
+def test_inspector_rejects_bad_header():
+    inspector = CSVStreamInspector()
+    with pytest.raises(UploadError):
+        inspector.update(b"marks,marks\n1,2\n")
+
+
+def test_save_upload_writes_metadata(tmp_path):
+    path = str(tmp_path / 'upload.csv')
+    info = save_upload(io.BytesIO(CSV_BYTES), path, chunk_size=16)
+    with open(path, 'rb') as f:
+        assert f.read() == CSV_BYTES
+    assert read_metadata(path)['rows'] == info['rows'] == 20
+
+
+def test_resumable_upload_survives_restart(tmp_path):
+    uploads = ResumableUploads(str(tmp_path), chunk_size=8)
+    upload_id = uploads.create('class.csv')['upload_id']
+    offset = uploads.append(upload_id, 0, io.BytesIO(CSV_BYTES[:50]))
+    with pytest.raises(UploadError):
+        uploads.append(upload_id, 10, io.BytesIO(CSV_BYTES[50:]))
+
+    # A fresh instance (e.g. another worker) rebuilds its state from disk
+    restarted = ResumableUploads(str(tmp_path), chunk_size=8)
+    assert restarted.status(upload_id)['offset'] == offset
+    restarted.append(upload_id, offset, io.BytesIO(CSV_BYTES[50:]))
+    info = restarted.complete(upload_id, str(tmp_path / 'class.csv'))
+    assert info['sha256'] == hashlib.sha256(CSV_BYTES).hexdigest()
+    assert info['rows'] == 20
+    assert restarted.status(upload_id) is None
+
+
+def test_abandoned_and_aborted_sessions(tmp_path):
+    uploads = ResumableUploads(str(tmp_path), chunk_size=8, session_ttl=3600)
+    stale = uploads.create('old.csv')['upload_id']
+    uploads.append(stale, 0, io.BytesIO(CSV_BYTES[:20]))
+    fresh = uploads.create('new.csv')['upload_id']
+    assert uploads.sweep(now=time.time() + 1800) == []
+    for name in os.listdir(uploads.partial_folder):
+        if name.startswith(stale):
+            path = os.path.join(uploads.partial_folder, name)
+            os.utime(path, (time.time() - 7200, time.time() - 7200))
+    assert uploads.sweep() == [stale]
+    assert uploads.status(stale) is None and uploads.status(fresh) is not None
+
+    # Another worker deletes the session while a chunk is being written
+    other_worker = ResumableUploads(str(tmp_path))
+
+    class AbortingStream(io.BytesIO):
+        def read(self, size=-1):
+            other_worker.abort(fresh)
+            return super().read(size)
+
+    with pytest.raises(KeyError):
+        uploads.append(fresh, 0, AbortingStream(CSV_BYTES))
+    assert os.listdir(uploads.partial_folder) == []
+
+
+def write_workbook(path, n_rows):
+    openpyxl = pytest.importorskip('openpyxl')
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Class A')
+    sheet.append(['student_id', 'name', 'math_marks', 'attendance'])
+    for i in range(1, n_rows + 1):
+        sheet.append([i, f'Student {i}', 40 + i % 60, None if i % 10 == 0 else 80])
+    other = workbook.create_sheet('Notes')
+    other.append(['note'])
+    other.append(['term 1'])
+    workbook.save(path)
+
+
+def test_convert_workbook_in_chunks(tmp_path):
+    from ingestion.excel import convert_workbook, load_sheet
+    path = str(tmp_path / 'grades.xlsx')
+    write_workbook(path, 250)
+    sheets = convert_workbook(path, chunk_rows=100)
+    assert [s['name'] for s in sheets] == ['Class A', 'Notes']
+    assert sheets[0]['rows'] == 250
+
+    df = load_sheet(path)
+    assert df.columns.tolist() == ['student_id', 'name', 'math_marks', 'attendance']
+    assert df['math_marks'].dtype.kind in 'if'
+    assert df['attendance'].isnull().sum() == 25
+    assert load_sheet(path, 'Notes')['note'].tolist() == ['term 1']
+    with pytest.raises(UploadError):
+        load_sheet(path, 5)
+
+
+def test_failed_workbook_upload_leaves_no_files(tmp_path, monkeypatch):
+    import ingestion.excel as excel
+    source = str(tmp_path / 'source.xlsx')
+    write_workbook(source, 20)
+    upload_folder = tmp_path / 'uploads'
+    upload_folder.mkdir()
+
+    def unreadable(path, sheet=None):
+        raise ValueError('corrupt sheet')
+
+    # Conversion writes both sheet pickles before the first sheet fails to load
+    monkeypatch.setattr(excel, 'load_sheet', unreadable)
+    with open(source, 'rb') as f, pytest.raises(UploadError):
+        excel.save_workbook_upload(f, str(upload_folder / 'grades.xlsx'))
+    assert os.listdir(upload_folder) == []
+
+
+def test_data_cleaner_reads_cached_sheet(tmp_path):
+    from preprocessing.data_cleaning import DataCleaner
+    from ingestion.excel import save_workbook_upload
+    path = str(tmp_path / 'grades.xlsx')
+    write_workbook(str(tmp_path / 'source.xlsx'), 30)
+    with open(tmp_path / 'source.xlsx', 'rb') as f:
+        info = save_workbook_upload(f, path)
+    assert info['rows'] == 30
+    assert len(info['preview']) == 5
+
+    os.remove(path)  # the workbook itself is no longer needed once converted
+    df = DataCleaner().load_data(path)
+    assert len(df) == 30
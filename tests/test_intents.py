@@ -0,0 +1,64 @@
+import pytest
+import sys
+import os
+
+# Add the repository root and genai to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'genai'))
+
+from genai.intents import CHATBOT_DEFAULT, QUICK_DEFAULT, QUICK_INTENTS, QUICK_ROUTER, IntentRouter
+
+
+def chained_response(message):
+    msg = message.lower()
+    for intent in QUICK_INTENTS:
+        if any(keyword in msg for keyword in intent['keywords']):
+            return intent['response']
+    return QUICK_DEFAULT
+
+
+@pytest.mark.parametrize('message', [
+    'Why is Ravi at RISK?', 'can you help', 'attendance is low', 'marks dropped',
+    'how does the model work', 'risky prediction help', 'hello', '', 'Grades and attendance',
+])
+def test_quick_router_matches_chained_checks(message):
+    assert QUICK_ROUTER.respond(message, QUICK_DEFAULT) == chained_response(message)
+
+
+def test_overlapping_and_prefix_keywords():
+    router = IntentRouter([
+        {'name': 'marks', 'priority': 1, 'keywords': ['mark']},
+        {'name': 'marksheet', 'priority': 2, 'keywords': ['marksheet']},
+        {'name': 'at_risk', 'priority': 3, 'all_of': [['at risk'], ['risk']]},
+    ])
+    assert router.keywords_in('Student at risk, see marksheet') == {'at risk', 'risk', 'mark', 'marksheet'}
+    assert router.match('see the marksheet')['name'] == 'marksheet'
+    assert router.match('remarks')['name'] == 'marks'
+    assert router.match('student is at risk')['name'] == 'at_risk'
+    assert router.match('nothing here') is None
+
+
+def test_priority_ties_and_context():
+    router = IntentRouter([
+        {'name': 'first', 'keywords': ['help']},
+        {'name': 'second', 'keywords': ['help']},
+        {'name': 'student', 'priority': 5, 'requires': ['student'], 'all_of': [['how'], ['improve', 'help']]},
+    ])
+    assert router.match('how can I help')['name'] == 'first'
+    assert router.match('how can I help', context=['student'])['name'] == 'student'
+    assert router.match('can I help', context=['student'])['name'] == 'first'
+
+
+def test_chatbot_fallback_uses_router():
+    from chatbot import StudentPerformanceChatbot
+    bot = StudentPerformanceChatbot(api_key=None)
+    bot.index_student_data([{'student_id': 'S1', 'at_risk': 'Yes', 'risk_probability': 82.0}])
+
+    assert 'S1 is at risk' in bot._generate_fallback_response('Why is this student at risk?', 'S1')
+    assert bot._generate_fallback_response('Why is this student at risk?', None).startswith('At-risk students')
+    assert 'Intervention Plan' in bot._generate_fallback_response('what intervention fits?', 'S1')
+    assert bot._generate_fallback_response('hi', None) == CHATBOT_DEFAULT
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
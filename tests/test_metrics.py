@@ -0,0 +1,40 @@
+import sys
+import os
+import time
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from monitoring.metrics import MetricsRegistry, server_timing_header
+
+
+def test_histogram_buckets_and_render():
+    registry = MetricsRegistry()
+    with registry.timer('clean_data'):
+        time.sleep(0.002)
+    registry.stage_seconds.observe(100.0, stage='clean_data')
+    series = registry.stage_seconds.get(stage='clean_data')
+    assert series['count'] == 2
+    assert sum(series['counts']) == 1  # 100s lands only in +Inf
+
+    text = registry.render()
+    assert '# TYPE student_stage_duration_seconds histogram' in text
+    assert 'student_stage_duration_seconds_bucket{stage="clean_data",le="+Inf"} 2' in text
+    assert 'student_stage_duration_seconds_count{stage="clean_data"} 2' in text
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    with registry.timer('predict'):
+        pass
+    assert registry.stage_seconds.get(stage='predict') is None
+
+
+def test_request_stage_collection():
+    registry = MetricsRegistry()
+    registry.start_request()
+    registry.record_stage('predict', 0.01)
+    registry.record_stage('predict', 0.02)
+    stages = registry.finish_request()
+    assert len(stages) == 2
+    assert server_timing_header(stages) == 'predict;dur=30.00'
@@ -0,0 +1,88 @@
+import pytest
+import pandas as pd
+import os
+
+from synthetic_data import write_cohort_csv
+from prediction.batch import BatchScorer
+from prediction.offline import progress_path, score_to_file
+from prediction.pipeline import prepare_student_frame, score_frame
+from prediction.registry import ModelRegistry
+
+
+@pytest.fixture
+def cohort(tmp_path):
+    return write_cohort_csv(str(tmp_path / 'cohort.csv'), 1000, seed=5, missing_rate=0.1)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def test_chunks_match_whole_file_scoring(predictor, cohort, tmp_path):
+    output = str(tmp_path / 'scores.csv')
+    report = score_to_file(BatchScorer(max_workers=1), predictor, None, cohort, output, chunk_rows=128, explain_top_k=2)
+    assert report['rows'] == 1000 and report['rows_per_s'] > 0
+
+    scored = pd.read_csv(output)
+    df, student_ids = prepare_student_frame(pd.read_csv(cohort))
+    expected = score_frame(predictor, df, student_ids)['results']
+    assert scored['student_id'].tolist() == student_ids
+    assert scored['risk_probability'].tolist() == [r['risk_probability'] for r in expected]
+    assert scored['risk_level'].tolist() == [r['risk_level'] for r in expected]
+    assert scored['explanation'].notnull().all()
+
+
+def test_resume_after_interruption(predictor, cohort, tmp_path):
+    scorer = BatchScorer(max_workers=1)
+    full = str(tmp_path / 'full.csv')
+    score_to_file(scorer, predictor, None, cohort, full, chunk_rows=100)
+
+    output = str(tmp_path / 'scores.csv')
+
+    def stop(rows_done, rows_per_s):
+        if rows_done >= 300:
+            raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        score_to_file(scorer, predictor, None, cohort, output, chunk_rows=100, on_chunk=stop)
+    with open(output, 'ab') as f:
+        f.write(b'partial,row\n')
+
+    report = score_to_file(scorer, predictor, None, cohort, output, chunk_rows=100)
+    assert report['resumed_from'] == 300 and report['rows_this_run'] == 700
+    with open(full, 'rb') as a, open(output, 'rb') as b:
+        assert a.read() == b.read()
+    assert score_to_file(scorer, predictor, None, cohort, output, chunk_rows=100)['rows_this_run'] == 0
+
+    predictor.version = 'other-model'
+    try:
+        with pytest.raises(ValueError):
+            score_to_file(scorer, predictor, None, cohort, output, chunk_rows=100)
+    finally:
+        predictor.version = None
+    assert os.path.exists(progress_path(output))
+
+
+def test_pool_matches_inline(predictor, cohort, tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    predictor.version = registry.register(predictor)
+    scorer = BatchScorer(max_workers=2)
+    try:
+        score_to_file(BatchScorer(max_workers=1), predictor, None, cohort, str(tmp_path / 'inline.csv'), chunk_rows=150)
+        score_to_file(scorer, predictor, registry.model_path(predictor.version), cohort, str(tmp_path / 'pool.csv'), chunk_rows=150)
+    finally:
+        scorer.shutdown()
+        predictor.version = None
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'inline.csv'), pd.read_csv(tmp_path / 'pool.csv'))
+
+
+def test_parquet_output(predictor, cohort, tmp_path):
+    pytest.importorskip('pyarrow')
+    output = str(tmp_path / 'scores.parquet')
+    score_to_file(BatchScorer(max_workers=1), predictor, None, cohort, output, chunk_rows=400)
+    assert sorted(os.listdir(output)) == ['part-00000.parquet', 'part-00001.parquet', 'part-00002.parquet']
+    assert len(pd.read_parquet(output)) == 1000
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,97 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add backend and benchmarks to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+from sklearn.metrics import accuracy_score, f1_score, log_loss
+from synthetic_data import write_cohort_csv
+from prediction.out_of_core import ReservoirSample, StratifiedReservoir, StreamingMetrics, train_out_of_core
+from prediction.predictor import StudentPredictor
+
+
+@pytest.fixture
+def cohort(tmp_path):
+    return write_cohort_csv(str(tmp_path / 'cohort.csv'), 3000, seed=9)
+
+
+def test_reservoir_is_uniform_over_the_stream():
+    counts = np.zeros(1000)
+    for seed in range(200):
+        reservoir = ReservoirSample(100, 1, np.random.default_rng(seed))
+        for start in range(0, 1000, 64):
+            reservoir.add(np.arange(start, min(start + 64, 1000), dtype=float).reshape(-1, 1))
+        assert reservoir.size == 100 and reservoir.seen == 1000
+        assert len(np.unique(reservoir.rows)) == 100
+        counts[reservoir.rows[:, 0].astype(int)] += 1
+    # Every row should be kept 200 * 100 / 1000 = 20 times on average, early and late alike
+    assert abs(counts[:500].mean() - 20) < 1 and abs(counts[500:].mean() - 20) < 1
+
+
+def test_stratified_sample_keeps_class_proportions_and_rare_classes():
+    rng = np.random.default_rng(0)
+    reservoir = StratifiedReservoir(200, 2, rng)
+    y = np.r_[np.zeros(9000), np.ones(990), np.full(10, 2)]
+    reservoir.add(rng.random((len(y), 2)), y)
+    X, labels = reservoir.sample()
+    assert len(X) == len(labels) <= 201
+    assert (labels == 0).sum() == 180 and (labels == 1).sum() == 20 and (labels == 2).sum() == 1
+
+
+def test_streaming_metrics_match_sklearn():
+    rng = np.random.default_rng(1)
+    y = rng.integers(0, 2, 1000)
+    risk = np.clip(y * 0.6 + rng.random(1000) * 0.5, 0, 1)
+    predictions = (risk >= 0.5).astype(int)
+    streaming = StreamingMetrics()
+    for start in range(0, 1000, 128):
+        part = slice(start, start + 128)
+        streaming.update(y[part], predictions[part], risk[part])
+    result = streaming.result()
+    assert result['rows'] == 1000
+    assert result['accuracy'] == pytest.approx(accuracy_score(y, predictions))
+    assert result['f1'] == pytest.approx(f1_score(y, predictions))
+    assert result['log_loss'] == pytest.approx(log_loss(y, np.clip(risk, 1e-15, 1 - 1e-15)))
+
+
+def test_train_out_of_core_bounds_the_sample(cohort):
+    predictor = StudentPredictor('random_forest')
+    metrics, X, y = train_out_of_core(predictor, cohort, memory_budget_mb=0.1, chunk_rows=500)
+    assert metrics['rows_seen'] == 3000
+    assert metrics['sample_rows'] == len(X) <= metrics['sample_capacity'] + 1
+    assert metrics['holdout']['rows'] == pytest.approx(600, abs=80)
+    assert sum(metrics['class_counts'].values()) + metrics['holdout']['rows'] == 3000
+    assert predictor.is_trained and predictor.feature_names == X.columns.tolist()
+    # The drift profile covers the whole file, not just the sample
+    assert predictor.profile['rows'] == 3000
+    assert metrics['test_accuracy'] > 0.8
+    assert len(predictor.predict(X.head(5))[0]) == 5
+
+
+def test_train_out_of_core_is_deterministic(cohort):
+    first, X1, _ = train_out_of_core(StudentPredictor('random_forest'), cohort, memory_budget_mb=0.1, chunk_rows=700)
+    second, X2, _ = train_out_of_core(StudentPredictor('random_forest'), cohort, memory_budget_mb=0.1, chunk_rows=700)
+    assert first['holdout'] == second['holdout']
+    pd.testing.assert_frame_equal(X1, X2)
+
+
+def test_train_out_of_core_cleans_values_first_seen_in_a_later_chunk(tmp_path):
+    path = str(tmp_path / 'late.csv')
+    df = pd.read_csv(write_cohort_csv(path, 3000, seed=9))
+    df.loc[2000:2100, 'attendance'] = np.nan
+    df['track'] = 'core'
+    df.loc[2500:2749, 'track'] = 'honours'
+    df.loc[2750:, 'track'] = 'remedial'
+    df.to_csv(path, index=False)
+    metrics, X, _ = train_out_of_core(StudentPredictor('svm'), path, memory_budget_mb=0.1, chunk_rows=500)
+    assert metrics['rows_seen'] == 3000
+    assert not X.isna().any().any()
+    assert X['track'].nunique() == 3
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -10,6 +10,9 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
 from prediction.predictor import StudentPerformancePredictor
 from preprocessing.data_cleaning import DataCleaner
 from preprocessing.feature_selection import FeatureEngineer, create_risk_label
+from prediction.attribution import get_explainer, top_contributions
+from prediction.explainability import explain_prediction
+from prediction.artifact import floor_float32, is_compact_artifact
 
 
 @pytest.fixture
@@ -80,5 +83,106 @@ def test_single_student_prediction(sample_training_data):
     assert isinstance(result['is_at_risk'], bool)
 
 
+def test_contributions_sum_to_probability(sample_training_data):
+    engineer = FeatureEngineer()
+    X, y = engineer.prepare_features_for_training(
+        sample_training_data,
+        target_column='at_risk'
+    )
+    predictor = StudentPerformancePredictor(model_type='random_forest')
+    predictor.train(X, y, test_size=0.3)
+    _, probabilities = predictor.predict(X.copy())
+    attribution = predictor.explain_contributions(X.copy())
+    assert attribution['values'].shape == X.shape
+    np.testing.assert_allclose(
+        attribution['bias'] + attribution['values'].sum(axis=1),
+        probabilities[:, 1],
+        atol=1e-6
+    )
+
+
+def test_contribution_explanations(sample_training_data):
+    engineer = FeatureEngineer()
+    X, y = engineer.prepare_features_for_training(
+        sample_training_data,
+        target_column='at_risk'
+    )
+    predictor = StudentPerformancePredictor(model_type='random_forest')
+    predictor.train(X, y, test_size=0.3)
+    attribution = predictor.explain_contributions(X.copy(), time_budget=5)
+    top = top_contributions(attribution['values'], attribution['feature_names'], top_k=2)
+    risky = int(np.argmax(attribution['values'].sum(axis=1)))
+    assert 0 < len(top[risky]) <= 2
+
+    explanation = explain_prediction(
+        X.iloc[risky].to_dict(),
+        {'is_at_risk': True, 'risk_probability': 0.9},
+        top[risky]
+    )
+    assert explanation['risk_factors']
+    assert explanation['risk_level'] == 'High'
+
+    svm = StudentPerformancePredictor(model_type='svm')
+    svm.train(X, y, test_size=0.3)
+    assert svm.explain_contributions(X.copy()) is None
+
+
+def test_floor_float32_keeps_split_decisions():
+    thresholds = np.random.RandomState(0).uniform(0, 100, 10000)
+    floored = floor_float32(thresholds)
+    assert floored.dtype == np.float32
+    assert (floored.astype(np.float64) <= thresholds).all()
+    # Nothing float32 lies between the stored and the original threshold
+    above = np.nextafter(floored, np.float32(np.inf)).astype(np.float64)
+    assert (above > thresholds).all()
+
+
+def test_compact_artifact_roundtrip(sample_training_data, tmp_path):
+    engineer = FeatureEngineer()
+    X, y = engineer.prepare_features_for_training(sample_training_data, target_column='at_risk')
+    predictor = StudentPerformancePredictor(model_type='random_forest')
+    predictor.train(X, y, test_size=0.3)
+
+    pickle_path, compact_path = str(tmp_path / 'model.pkl'), str(tmp_path / 'model.forest')
+    assert predictor.save_model(pickle_path) is False
+    assert predictor.save_model(compact_path, compact=True) is True
+    assert is_compact_artifact(compact_path) and not is_compact_artifact(pickle_path)
+    assert os.path.getsize(compact_path) < os.path.getsize(pickle_path)
+
+    loaded = StudentPerformancePredictor()
+    loaded.load_model(compact_path)
+    assert loaded.model_type == 'random_forest' and loaded.feature_names == predictor.feature_names
+    grid = np.random.RandomState(1).uniform(0, 100, (500, X.shape[1]))
+    np.testing.assert_array_equal(loaded.model.predict_proba(grid), predictor.model.predict_proba(grid))
+    np.testing.assert_array_equal(loaded.model.apply(grid), predictor.model.apply(grid))
+    np.testing.assert_allclose(loaded.model.feature_importances_, predictor.model.feature_importances_, rtol=1e-5)
+    np.testing.assert_allclose(loaded.explain_contributions(X.copy())['values'],
+                               predictor.explain_contributions(X.copy())['values'])
+
+    svm = StudentPerformancePredictor(model_type='svm')
+    svm.train(X, y, test_size=0.3)
+    assert svm.save_model(str(tmp_path / 'svm.pkl'), compact=True) is False
+
+
+def test_explainer_cache_is_shared_across_threads(sample_training_data):
+    from concurrent.futures import ThreadPoolExecutor
+    X, y = FeatureEngineer().prepare_features_for_training(sample_training_data, target_column='at_risk')
+    forests = []
+    for seed in range(6):
+        predictor = StudentPerformancePredictor(model_type='random_forest', model_params={'n_estimators': 5, 'random_state': seed})
+        predictor.train(X, y, test_size=0.3)
+        forests.append(predictor.model)
+
+    def lookup(i):
+        forest = forests[i % len(forests)]
+        return forest, get_explainer(forest, X.shape[1], version=f'thread-test-{i % len(forests)}')
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lookup, range(200)))
+    assert all(explainer.forest is forest for forest, explainer in results)
+    # Later lookups reuse whichever explainer the racing threads cached
+    assert get_explainer(forests[0], X.shape[1], version='thread-test-0') is get_explainer(forests[0], X.shape[1], version='thread-test-0')
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -60,6 +60,78 @@ def test_clean_pipeline(sample_data):
         assert pd.api.types.is_numeric_dtype(df_cleaned[col])
 
 
+def test_cleaning_state_matches_clean_data(sample_data):
+    cleaner = DataCleaner()
+    state = cleaner.fit_cleaning_state(sample_data.copy())
+    expected = DataCleaner().clean_data(sample_data.copy())
+    pd.testing.assert_frame_equal(cleaner.apply_cleaning_state(sample_data.copy(), state), expected)
+
+    # A single row cleaned with the stored state gets the full frame's fill values and codes
+    pd.testing.assert_frame_equal(cleaner.apply_cleaning_state(sample_data.iloc[[1]].copy(), state), expected.iloc[[1]])
+
+
+def test_chunked_cleaning_state_matches_whole_file():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        'math_marks': rng.integers(20, 100, 1001).astype(float),
+        'attendance': rng.normal(80, 10, 1001),
+        'gender': rng.choice(['M', 'F', 'X'], 1001).astype(object),
+    })
+    for column in df.columns:
+        df.loc[rng.random(len(df)) < 0.1, column] = np.nan
+    chunks = [df.iloc[start:start + 150] for start in range(0, len(df), 150)]
+    state = DataCleaner().fit_cleaning_state_chunks(chunks)
+    assert state == DataCleaner().fit_cleaning_state(df)
+    pd.testing.assert_frame_equal(
+        pd.concat([DataCleaner().apply_cleaning_state(chunk, state) for chunk in chunks]),
+        DataCleaner().clean_data(df.copy())
+    )
+
+
+def test_outlier_bounds_and_actions():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'student_id': np.arange(1, 1001),
+        'math_marks': rng.normal(65, 10, 1000),
+        'attendance': rng.normal(85, 5, 1000),
+        'grade': np.full(1000, 10),
+        'gender': rng.choice(['M', 'F'], 1000),
+    })
+    df.loc[0, 'math_marks'] = 900
+    df.loc[1, 'attendance'] = -40
+    cleaner = DataCleaner()
+    for method in ('iqr', 'mad'):
+        bounds = cleaner.fit_outlier_bounds(df, method)
+        # No fences for ids, text or constant columns
+        assert sorted(bounds) == ['attendance', 'math_marks']
+        assert bounds['math_marks'][0] < 35 and 95 < bounds['math_marks'][1] < 900
+
+    bounds = cleaner.fit_outlier_bounds(df)
+    assert cleaner.outlier_mask(df, bounds).any(axis=1).tolist()[:3] == [True, True, False]
+    clipped = cleaner.remove_outliers(df.copy(), bounds, 'clip')
+    assert clipped.loc[0, 'math_marks'] == bounds['math_marks'][1] and clipped.loc[1, 'attendance'] == bounds['attendance'][0]
+    assert clipped.loc[2:, 'math_marks'].equals(df.loc[2:, 'math_marks'])
+    assert cleaner.remove_outliers(df.copy(), bounds, 'flag')['outlier_count'].sum() == 2
+    assert len(cleaner.remove_outliers(df.copy(), bounds, 'drop')) == 998
+    with pytest.raises(ValueError):
+        cleaner.remove_outliers(df.copy(), bounds, 'ignore')
+
+
+def test_clean_pipeline_reuses_training_bounds(sample_data):
+    cleaner = DataCleaner()
+    cleaner.clean_pipeline(sample_data.copy(), normalize_flag=False)
+    bounds = cleaner.outlier_bounds
+    assert 'student_id' not in bounds and 'attendance' in bounds
+
+    new = sample_data.copy()
+    new.loc[0, 'attendance'] = 500
+    cleaned = DataCleaner().clean_pipeline(new, normalize_flag=False, outlier_bounds=bounds)
+    assert cleaned.loc[0, 'attendance'] == bounds['attendance'][1]
+    untouched = DataCleaner().clean_pipeline(sample_data.copy().assign(attendance=[500, 80, 65, 50, 88]),
+                                             remove_outliers_flag=False, normalize_flag=False)
+    assert untouched.loc[0, 'attendance'] == 500
+
+
 if __name__ == '__main__':
     import pytest
     pytest.main([__file__, '-v'])
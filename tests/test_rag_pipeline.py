@@ -0,0 +1,57 @@
+import pytest
+import random
+import sys
+import os
+
+# Add genai to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'genai'))
+
+from rag_pipeline import RAGPipeline, estimate_tokens, fit_token_budget
+
+
+def cohort(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        {'student_id': f'S{i}', 'math_marks': rng.randint(20, 95), 'attendance': rng.randint(50, 100),
+         'at_risk': rng.choice(['Yes', 'No']), 'risk_probability': rng.choice([0.0, 50.0, round(rng.random() * 100, 1)])}
+        for i in range(n)
+    ]
+
+
+def test_precomputed_similar_cases_match_scan():
+    students = cohort(200)
+    pipeline = RAGPipeline(max_context_tokens=10000)
+    pipeline.index_student_data(students)
+    for student in students:
+        expected = [c['student_id'] for c in pipeline.retrieve_similar_cases(student)]
+        context = pipeline.build_context_for_llm('why?', student['student_id'])
+        lines = [line for line in context.splitlines() if line.startswith('- Student ')]
+        assert [line.split()[2].rstrip(':') for line in lines] == expected
+
+
+def test_context_cache_rebuilt_on_reindex():
+    pipeline = RAGPipeline()
+    pipeline.index_student_data([{'student_id': 'A', 'math_marks': 30, 'at_risk': 'Yes', 'risk_probability': 90.0}])
+    assert 'High risk probability: 90.0%' in pipeline.build_context_for_llm('why?', 'A')
+    assert pipeline.retrieve_student_context('A')['academic_info'] == {'math_marks': 30}
+
+    pipeline.index_student_data([{'student_id': 'B', 'math_marks': 80, 'risk_probability': 10.0}])
+    assert pipeline.retrieve_student_context('A') == {}
+    assert 'Student Context' not in pipeline.build_context_for_llm('why?', 'A')
+    assert '"strengths":["Low risk probability: 10.0%"]' in pipeline.build_context_for_llm('why?', 'B')
+
+
+def test_token_budget():
+    assert fit_token_budget(['a' * 8, 'b' * 8], 10) == 'a' * 8 + '\n' + 'b' * 8
+    assert fit_token_budget(['a' * 8, 'b' * 40], 4) == 'a' * 8 + '\n' + 'b' * 7
+    assert fit_token_budget(['a' * 40, 'b'], 2) == 'a' * 8
+
+    pipeline = RAGPipeline(max_context_tokens=60)
+    pipeline.index_student_data(cohort(20))
+    context = pipeline.build_context_for_llm('why is this student at risk?', 'S3')
+    assert estimate_tokens(context) <= 60
+    assert context.startswith('User Query: why is this student at risk?')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
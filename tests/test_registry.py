@@ -0,0 +1,166 @@
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+import json
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from prediction.predictor import StudentPredictor
+from prediction.registry import ModelRegistry, ShadowScorer
+from prediction.importance import ImportanceJobRunner
+
+
+@pytest.fixture
+def training_data():
+    np.random.seed(42)
+    n_samples = 60
+    X = pd.DataFrame({
+        'math_marks': np.random.randint(30, 100, n_samples),
+        'attendance': np.random.randint(50, 100, n_samples),
+    })
+    y = (X['math_marks'] < 60).astype(int)
+    return X, y
+
+
+def trained_predictor(X, y, **params):
+    predictor = StudentPredictor('random_forest', model_params=params)
+    predictor.train(X, y)
+    return predictor
+
+
+def test_register_is_content_addressed(training_data, tmp_path):
+    X, y = training_data
+    registry = ModelRegistry(str(tmp_path))
+    predictor = trained_predictor(X, y, n_estimators=10)
+    version = registry.register(predictor)
+    assert registry.register(predictor) == version
+    assert registry.has_version(version)
+    assert not registry.has_version('../../etc')
+    assert len(registry.list_versions('random_forest')) == 1
+
+
+def test_promote_and_load(training_data, tmp_path):
+    X, y = training_data
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.load('random_forest') is None
+
+    first = registry.register(trained_predictor(X, y, n_estimators=10))
+    second = registry.register(trained_predictor(X, y, n_estimators=20))
+    registry.promote('random_forest', first)
+    registry.promote('random_forest', second)
+    assert registry.current_version('random_forest') == second
+
+    loaded = registry.load('random_forest')
+    assert loaded.version == second
+    predictions, _ = loaded.predict(X.copy())
+    assert len(predictions) == len(X)
+
+
+def test_load_svm(training_data, tmp_path):
+    X, y = training_data
+    registry = ModelRegistry(str(tmp_path))
+    predictor = StudentPredictor('svm')
+    predictor.train(X, y)
+    registry.promote('svm', registry.register(predictor))
+    _, probabilities = registry.load('svm').predict(X.copy())
+    assert probabilities.shape == (len(X), 2)
+
+
+def test_model_type_is_checked(training_data, tmp_path):
+    X, y = training_data
+    registry = ModelRegistry(str(tmp_path))
+    version = registry.register(trained_predictor(X, y, n_estimators=10))
+    with pytest.raises(ValueError):
+        registry.promote('svm', version)
+    with pytest.raises(ValueError):
+        registry.load('svm', version)
+    with pytest.raises(ValueError):
+        registry.promote('../../tmp/pwn', version)
+    assert registry.current_version('svm') is None
+
+
+def test_shadow_scorer_reports_agreement(training_data):
+    X, y = training_data
+    primary = trained_predictor(X, y, n_estimators=10)
+    candidate = trained_predictor(X, y, n_estimators=10)
+    candidate.version = 'candidate'
+
+    scorer = ShadowScorer()
+    scorer.set_candidate('random_forest', candidate)
+    predictions, probabilities = primary.predict(X.copy())
+    scorer.submit('random_forest', X, predictions, probabilities, 0.01).result()
+
+    report = scorer.report('random_forest')
+    assert report['batches'] == 1
+    assert report['rows'] == len(X)
+    assert report['agreement_rate'] == 1.0
+    assert report['candidate_latency_ms'] > 0
+
+
+def test_importance_stored_per_version(training_data, tmp_path):
+    X, y = training_data
+    registry = ModelRegistry(str(tmp_path))
+    runner = ImportanceJobRunner(registry, n_repeats=2)
+
+    rf = trained_predictor(X, y, n_estimators=10)
+    registry.register(rf)
+    runner.submit(rf).result()
+    importance = registry.load_importance(rf.version)
+    assert importance['method'] == 'impurity'
+    assert {f['feature'] for f in importance['features']} == set(X.columns)
+    assert runner.submit(rf) is None
+
+    svm = StudentPredictor('svm')
+    svm.train(X, y)
+    registry.register(svm)
+    runner.submit(svm, X, y).result()
+    assert runner.get_status(svm.version) == 'done'
+    with open(os.path.join(registry.version_dir(svm.version), 'importance.json')) as f:
+        assert json.load(f)['method'] == 'permutation'
+    runner.shutdown()
+
+
+def test_failed_importance_is_logged(training_data, tmp_path, caplog):
+    X, y = training_data
+    registry = ModelRegistry(str(tmp_path))
+    runner = ImportanceJobRunner(registry)
+    svm = StudentPredictor('svm')
+    svm.train(X, y)
+    registry.register(svm)
+    # Labels that do not line up with the rows make the worker raise
+    runner.submit(svm, X, np.asarray(y)[:5]).result()
+    assert runner.get_status(svm.version) == 'failed'
+    assert registry.load_importance(svm.version) is None
+    assert any(svm.version in record.getMessage() for record in caplog.records)
+    runner.shutdown()
+
+
+def test_importance_without_holdout_is_unavailable(training_data, tmp_path):
+    X, y = training_data
+    registry = ModelRegistry(str(tmp_path))
+    runner = ImportanceJobRunner(registry)
+    svm = StudentPredictor('svm')
+    svm.train(X, y)
+    registry.register(svm)
+    # Permutation importance without held-out rows is not computed in-sample, and is not a failure
+    assert runner.submit(svm) is None
+    assert runner.get_status(svm.version) == 'unavailable'
+    assert registry.load_importance(svm.version) is None
+    runner.shutdown()
+
+
+def test_registers_forests_as_compact_artifacts(training_data, tmp_path):
+    X, y = training_data
+    predictor = trained_predictor(X, y, n_estimators=10)
+    compact = ModelRegistry(str(tmp_path / 'compact'))
+    legacy = ModelRegistry(str(tmp_path / 'legacy'), compact=False)
+    compact_version, legacy_version = compact.register(predictor), legacy.register(predictor)
+    assert compact.model_path(compact_version).endswith('model.forest')
+    assert legacy.model_path(legacy_version).endswith('model.pkl')
+
+    for registry, version in ((compact, compact_version), (legacy, legacy_version)):
+        loaded = registry.load('random_forest', version)
+        np.testing.assert_array_equal(loaded.predict(X.copy())[1], predictor.predict(X.copy())[1])
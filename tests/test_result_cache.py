@@ -0,0 +1,108 @@
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from prediction.predictor import StudentPredictor
+from prediction.result_cache import ResultCache, row_hashes
+from prediction.pipeline import score_with_cache
+
+
+@pytest.fixture
+def cohort():
+    np.random.seed(3)
+    n_samples = 80
+    df = pd.DataFrame({
+        'student_id': range(1, n_samples + 1),
+        'math_marks': np.random.randint(30, 100, n_samples),
+        'attendance': np.random.randint(50, 100, n_samples),
+    })
+    y = (df['math_marks'] < 60).astype(int)
+    return df, y
+
+
+def result(probability):
+    return {'student_id': 1, 'at_risk': 'No', 'risk_probability': probability}
+
+
+def test_row_hashes_follow_content():
+    X = np.array([[1.0, 2.0], [1.0, 2.0], [2.0, 1.0]])
+    hashes = row_hashes(X)
+    assert hashes[0] == hashes[1] != hashes[2]
+
+
+def test_get_put_and_invalidate(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite3'))
+    cache.put_many('random_forest', 'v1', [1, 2], [result(10.0), result(20.0)])
+    cache.put_many('svm', 's1', [1], [result(30.0)])
+    found = cache.get_many('v1', [1, 2, 3])
+    assert found == {1: {'at_risk': 'No', 'risk_probability': 10.0}, 2: {'at_risk': 'No', 'risk_probability': 20.0}}
+    assert cache.get_many('v2', [1]) == {}
+
+    cache.invalidate('random_forest', keep_version='v2')
+    assert cache.get_many('v1', [1, 2]) == {}
+    assert cache.get_many('s1', [1]) != {}
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite3'), max_entries=10, touch_interval=0)
+    cache.put_many('random_forest', 'v1', list(range(10)), [result(float(i)) for i in range(10)])
+    cache.get_many('v1', [0])
+    cache.put_many('random_forest', 'v1', [10], [result(10.0)])
+    assert cache.stats()['entries'] == 9
+    assert 0 in cache.get_many('v1', [0])
+    assert cache.get_many('v1', [1, 2]) == {}
+
+
+def test_recent_hits_are_not_rewritten_and_count_is_tracked(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = ResultCache(path, touch_interval=60)
+    cache.put_many('random_forest', 'v1', [1, 2, 3], [result(1.0), result(2.0), result(3.0)])
+    cache.put_many('random_forest', 'v1', [3, 4], [result(3.5), result(4.0)])
+    cache.put_many('svm', 's1', [1], [result(5.0)])
+
+    conn = cache._connect()
+    before = conn.total_changes
+    assert len(cache.get_many('v1', [1, 2, 3])) == 3
+    assert conn.total_changes == before
+    conn.execute('UPDATE results SET last_used = last_used - 120 WHERE row_hash = 1')
+    before = conn.total_changes
+    cache.get_many('v1', [1, 2])
+    assert conn.total_changes == before + 1
+
+    def tracked():
+        return conn.execute('SELECT entries FROM result_count').fetchone()[0]
+
+    assert tracked() == 5
+    cache.invalidate('random_forest')
+    assert tracked() == 1
+    # Reopening an existing database keeps the count
+    assert ResultCache(path)._connect().execute('SELECT entries FROM result_count').fetchone()[0] == 1
+
+
+def test_score_with_cache_only_scores_changed_rows(cohort, tmp_path):
+    df, y = cohort
+    predictor = StudentPredictor('random_forest', model_params={'n_estimators': 10})
+    predictor.train(df.drop(columns=['student_id']), y)
+    predictor.version = 'v1'
+    cache = ResultCache(str(tmp_path / 'cache.sqlite3'))
+    scored_rows = []
+
+    def predict(X):
+        scored_rows.append(len(X))
+        return predictor.predict(X)
+
+    ids = df['student_id'].tolist()
+    first, _, hits = score_with_cache(cache, predictor, df.drop(columns=['student_id']), df, ids, predict)
+    assert hits == 0 and scored_rows == [80]
+
+    changed = df.copy()
+    changed.loc[:4, 'attendance'] = 0
+    second, _, hits = score_with_cache(cache, predictor, changed.drop(columns=['student_id']), changed, ids, predict)
+    assert hits == 75 and scored_rows == [80, 5]
+    assert [r['student_id'] for r in second] == ids
+    assert second[10] == first[10]
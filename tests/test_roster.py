@@ -0,0 +1,129 @@
+import pytest
+import threading
+import time
+import numpy as np
+
+from synthetic_data import generate_cohort
+from prediction.explainability import summarize_results
+from prediction.roster import RosterStore, diff_rosters, score_roster
+
+
+@pytest.fixture(scope='module')
+def predictor(predictor):
+    predictor.version = 'roster-v1'
+    return predictor
+
+
+def counting_predict(predictor, calls):
+    def predict(X):
+        calls.append(len(X))
+        return predictor.predict(X)
+    return predict
+
+
+def test_diff_rosters():
+    previous = generate_cohort(5)
+    current = generate_cohort(5).iloc[1:].copy()
+    current.loc[2, 'math_marks'] = 0
+    current.loc[len(current) + 1] = previous.iloc[0].tolist()
+    current.loc[len(current), 'student_id'] = 99
+    delta = diff_rosters(previous, current, 'student_id')
+    assert delta == {'new': [99], 'changed': [3], 'removed': [1], 'unchanged': [2, 4, 5]}
+
+
+def test_invalid_roster_name(tmp_path):
+    with pytest.raises(ValueError):
+        RosterStore(str(tmp_path)).path('../class')
+
+
+def test_reupload_rescores_only_changed_students(predictor, tmp_path):
+    store = RosterStore(str(tmp_path))
+    calls = []
+    week1 = generate_cohort(60)
+    first = score_roster(store, 'class_a', week1.copy(), predictor, counting_predict(predictor, calls))
+    assert first['mode'] == 'full' and calls == [60]
+
+    week2 = week1.copy()
+    week2.loc[week2['student_id'] == 5, ['math_marks', 'science_marks', 'attendance']] = [5, 5, 10]
+    week2 = week2[week2['student_id'] != 7]
+    second = score_roster(store, 'class_a', week2.copy(), predictor, counting_predict(predictor, calls))
+    assert second['mode'] == 'delta' and calls == [60, 1]
+    assert second['delta']['changed'] == [5] and second['delta']['removed'] == [7]
+    assert [r['student_id'] for r in second['results']] == week2['student_id'].tolist()
+
+    # Same outcome as scoring the new upload from scratch
+    fresh = score_roster(RosterStore(str(tmp_path / 'fresh')), 'class_a', week2.copy(), predictor, predictor.predict)
+    assert [r['risk_probability'] for r in second['results']] == [r['risk_probability'] for r in fresh['results']]
+    assert second['summary'] == pytest.approx(summarize_results(fresh['results']))
+
+    before, after = first['results'][4]['risk_level'], second['results'][4]['risk_level']
+    expected = [{'student_id': 5, 'from': before, 'to': after, 'risk_probability': second['results'][4]['risk_probability']}]
+    assert second['transitions'] == (expected if before != after else [])
+
+
+def test_reupload_with_new_nulls_fills_them(predictor, tmp_path):
+    store = RosterStore(str(tmp_path))
+    week1 = generate_cohort(40)
+    score_roster(store, 'class_d', week1.copy(), predictor, predictor.predict)
+
+    def checked_predict(X):
+        assert not np.isnan(np.asarray(X, dtype=float)).any()
+        return predictor.predict(X)
+
+    week2 = week1.copy()
+    week2['attendance'] = week2['attendance'].astype(float)
+    week2.loc[week2['student_id'] == 3, 'attendance'] = np.nan
+    second = score_roster(store, 'class_d', week2.copy(), predictor, checked_predict)
+    assert second['mode'] == 'delta' and second['rescored'] == 1
+
+    # A snapshot stored without a fill value for the column falls back to a full re-score
+    state = store.load('class_d')
+    state['cleaning']['fill_values'].pop('attendance')
+    store.save('class_d', state)
+    week3 = week2.copy()
+    week3.loc[week3['student_id'] == 4, 'attendance'] = np.nan
+    third = score_roster(store, 'class_d', week3.copy(), predictor, checked_predict)
+    assert third['mode'] == 'full' and third['rescored'] == 40
+
+
+def test_model_change_forces_full_rescore(predictor, tmp_path):
+    store = RosterStore(str(tmp_path))
+    cohort = generate_cohort(20)
+    score_roster(store, 'class_b', cohort.copy(), predictor, predictor.predict)
+    predictor.version = 'roster-v2'
+    try:
+        again = score_roster(store, 'class_b', cohort.copy(), predictor, predictor.predict)
+    finally:
+        predictor.version = 'roster-v1'
+    assert again['mode'] == 'full'
+    assert len(again['delta']['changed']) == 20 and again['transitions'] == []
+
+
+def test_concurrent_uploads_of_a_roster_are_serialized(predictor, tmp_path):
+    store = RosterStore(str(tmp_path))
+    week1 = generate_cohort(30)
+    week2 = week1.copy()
+    week2.loc[0, 'math_marks'] = 5
+    entered, release = threading.Event(), threading.Event()
+    outcomes = {}
+
+    def blocking_predict(X):
+        entered.set()
+        release.wait(5)
+        return predictor.predict(X)
+
+    first = threading.Thread(target=lambda: outcomes.update(
+        first=score_roster(store, 'class_c', week1.copy(), predictor, blocking_predict)))
+    second = threading.Thread(target=lambda: outcomes.update(
+        second=score_roster(store, 'class_c', week2.copy(), predictor, predictor.predict)))
+    first.start()
+    entered.wait(5)
+    second.start()
+    time.sleep(0.2)
+    # The second upload waits for the first to save instead of scoring against no snapshot
+    assert second.is_alive()
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert outcomes['first']['mode'] == 'full'
+    assert outcomes['second']['mode'] == 'delta' and outcomes['second']['rescored'] == 1
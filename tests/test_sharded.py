@@ -0,0 +1,74 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add backend and benchmarks to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+from synthetic_data import generate_cohort
+from preprocessing.data_cleaning import DataCleaner
+from preprocessing.feature_selection import create_new_features, create_risk_labels, prepare_for_training
+from prediction.predictor import StudentPredictor
+from prediction.sharded import (
+    _claim, merge_job, plan_job, result_path, run_worker, split_trees, stratified_shards, train_sharded
+)
+
+
+@pytest.fixture(scope='module')
+def training():
+    df = create_new_features(DataCleaner().clean_data(generate_cohort(600, seed=7)))
+    return prepare_for_training(create_risk_labels(df, threshold=50), 'at_risk')
+
+
+def test_split_trees_and_shards():
+    assert split_trees(100, 3) == [34, 33, 33]
+    y = np.array([0] * 10 + [1] * 5)
+    shards = stratified_shards(y, 3, random_state=0)
+    assert sorted(np.concatenate(shards).tolist()) == list(range(15))
+    assert all(set(y[rows]) == {0, 1} for rows in shards)
+    with pytest.raises(ValueError):
+        stratified_shards(y, 6, random_state=0)
+
+
+@pytest.mark.parametrize('mode', ['bootstrap', 'shard'])
+def test_workers_share_tasks_and_merge_into_one_forest(training, tmp_path, mode):
+    X, y = training
+    job_dir = str(tmp_path / 'job')
+    plan_job(job_dir, X, y, 4, {'n_estimators': 10, 'max_depth': 5}, mode=mode, feature_names=X.columns.tolist())
+    # A task another node holds (fresh claim) is left alone
+    assert _claim(job_dir, 3, lease_seconds=60)
+    assert run_worker(job_dir) == [0, 1, 2]
+    assert not os.path.exists(result_path(job_dir, 3))
+    # ...until its lease runs out
+    assert run_worker(job_dir, lease_seconds=0) == [3]
+
+    forest = merge_job(job_dir)
+    assert forest.n_estimators == len(forest.estimators_) == 10
+    predictor = StudentPredictor('random_forest')
+    predictor.model, predictor.feature_names, predictor.is_trained = forest, X.columns.tolist(), True
+    path = str(tmp_path / 'model.forest')
+    predictor.save_model(path, compact=True)
+    loaded = StudentPredictor()
+    loaded.load_model(path)
+    _, probabilities = loaded.predict(X)
+    # The merged forest averages every tree, like a forest grown in one process
+    trees = np.mean([tree.predict_proba(X.values) for tree in forest.estimators_], axis=0)
+    np.testing.assert_allclose(probabilities, trees, atol=1e-6)
+
+
+def test_local_processes_match_a_single_worker(training):
+    X, y = training
+    results = []
+    for workers in (1, 2):
+        predictor = StudentPredictor('random_forest', {'n_estimators': 12})
+        metrics = train_sharded(predictor, X, y, n_workers=workers, n_tasks=3, timeout=120)
+        assert metrics['n_estimators'] == 12 and metrics['tasks'] == 3
+        assert predictor.is_trained and predictor.profile is not None
+        results.append(predictor.predict(X)[1])
+    np.testing.assert_array_equal(results[0], results[1])
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,75 @@
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+import json
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from sklearn.svm import SVC
+
+from prediction.registry import ModelRegistry
+from prediction.tuning import expand_grid, halving_schedule, tune_models, save_tuning_results
+
+
+SMALL_GRIDS = {
+    'random_forest': {'n_estimators': [10, 20], 'max_depth': [3, None]},
+    'svm': {'C': [0.1, 1.0]},
+}
+
+
+@pytest.fixture
+def training_data():
+    np.random.seed(42)
+    n_samples = 80
+    X = pd.DataFrame({
+        'math_marks': np.random.randint(30, 100, n_samples),
+        'science_marks': np.random.randint(30, 100, n_samples),
+        'attendance': np.random.randint(50, 100, n_samples),
+    })
+    y = ((X['math_marks'] + X['science_marks']) / 2 < 60).astype(int)
+    return X, y
+
+
+def test_expand_grid_and_schedule():
+    assert len(expand_grid(SMALL_GRIDS['random_forest'])) == 4
+    schedule = halving_schedule(n_candidates=27, n_folds=5, eta=3)
+    assert schedule == sorted(schedule)
+    assert schedule[-1] == 5
+
+
+def test_tune_models_leaderboard(training_data):
+    X, y = training_data
+    result = tune_models(X, y, grids=SMALL_GRIDS, n_splits=3, n_jobs=1)
+    leaderboard = result['leaderboard']
+    assert len(leaderboard) == 6
+    assert leaderboard[0]['folds_evaluated'] == 3
+    assert [e['rank'] for e in leaderboard] == list(range(1, 7))
+    assert set(result['best']) == {'random_forest', 'svm'}
+
+
+def test_tune_models_process_pool(training_data):
+    X, y = training_data
+    serial = tune_models(X, y, model_types=('random_forest',), grids=SMALL_GRIDS, n_splits=3, n_jobs=1)
+    parallel = tune_models(X, y, model_types=('random_forest',), grids=SMALL_GRIDS, n_splits=3, n_jobs=2)
+    assert serial['winner']['params'] == parallel['winner']['params']
+
+
+def test_save_tuning_results(training_data, tmp_path):
+    X, y = training_data
+    result = tune_models(X, y, grids=SMALL_GRIDS, n_splits=3, n_jobs=1)
+    registry = ModelRegistry(str(tmp_path))
+    report = save_tuning_results(result, X, y, registry)
+    assert os.path.exists(tmp_path / 'tuning_leaderboard.json')
+    with open(tmp_path / 'tuning_leaderboard.json') as f:
+        assert json.load(f)['winner'] == report['winner']
+
+    # The winners are what the app serves, built like any other StudentPredictor
+    assert registry.current_version('svm') == report['saved_versions']['svm']
+    predictor = registry.load('svm')
+    assert isinstance(predictor.model, SVC)
+    predictions, probabilities = predictor.predict(X.copy())
+    assert probabilities.shape == (len(X), 2)
+    assert predictor.model_params == result['best']['svm']['params']
@@ -7,42 +7,94 @@ from datetime import datetime
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
 
 from preprocessing.data_cleaning import DataCleaner, validate_student_data
-from preprocessing.feature_selection import FeatureEngineer, create_risk_label
-from prediction.predictor import StudentPerformancePredictor
+from preprocessing.feature_selection import create_new_features, create_risk_labels, prepare_for_training
+from prediction.predictor import StudentPredictor
+from prediction.out_of_core import train_out_of_core
+from prediction.registry import ModelRegistry
 from config import Config
 
 
+def register_and_promote(registry, predictor, metadata):
+    version = registry.register(predictor, metadata)
+    registry.promote(predictor.model_type, version)
+    return version
+
+
 def train_models(data_path='backend/data/sample_data.csv'):
     cleaner = DataCleaner()
     df = cleaner.load_csv(data_path)
     df = validate_student_data(df)
-    df_cleaned = cleaner.clean_pipeline(df.copy(), remove_outliers_flag=False, normalize_flag=False)
-    engineer = FeatureEngineer()
-    df_features = engineer.create_derived_features(df_cleaned)
-    df_features = create_risk_label(df_features, threshold=Config.RISK_THRESHOLD)
-    X, y = engineer.prepare_features_for_training(df_features, target_column='at_risk')
+    df_cleaned = cleaner.clean_data(df.copy())
+    df_features = create_new_features(df_cleaned)
+    df_features = create_risk_labels(df_features, threshold=Config.RISK_THRESHOLD)
+    X, y = prepare_for_training(df_features, 'at_risk')
+    registry = ModelRegistry(Config.MODEL_REGISTRY_FOLDER, compact=Config.MODEL_COMPACT_ARTIFACTS)
 
-    predictor_rf = StudentPerformancePredictor(model_type='random_forest')
+    versions = {}
+    predictor_rf = StudentPredictor(model_type='random_forest')
     metrics_rf = predictor_rf.train(X, y)
-    rf_path = Config.RANDOM_FOREST_MODEL
-    predictor_rf.save_model(rf_path)
+    versions['random_forest'] = register_and_promote(registry, predictor_rf, {
+        'source_file': data_path,
+        'train_accuracy': metrics_rf['train_accuracy'],
+        'test_accuracy': metrics_rf['test_accuracy']
+    })
 
-    predictor_svm = StudentPerformancePredictor(model_type='svm')
+    predictor_svm = StudentPredictor(model_type='svm')
     metrics_svm = predictor_svm.train(X, y)
-    svm_path = Config.SVM_MODEL
-    predictor_svm.save_model(svm_path)
+    versions['svm'] = register_and_promote(registry, predictor_svm, {
+        'source_file': data_path,
+        'train_accuracy': metrics_svm['train_accuracy'],
+        'test_accuracy': metrics_svm['test_accuracy']
+    })
 
     feature_importance = predictor_rf.get_feature_importance()
     return {
         'rf_metrics': metrics_rf,
         'svm_metrics': metrics_svm,
-        'feature_importance': feature_importance
+        'feature_importance': feature_importance,
+        'versions': versions
     }
 
 
+def train_models_out_of_core(data_path, model_types=('random_forest',), memory_budget_mb=None):
+    """Train from a CSV/Parquet file too large for memory; see prediction/out_of_core.py"""
+    registry = ModelRegistry(Config.MODEL_REGISTRY_FOLDER, compact=Config.MODEL_COMPACT_ARTIFACTS)
+    results = {}
+    for model_type in model_types:
+        predictor = StudentPredictor(model_type=model_type)
+        metrics, _, _ = train_out_of_core(
+            predictor, data_path,
+            memory_budget_mb=memory_budget_mb or Config.TRAIN_MEMORY_BUDGET_MB,
+            chunk_rows=Config.TRAIN_CHUNK_ROWS,
+            test_size=Config.TEST_SIZE,
+            random_state=Config.RANDOM_STATE,
+            threshold=Config.RISK_THRESHOLD
+        )
+        metrics['version'] = register_and_promote(registry, predictor, {
+            'source_file': data_path,
+            'train_accuracy': metrics['train_accuracy'],
+            'test_accuracy': metrics['test_accuracy'],
+            **{key: metrics[key] for key in ('holdout', 'rows_seen', 'sample_rows')}
+        })
+        results[model_type] = metrics
+    return results
+
+
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('--data', type=str, default='backend/data/sample_data.csv')
+    parser.add_argument('--out-of-core', action='store_true', help='Stream the file instead of loading it')
+    parser.add_argument('--memory-mb', type=int, default=None, help='Memory budget for --out-of-core')
+    parser.add_argument('--models', nargs='+', default=['random_forest'], choices=['random_forest', 'svm'],
+                        help='Models for --out-of-core (SVM fit time grows quadratically with the sample)')
     args = parser.parse_args()
-    train_models(args.data)
+    if args.out_of_core:
+        for model_type, metrics in train_models_out_of_core(args.data, tuple(args.models), args.memory_mb).items():
+            holdout = metrics['holdout']
+            print(f"{model_type}: {metrics['rows_seen']:,} rows, sample {metrics['sample_rows']:,}, "
+                  f"holdout accuracy {holdout['accuracy']:.3f} f1 {holdout['f1']:.3f} ({holdout['rows']:,} rows), "
+                  f"promoted version {metrics['version']}")
+    else:
+        versions = train_models(args.data)['versions']
+        print(f"Promoted versions: {versions}")
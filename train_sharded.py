@@ -0,0 +1,82 @@
+import os
+import sys
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from preprocessing.data_cleaning import DataCleaner, validate_student_data
+from preprocessing.feature_selection import create_new_features, create_risk_labels, prepare_for_training
+from prediction.predictor import StudentPredictor
+from prediction.registry import ModelRegistry
+from prediction.sharded import DEFAULT_LEASE_SECONDS, SHARD_MODES, run_worker, train_sharded
+from config import Config
+
+
+def run_sharded_training(data_path, workers=2, tasks=None, mode='bootstrap', job_dir=None, output=None, timeout=None,
+                         promote=True):
+    """Train, then register the merged forest (with its outlier bounds and profile) and by default promote it"""
+    cleaner = DataCleaner()
+    df = cleaner.load_csv(data_path)
+    df = validate_student_data(df)
+    df = cleaner.clean_data(df)
+    df = create_new_features(df)
+    df = create_risk_labels(df, threshold=Config.RISK_THRESHOLD)
+    X, y = prepare_for_training(df, 'at_risk')
+
+    predictor = StudentPredictor('random_forest')
+    metrics = train_sharded(
+        predictor, X, y,
+        n_workers=workers,
+        n_tasks=tasks,
+        mode=mode,
+        job_dir=job_dir,
+        test_size=Config.TEST_SIZE,
+        random_state=Config.RANDOM_STATE,
+        timeout=timeout
+    )
+    registry = ModelRegistry(Config.MODEL_REGISTRY_FOLDER, compact=Config.MODEL_COMPACT_ARTIFACTS)
+    metrics['version'] = registry.register(predictor, {
+        'source': 'sharded',
+        'source_file': data_path,
+        'mode': mode,
+        'tasks': metrics['tasks'],
+        'train_accuracy': metrics['train_accuracy'],
+        'test_accuracy': metrics['test_accuracy']
+    })
+    if promote:
+        registry.promote('random_forest', metrics['version'])
+    if output:
+        predictor.save_model(output, compact=Config.MODEL_COMPACT_ARTIFACTS)
+    metrics['promoted'] = promote
+    return metrics
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Train the random forest as sub-forests on several processes or nodes')
+    parser.add_argument('--data', type=str, default='backend/data/sample_data.csv')
+    parser.add_argument('--workers', type=int, default=2, help='Local worker processes (0: only workers on other nodes)')
+    parser.add_argument('--tasks', type=int, default=None, help='Sub-forests to split the trees into (default: --workers)')
+    parser.add_argument('--mode', choices=SHARD_MODES, default='bootstrap',
+                        help='bootstrap: every task samples the full data; shard: each task trains on its own slice')
+    parser.add_argument('--job-dir', type=str, default=None, help='Job directory on a filesystem shared with the nodes')
+    parser.add_argument('--output', type=str, default=None, help='Also save the merged forest to this model file')
+    parser.add_argument('--no-promote', action='store_true', help='Register the merged forest without serving it')
+    parser.add_argument('--timeout', type=float, default=None)
+    parser.add_argument('--worker', type=str, default=None, metavar='JOB_DIR',
+                        help='Run as a worker node for the job in JOB_DIR instead of coordinating')
+    parser.add_argument('--lease', type=float, default=DEFAULT_LEASE_SECONDS,
+                        help='Seconds before a worker may take over a task claimed by a silent one')
+    args = parser.parse_args()
+
+    if args.worker:
+        done = run_worker(args.worker, lease_seconds=args.lease, wait=True)
+        print(f'Ran tasks {done}')
+    else:
+        if args.workers == 0 and not args.job_dir:
+            parser.error('--workers 0 needs a --job-dir the worker nodes can reach')
+        metrics = run_sharded_training(args.data, args.workers, args.tasks, args.mode, args.job_dir, args.output, args.timeout,
+                                       promote=not args.no_promote)
+        print(f"{metrics['n_estimators']} trees from {metrics['tasks']} tasks: "
+              f"train accuracy {metrics['train_accuracy']:.3f}, test accuracy {metrics['test_accuracy']:.3f}")
+        print(f"Registered version {metrics['version']} ({'promoted' if metrics['promoted'] else 'not promoted'})")
@@ -0,0 +1,46 @@
+import os
+import sys
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from preprocessing.data_cleaning import DataCleaner, validate_student_data
+from preprocessing.feature_selection import create_new_features, create_risk_labels, prepare_for_training
+from prediction.registry import ModelRegistry
+from prediction.tuning import tune_models, save_tuning_results
+from config import Config
+
+
+def run_tuning(data_path='backend/data/sample_data.csv', model_types=('random_forest', 'svm'), n_jobs=None, promote=True):
+    cleaner = DataCleaner()
+    df = cleaner.load_csv(data_path)
+    df = validate_student_data(df)
+    df = cleaner.clean_data(df)
+    df = create_new_features(df)
+    df = create_risk_labels(df, threshold=Config.RISK_THRESHOLD)
+    X, y = prepare_for_training(df, 'at_risk')
+
+    result = tune_models(
+        X, y,
+        model_types=model_types,
+        n_splits=Config.TUNING_CV_FOLDS,
+        eta=Config.TUNING_HALVING_FACTOR,
+        n_jobs=n_jobs or Config.TUNING_N_JOBS
+    )
+    registry = ModelRegistry(Config.MODEL_REGISTRY_FOLDER, compact=Config.MODEL_COMPACT_ARTIFACTS)
+    return save_tuning_results(result, X, y, registry, Config.TUNING_LEADERBOARD, promote=promote)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', type=str, default='backend/data/sample_data.csv')
+    parser.add_argument('--models', nargs='+', default=['random_forest', 'svm'], choices=['random_forest', 'svm'])
+    parser.add_argument('--jobs', type=int, default=None)
+    parser.add_argument('--no-promote', action='store_true', help='Register the winners without serving them')
+    args = parser.parse_args()
+    report = run_tuning(args.data, tuple(args.models), args.jobs, promote=not args.no_promote)
+    winner = report['winner']
+    print(f"Best: {winner['model_type']} {winner['params']} (cv accuracy {winner['mean_score']:.3f})")
+    print(f"Registered versions: {report['saved_versions']} ({'promoted' if report['promoted'] else 'not promoted'})")
+    print(f"Leaderboard written to {Config.TUNING_LEADERBOARD}")